@@ -0,0 +1,57 @@
+"""
+ASGI config for app project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Django 2.1 has no ASGI handler, so the WSGI application is adapted with
+asgiref and each request runs on a thread pool of GUNICORN_THREADS threads,
+like a gthread worker. File responses are streamed in chunks, since ASGI has
+no ``wsgi.file_wrapper``; set MEDIA_SENDFILE to hand media to the proxy.
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+
+
+# asgiref의 run_wsgi_app은 thread_sensitive한 sync_to_async라서
+# 모든 요청이 스레드 하나에서 차례로 실행된다. 여기서는 스레드 풀에서 나눠 실행한다.
+_run_wsgi_app = WsgiToAsgiInstance.__dict__['run_wsgi_app'].func
+
+
+class ThreadPoolWsgiToAsgiInstance(WsgiToAsgiInstance):
+    """WSGI request adapter running the application on a thread pool"""
+
+    def __init__(self, wsgi_application, executor):
+        super().__init__(wsgi_application)
+        self.executor = executor
+
+    async def run_wsgi_app(self, body):
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(self.executor, _run_wsgi_app, self, body)
+
+
+class ThreadPoolWsgiToAsgi(WsgiToAsgi):
+    """Adapt a WSGI application to ASGI serving requests concurrently"""
+
+    def __init__(self, wsgi_application, threads):
+        super().__init__(wsgi_application)
+        # 스레드는 처음 요청이 올 때 만들어지므로 preload 후 fork해도 worker마다 따로 생긴다.
+        self.executor = ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix='wsgi'
+        )
+
+    async def __call__(self, scope, receive, send):
+        await ThreadPoolWsgiToAsgiInstance(
+            self.wsgi_application, self.executor
+        )(scope, receive, send)
+
+
+application = ThreadPoolWsgiToAsgi(
+    get_wsgi_application(),
+    threads=int(os.environ.get('GUNICORN_THREADS', 4))
+)
@@ -0,0 +1,99 @@
+# 운영 서버(gunicorn) 설정.
+# python manage.py serve 로 실행하거나 직접 실행한다.
+#   gunicorn -c python:app.gunicorn_conf app.wsgi
+# 모든 값은 GUNICORN_* 환경 변수로 바꿀 수 있다.
+#
+# 재시작 없이 설정을 다시 읽거나 worker를 교체하려면 master에 HUP을 보낸다.
+# 새 worker를 먼저 띄우고, 기존 worker는 처리 중인 요청을 graceful_timeout 안에 마치고 종료한다.
+# preload_app을 쓰므로 HUP으로는 코드를 다시 읽지 않는다. 코드를 배포한 뒤에는
+# USR2로 새 master를 띄우고, 새 master가 준비되면 기존 master에 TERM을 보낸다.
+import logging
+import multiprocessing
+import os
+import sys
+
+
+ASGI_WORKER_CLASS = 'uvicorn.workers.UvicornWorker'
+
+
+def default_workers(worker_class, cpu_count=None):
+    """Return the number of workers suited to a worker class"""
+    cpu_count = cpu_count or multiprocessing.cpu_count()
+    if worker_class == 'sync':
+        # 요청 하나가 db를 기다리는 동안 다른 worker가 cpu를 쓰도록 넉넉히 띄운다.
+        return cpu_count * 2 + 1
+    # gthread와 uvicorn은 worker 하나가 여러 요청을 동시에 처리한다.
+    return cpu_count + 1
+
+
+def resolve_workers(worker_class):
+    """Return the configured number of workers for a worker class"""
+    return int(os.environ.get('GUNICORN_WORKERS', 0)) or \
+        default_workers(worker_class)
+
+
+# 1이면 ASGI 애플리케이션(app.asgi)을 uvicorn worker로 실행한다.
+asgi = bool(int(os.environ.get('GUNICORN_ASGI', 0)))
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+worker_class = ASGI_WORKER_CLASS if asgi else \
+    os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = resolve_workers(worker_class)
+# gthread worker의 스레드 수
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# fork 전에 master에서 앱을 불러와서 worker들이 코드와 모듈의 메모리를 공유(copy on write)하게 한다.
+# worker가 바로 요청을 받을 수 있으므로 시작도 빠르다.
+preload_app = bool(int(os.environ.get('GUNICORN_PRELOAD', 1)))
+
+# 메모리가 조금씩 늘어나는 것을 막기 위해 일정 요청마다 worker를 바꾼다.
+# jitter로 worker들이 한번에 재시작되지 않게 한다.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+# 앞단 프록시와의 keep-alive 연결을 유지하는 시간(초)
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# 도커의 overlay 파일 시스템에서 worker heartbeat 파일이 느려지지 않도록 메모리 파일 시스템을 쓴다.
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+# X-Forwarded-* 헤더를 믿을 프록시 주소
+forwarded_allow_ips = os.environ.get(
+    'GUNICORN_FORWARDED_ALLOW_IPS', '127.0.0.1'
+)
+
+
+def on_starting(server):
+    # 프로세스 메모리 캐시는 worker마다 따로 있어서, 한 worker에서 폐기한 토큰이나 목록 캐시가
+    # 다른 worker에는 남는다. worker가 여럿이면 memcached 같은 공유 캐시가 있어야 한다.
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+    from core.cache import cache_is_shared
+    if server.cfg.workers > 1 and not cache_is_shared():
+        server.log.error(
+            'CACHE_BACKEND must be a shared cache when running %s workers',
+            server.cfg.workers
+        )
+        sys.exit(1)
+
+
+def pre_fork(server, worker):
+    # preload 중에 master가 연 db 연결을 worker들이 나눠 쓰지 않도록 fork 전에 닫는다.
+    from django.db import connections
+    from core.db.pool import close_pools
+    connections.close_all()
+    close_pools()
+
+
+def worker_exit(server, worker):
+    # worker가 교체될 때 db 연결을 얻는 데 걸린 시간과 재사용 비율을 남긴다.
+    from core.db.pool import metrics_snapshot
+    for alias, values in metrics_snapshot().items():
+        logging.getLogger('gunicorn.error').info(
+            'db connections [%s] %s', alias, values
+        )
@@ -37,6 +37,8 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    # trigram 검색 같은 postgres 전용 lookup을 등록한다.
+    'django.contrib.postgres',
     "core",
     "user",
     "rest_framework",
@@ -81,15 +83,134 @@ WSGI_APPLICATION = 'app.wsgi.application'
 DATABASES = {
     # 쉽게 구성을 바꿀 수 있다.
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        # 연결을 다시 쓰고, 상태를 확인하고, 풀을 쓸 수 있는 postgres 백엔드 (core.db 참고)
+        'ENGINE': 'core.db.postgresql',
         # host와 password 같은 것을 도커를 통해 환경 변수에 넣어놨다.
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        # 연결을 닫지 않고 다시 쓰는 시간(초). 0이면 요청마다 새로 연결한다.
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        # 요청에서 처음 db를 쓸 때 다시 쓰는 연결이 살아있는지 확인한다.
+        'CONN_HEALTH_CHECKS': bool(
+            int(os.environ.get('DB_CONN_HEALTH_CHECKS', 1))
+        ),
+        # 스레드들이 나눠 쓰는 연결 풀. SIZE가 0이면 쓰지 않는다.
+        # TIMEOUT은 빈 연결을 기다리는 시간, RECYCLE은 연결을 새로 여는 주기(초)
+        'POOL': {
+            'SIZE': int(os.environ.get('DB_POOL_SIZE', 0)),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            'RECYCLE': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        },
+        'OPTIONS': {
+            'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 10)),
+        },
     }
 }
 
+# 읽기 전용 복제본. DB_REPLICA_HOST가 있을 때만 쓴다.
+# 이름, 유저, 비밀번호는 주지 않으면 기본 db와 같다.
+if os.environ.get('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.environ.get('DB_REPLICA_HOST'),
+        'NAME': os.environ.get('DB_REPLICA_NAME', os.environ.get('DB_NAME')),
+        'USER': os.environ.get('DB_REPLICA_USER', os.environ.get('DB_USER')),
+        'PASSWORD': os.environ.get(
+            'DB_REPLICA_PASS', os.environ.get('DB_PASS')
+        ),
+        # 테스트에서는 기본 db를 복제본으로 쓴다.
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+# 조회는 복제본으로, 쓰기는 기본 db로 보낸다.
+DATABASE_ROUTERS = ['core.db.routers.ReplicaRouter']
+# 데이터를 바꾼 유저가 복제본 대신 기본 db에서 읽는 시간(초). 복제 지연보다 길어야 한다.
+DB_READ_YOUR_WRITES_SECONDS = int(
+    os.environ.get('DB_READ_YOUR_WRITES_SECONDS', 5)
+)
+
+
+# Cache
+# https://docs.djangoproject.com/en/2.1/topics/cache/
+
+# 기본은 프로세스 메모리 캐시. 여러 워커가 캐시를 공유하려면 환경 변수로 memcached 등을 설정한다.
+#   CACHE_BACKEND=django.core.cache.backends.memcached.MemcachedCache
+#   CACHE_LOCATION=memcached:11211
+# 프로세스 메모리 캐시로는 worker를 여럿 띄울 수 없다. (app/gunicorn_conf.py)
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+# 토큰 인증 캐시. 공유 캐시의 유효 시간과 워커별 LRU 캐시의 크기, 유효 시간(초)
+TOKEN_CACHE_TTL = int(os.environ.get('TOKEN_CACHE_TTL', 300))
+TOKEN_CACHE_LOCAL_SIZE = int(os.environ.get('TOKEN_CACHE_LOCAL_SIZE', 1024))
+TOKEN_CACHE_LOCAL_TTL = int(os.environ.get('TOKEN_CACHE_LOCAL_TTL', 5))
+
+# 레시피, 태그, 재료 목록 응답 캐시의 유효 시간(초)
+RECIPE_LIST_CACHE_TIMEOUT = int(
+    os.environ.get('RECIPE_LIST_CACHE_TIMEOUT', 600)
+)
+
+
+# 한번의 bulk 요청에 넣을 수 있는 최대 항목 수와 INSERT/UPDATE 한번에 묶는 행의 수
+RECIPE_BULK_MAX_ITEMS = int(os.environ.get('RECIPE_BULK_MAX_ITEMS', 1000))
+RECIPE_BULK_BATCH_SIZE = int(os.environ.get('RECIPE_BULK_BATCH_SIZE', 500))
+
+# 백그라운드 작업(이미지 처리 등)을 실행하는 스레드 수.
+# EAGER를 켜면 작업을 요청 안에서 바로 실행한다. (테스트, 디버깅용)
+RECIPE_TASK_WORKERS = int(os.environ.get('RECIPE_TASK_WORKERS', 2))
+RECIPE_TASKS_EAGER = bool(int(os.environ.get('RECIPE_TASKS_EAGER', 0)))
+
+# 레시피 이미지 업로드의 최대 크기(byte)와 최대 픽셀 수
+RECIPE_IMAGE_MAX_BYTES = int(
+    os.environ.get('RECIPE_IMAGE_MAX_BYTES', 25 * 1024 * 1024)
+)
+RECIPE_IMAGE_MAX_PIXELS = int(
+    os.environ.get('RECIPE_IMAGE_MAX_PIXELS', 50 * 1000 * 1000)
+)
+# 이미지 처리가 이 시간(초)보다 오래 pending, processing이면 작업이 죽은 것으로 보고 다시 예약한다.
+RECIPE_IMAGE_STALE_AFTER = int(
+    os.environ.get('RECIPE_IMAGE_STALE_AFTER', 15 * 60)
+)
+
+# 레시피 이미지를 저장하는 곳. local(MEDIA_ROOT) 또는 s3
+RECIPE_IMAGE_STORAGE = os.environ.get('RECIPE_IMAGE_STORAGE', 'local')
+# S3 호환 저장소 설정. 인증 정보는 boto3가 AWS_ACCESS_KEY_ID 등의 환경 변수에서 읽는다.
+AWS_S3_BUCKET = os.environ.get('AWS_S3_BUCKET')
+AWS_S3_ENDPOINT_URL = os.environ.get('AWS_S3_ENDPOINT_URL')
+AWS_S3_REGION = os.environ.get('AWS_S3_REGION')
+AWS_S3_URL_EXPIRE = int(os.environ.get('AWS_S3_URL_EXPIRE', 3600))
+# 미디어 파일을 보내는 방법. 비워두면 django가 sendfile로 보낸다.
+# nginx: X-Accel-Redirect로 MEDIA_ACCEL_PREFIX(internal location) 아래의 파일을 보내게 한다.
+# sendfile: X-Sendfile로 파일 경로를 넘긴다. (apache mod_xsendfile, lighttpd)
+MEDIA_SENDFILE = os.environ.get('MEDIA_SENDFILE', '')
+MEDIA_ACCEL_PREFIX = os.environ.get('MEDIA_ACCEL_PREFIX', '/protected-media/')
+# 미디어 파일의 서명된 url이 유효한 시간(초)
+MEDIA_URL_MAX_AGE = int(os.environ.get('MEDIA_URL_MAX_AGE', 24 * 60 * 60))
+# 미디어 파일 응답의 Cache-Control max-age(초). url의 남은 유효 시간보다 길지 않다.
+MEDIA_CACHE_MAX_AGE = int(
+    os.environ.get('MEDIA_CACHE_MAX_AGE', 365 * 24 * 60 * 60)
+)
+# 직접 업로드 주소의 유효 시간과 업로드 완료 토큰의 유효 시간(초)
+RECIPE_IMAGE_UPLOAD_URL_TTL = int(
+    os.environ.get('RECIPE_IMAGE_UPLOAD_URL_TTL', 300)
+)
+RECIPE_IMAGE_UPLOAD_TOKEN_MAX_AGE = int(
+    os.environ.get('RECIPE_IMAGE_UPLOAD_TOKEN_MAX_AGE', 3600)
+)
+
+# 레시피 검색(?q=)에 쓰는 postgres 텍스트 검색 설정(언어)
+# 저장된 검색 컬럼도 이 설정으로 만들어지므로, 바꾼 뒤에는 rebuild_search_vectors를 실행한다.
+RECIPE_SEARCH_CONFIG = os.environ.get('RECIPE_SEARCH_CONFIG', 'english')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
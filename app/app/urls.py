@@ -15,14 +15,24 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-# media url을 설정하기 위함
-from django.conf.urls.static import static
 from django.conf import settings
 
+from core.health import healthz, readyz
+from recipe.media import serve_media
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    # 오케스트레이터의 상태 확인
+    path('healthz', healthz, name='healthz'),
+    path('readyz', readyz, name='readyz'),
     # url을 문자열로 정의하는 데 유용함
     path('api/user/', include('user.urls')),
     path('api/recipe/', include('recipe.urls')),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-# 개발 서버에서 media url을 사용할 수 있으므로 별도의 웹 서버를 설정하지 않고도 이미지 업로드를 테스트할 수 있다.
+    # 서명을 확인한 뒤 프록시에 전송을 넘기거나 sendfile로 보낸다.
+    # 개발 서버에서도 별도의 웹 서버를 설정하지 않고 이미지를 확인할 수 있다.
+    path(
+        f'{settings.MEDIA_URL.strip("/")}/<path:name>',
+        serve_media,
+        name='media'
+    ),
+]
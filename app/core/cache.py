@@ -0,0 +1,10 @@
+# 캐시 설정 확인.
+# 프로세스 메모리 캐시(locmem)는 프로세스마다 따로 있어서, 한 worker에서 지우거나 바꾼 값이
+# 다른 worker에는 그대로 남는다. 지운 값이 다른 worker에 남으면 안 되는 캐시는 이 함수로 확인한다.
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def cache_is_shared(alias=DEFAULT_CACHE_ALIAS):
+    """Return whether a cache is shared by every worker process"""
+    return not isinstance(caches[alias], LocMemCache)
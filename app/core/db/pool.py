@@ -0,0 +1,198 @@
+# 프로세스 안에서 여러 스레드가 나눠 쓰는 db 연결 풀과 연결 지표.
+# gthread나 uvicorn worker는 스레드가 많으므로, 스레드마다 연결을 계속 들고 있으면 postgres의 연결이 모자란다.
+# 풀을 쓰면 요청이 끝날 때 연결을 닫지 않고 풀에 돌려주고, 다음 요청이 그 연결을 다시 쓴다.
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionMetrics:
+    """Counters of how database connections were acquired"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.reused = 0
+        self.health_check_failures = 0
+        self.acquire_seconds = 0.0
+        self.max_acquire_seconds = 0.0
+
+    def record_acquire(self, seconds, reused):
+        with self._lock:
+            self.acquired += 1
+            self.reused += reused
+            self.acquire_seconds += seconds
+            self.max_acquire_seconds = max(self.max_acquire_seconds, seconds)
+
+    def record_health_check_failure(self):
+        with self._lock:
+            self.health_check_failures += 1
+
+    def snapshot(self):
+        """Return the counters with the reuse ratio and mean acquire time"""
+        with self._lock:
+            acquired = self.acquired or 1
+            return {
+                'acquired': self.acquired,
+                'reused': self.reused,
+                'reuse_ratio': round(self.reused / acquired, 4),
+                'health_check_failures': self.health_check_failures,
+                'acquire_ms_avg': round(
+                    self.acquire_seconds / acquired * 1000, 3
+                ),
+                'acquire_ms_max': round(self.max_acquire_seconds * 1000, 3),
+            }
+
+
+class ConnectionPool:
+    """Thread safe pool of open database connections"""
+
+    def __init__(self, connect, size, timeout=10, recycle=None,
+                 check=None):
+        # connect: 새 연결을 여는 함수, check: 다시 쓰기 전에 연결이 살아있는지 확인하는 함수
+        self.connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.check = check
+        self.pid = os.getpid()
+        # (연결, 연 시각)
+        self._idle = deque()
+        self._opened = {}
+        self._condition = threading.Condition()
+
+    def _reset_after_fork(self):
+        # fork한 자식 프로세스는 부모의 소켓을 같이 쓰게 되므로 닫지 않고 버린다.
+        self.pid = os.getpid()
+        self._idle.clear()
+        self._opened.clear()
+
+    def _expired(self, conn):
+        opened_at = self._opened.get(id(conn), 0)
+        return self.recycle is not None and \
+            time.monotonic() - opened_at >= self.recycle
+
+    def _discard(self, conn):
+        self._opened.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _take(self, deadline):
+        """Return an idle connection, or reserve a slot and return None"""
+        with self._condition:
+            if self.pid != os.getpid():
+                self._reset_after_fork()
+            while True:
+                if self._idle:
+                    return self._idle.pop(), None
+                if len(self._opened) < self.size:
+                    # 연결을 여는 동안 다른 스레드가 기다리지 않도록 자리만 잡아둔다.
+                    placeholder = object()
+                    self._opened[id(placeholder)] = time.monotonic()
+                    return None, placeholder
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(
+                        f'No database connection was released within '
+                        f'{self.timeout} seconds (pool size {self.size}).'
+                    )
+                self._condition.wait(remaining)
+
+    def acquire(self):
+        """Return a connection and whether it was reused"""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            conn, placeholder = self._take(deadline)
+            if conn is None:
+                break
+            # 꺼낸 연결은 자리를 차지한 채로 잠금 밖에서 확인한다.
+            # SELECT 1을 하는 동안 다른 스레드가 풀을 기다리지 않는다.
+            if conn.closed or self._expired(conn) or \
+                    (self.check and not self.check(conn)):
+                self.discard(conn)
+                continue
+            return conn, True
+
+        try:
+            conn = self.connect()
+        except Exception:
+            with self._condition:
+                self._opened.pop(id(placeholder), None)
+                self._condition.notify()
+            raise
+        with self._condition:
+            del self._opened[id(placeholder)]
+            self._opened[id(conn)] = time.monotonic()
+        return conn, False
+
+    def release(self, conn):
+        """Return a connection to the pool"""
+        with self._condition:
+            if self.pid != os.getpid() or id(conn) not in self._opened:
+                return
+            if conn.closed or self._expired(conn):
+                self._discard(conn)
+            else:
+                self._idle.append(conn)
+            self._condition.notify()
+
+    def discard(self, conn):
+        """Close a broken connection and free its slot"""
+        with self._condition:
+            self._opened.pop(id(conn), None)
+            self._condition.notify()
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def close(self):
+        """Close every idle connection"""
+        with self._condition:
+            while self._idle:
+                self._discard(self._idle.pop())
+
+
+# alias별 풀과 지표. 프로세스마다 하나씩 있다.
+pools = {}
+metrics = {}
+_lock = threading.Lock()
+
+
+def get_metrics(alias):
+    """Return the connection metrics of a database alias"""
+    with _lock:
+        return metrics.setdefault(alias, ConnectionMetrics())
+
+
+def get_pool(alias, **kwargs):
+    """Return the connection pool of a database alias"""
+    with _lock:
+        if alias not in pools:
+            pools[alias] = ConnectionPool(**kwargs)
+        return pools[alias]
+
+
+def close_pools():
+    """Close the idle connections of every pool"""
+    with _lock:
+        for pool in pools.values():
+            pool.close()
+
+
+def metrics_snapshot():
+    """Return the connection metrics of every database alias"""
+    with _lock:
+        items = list(metrics.items())
+    return {alias: value.snapshot() for alias, value in items}
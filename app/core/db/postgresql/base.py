@@ -0,0 +1,119 @@
+# postgres 연결을 다시 쓰기 위한 db 백엔드. ENGINE = 'core.db.postgresql'
+# - CONN_MAX_AGE 동안 연결을 닫지 않고 다음 요청에서 다시 쓴다.
+# - CONN_HEALTH_CHECKS를 켜면 요청에서 처음 db를 쓸 때 다시 쓰는 연결이 살아있는지 확인하고,
+#   끊어졌으면 새로 연결한다. (재시작한 db, 방화벽이 끊은 연결 등)
+# - POOL['SIZE']를 주면 프로세스의 스레드들이 연결 풀을 나눠 쓴다. 요청이 끝나면 연결을 풀에 돌려준다.
+# - 연결을 얻는 데 걸린 시간과 재사용 비율을 core.db.pool.metrics에 센다.
+import time
+
+from django.db.backends.postgresql import base
+
+from psycopg2 import extensions
+
+from core.db.pool import get_metrics, get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL backend with health checked, optionally pooled connections"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # 요청이 시작되면 True가 되고, 그 요청에서 처음 연결을 쓸 때 확인한 뒤 False가 된다.
+        self.health_check_pending = True
+        self.reused_from_pool = False
+        self.metrics = get_metrics(self.alias)
+
+    @property
+    def pool_settings(self):
+        return self.settings_dict.get('POOL') or {}
+
+    @property
+    def pool(self):
+        size = self.pool_settings.get('SIZE', 0)
+        if not size:
+            return None
+        params = self.get_connection_params()
+        return get_pool(
+            self.alias,
+            connect=lambda: base.Database.connect(**params),
+            size=size,
+            timeout=self.pool_settings.get('TIMEOUT', 10),
+            recycle=self.pool_settings.get('RECYCLE'),
+            check=self._ping if self.settings_dict.get(
+                'CONN_HEALTH_CHECKS'
+            ) else None,
+        )
+
+    @staticmethod
+    def _ping(conn):
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            return True
+        except Exception:
+            return False
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            self.reused_from_pool = False
+            return super().get_new_connection(conn_params)
+        conn, self.reused_from_pool = pool.acquire()
+        self._set_isolation_level(conn)
+        return conn
+
+    def _set_isolation_level(self, conn):
+        # 기본 백엔드의 get_new_connection처럼 OPTIONS의 isolation_level을 적용한다.
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = conn.isolation_level
+        else:
+            if self.isolation_level != conn.isolation_level:
+                conn.set_session(isolation_level=self.isolation_level)
+
+    def _close(self):
+        pool = self.pool
+        if pool is None or self.connection is None:
+            return super()._close()
+        conn = self.connection
+        with self.wrap_database_errors:
+            status = conn.get_transaction_status()
+            if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                pool.discard(conn)
+                return
+            if status != extensions.TRANSACTION_STATUS_IDLE:
+                # 끝나지 않은 트랜잭션을 다음 요청에 넘기지 않는다.
+                conn.rollback()
+            pool.release(conn)
+
+    def connect(self):
+        # 새 연결은 확인할 필요가 없다. connect() 안에서도 ensure_connection()이 불린다.
+        self.health_check_pending = False
+        super().connect()
+
+    def ensure_connection(self):
+        if self.connection is not None and not self.health_check_pending:
+            return
+        started = time.perf_counter()
+        reused = self.connection is not None
+        if reused and self.settings_dict.get('CONN_HEALTH_CHECKS') and \
+                not self.in_atomic_block and not self.is_usable():
+            self.metrics.record_health_check_failure()
+            self.close()
+            reused = False
+        if self.connection is None:
+            super().ensure_connection()
+            reused = self.reused_from_pool
+        self.health_check_pending = False
+        self.metrics.record_acquire(time.perf_counter() - started, reused)
+
+    def close_if_unusable_or_obsolete(self):
+        # 요청이 시작될 때와 끝날 때 불린다.
+        super().close_if_unusable_or_obsolete()
+        self.health_check_pending = True
+        if self.connection is not None and self.pool is not None and \
+                not self.in_atomic_block:
+            # 풀을 쓰면 요청이 끝날 때마다 다른 스레드가 쓸 수 있게 돌려준다.
+            self.close()
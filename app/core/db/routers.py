@@ -0,0 +1,73 @@
+# 읽기 전용 복제본(replica) db 라우터.
+# 쓰기는 항상 기본 db로 보낸다. 조회는 요청이 복제본을 써도 된다고 한 동안에만 복제본으로 보낸다.
+# 뷰셋에서 복제본을 켜고 끄는 것은 recipe.replicas.ReplicaReadMixin이 한다.
+# 복제본 목록은 DATABASE_REPLICAS 설정에 있다.
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+_state = threading.local()
+
+
+def replica_reads_enabled():
+    """Return whether reads of the current thread may use a replica"""
+    return getattr(_state, 'enabled', False)
+
+
+def set_replica_reads(enabled):
+    """Allow or forbid replica reads in the current thread"""
+    _state.enabled = enabled
+
+
+@contextmanager
+def replica_reads():
+    """Send the reads inside the block to a replica"""
+    previous = replica_reads_enabled()
+    set_replica_reads(True)
+    try:
+        yield
+    finally:
+        set_replica_reads(previous)
+
+
+def _same_database(alias):
+    # 테스트에서 기본 db를 가리키는 복제본(TEST MIRROR)은 기본 db를 그대로 쓴다.
+    # 같은 db에 연결을 하나 더 여는 것은 의미가 없고, 테스트 트랜잭션의 데이터도 보이지 않는다.
+    keys = ('ENGINE', 'HOST', 'PORT', 'NAME')
+    replica = connections[alias].settings_dict
+    default = connections[DEFAULT_DB_ALIAS].settings_dict
+    return all(replica.get(key) == default.get(key) for key in keys)
+
+
+def replica_aliases():
+    """Return the aliases of the configured replicas"""
+    return [
+        alias for alias in getattr(settings, 'DATABASE_REPLICAS', ())
+        if not _same_database(alias)
+    ]
+
+
+class ReplicaRouter:
+    """Route reads to replicas while allowed and writes to the primary"""
+
+    def choose_replica(self):
+        """Return the alias of a replica, or None if there is none"""
+        aliases = replica_aliases()
+        return random.choice(aliases) if aliases else None
+
+    def db_for_read(self, model, **hints):
+        if replica_reads_enabled():
+            return self.choose_replica()
+        return None
+
+    def db_for_write(self, model, **hints):
+        # 복제본에서 읽은 객체를 저장해도 기본 db에 쓴다.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # 복제본은 기본 db와 같은 데이터를 가지고 있다.
+        return True
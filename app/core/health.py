@@ -0,0 +1,73 @@
+# 서비스 상태 확인.
+# wait_for_db 명령과 오케스트레이터(docker, kubernetes)가 부르는 /healthz, /readyz가 같이 쓴다.
+# /healthz: 프로세스가 요청을 받을 수 있는지만 본다. db에 연결하지 않는다.
+# /readyz: 설정된 모든 db에 실제로 SELECT 1을 보내 본다. 하나라도 실패하면 503을 돌려준다.
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.http import JsonResponse
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_safe
+
+
+def check_database(alias):
+    """Run a trivial query on a database to prove it accepts queries"""
+    # connections[alias]는 연결을 만들지 않는다. 쿼리를 보내야 실제로 연결한다.
+    with connections[alias].cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+
+
+def discard_connection(alias):
+    """Close a connection so the next query connects again"""
+    connection = connections[alias]
+    # 트랜잭션 안에서 닫으면 그 트랜잭션을 쓸 수 없게 되므로 그대로 둔다.
+    if not connection.in_atomic_block:
+        connection.close()
+
+
+def pending_migrations(alias):
+    """Return the names of the migrations not applied to a database"""
+    executor = MigrationExecutor(connections[alias])
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    return [f'{migration.app_label}.{migration.name}' for migration, _ in plan]
+
+
+def check_databases(aliases):
+    """Return whether every database answers and the result per alias"""
+    results = {}
+    for alias in aliases:
+        started = time.perf_counter()
+        try:
+            check_database(alias)
+        except DatabaseError as exc:
+            # 다음 확인에서 새로 연결하도록 끊어진 연결을 버린다.
+            discard_connection(alias)
+            results[alias] = {'ok': False, 'error': exc.__class__.__name__}
+        else:
+            results[alias] = {'ok': True}
+        results[alias]['ms'] = round(
+            (time.perf_counter() - started) * 1000, 2
+        )
+    return all(result['ok'] for result in results.values()), results
+
+
+@never_cache
+@require_safe
+def healthz(request):
+    """Report the process is alive"""
+    return JsonResponse({'status': 'ok'})
+
+
+@never_cache
+@require_safe
+def readyz(request):
+    """Report whether every database can be queried"""
+    # 읽기는 복제본으로도 가므로 복제본도 준비되어야 한다.
+    ready, databases = check_databases(settings.DATABASES)
+    return JsonResponse(
+        {'status': 'ok' if ready else 'unavailable', 'databases': databases},
+        status=200 if ready else 503
+    )
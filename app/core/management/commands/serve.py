@@ -0,0 +1,79 @@
+# 운영 서버를 실행하는 명령어.
+# 설정은 app/gunicorn_conf.py에서 읽고, 옵션으로 준 값만 덮어쓴다.
+import importlib
+import os
+
+from django.core.management.base import BaseCommand
+
+from gunicorn import util
+from gunicorn.app.base import BaseApplication
+
+
+CONFIG_MODULE = 'app.gunicorn_conf'
+WSGI_APP = 'app.wsgi:application'
+ASGI_APP = 'app.asgi:application'
+
+
+class DjangoApplication(BaseApplication):
+    """Gunicorn application serving this project"""
+
+    def __init__(self, app_uri, options):
+        self.app_uri = app_uri
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        config = importlib.import_module(CONFIG_MODULE)
+        for key, value in vars(config).items():
+            if key in self.cfg.settings:
+                self.cfg.set(key, value)
+        for key, value in self.options.items():
+            if value is not None:
+                self.cfg.set(key, value)
+
+    def load(self):
+        return util.import_app(self.app_uri)
+
+
+class Command(BaseCommand):
+    """Django command to start the production server"""
+    help = 'Start the production server with gunicorn'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bind')
+        parser.add_argument('--workers', type=int)
+        parser.add_argument('--threads', type=int)
+        parser.add_argument(
+            '--asgi', action='store_true',
+            help='Serve the ASGI application with uvicorn workers'
+        )
+        parser.add_argument(
+            '--print-config', action='store_true',
+            help='Print the resolved configuration and exit'
+        )
+
+    def handle(self, *args, **options):
+        overrides = {
+            'bind': options['bind'],
+            'workers': options['workers'],
+            'threads': options['threads'],
+        }
+        app_uri = WSGI_APP
+        if options['asgi']:
+            # worker 종류가 바뀌면 알맞은 worker 수도 바뀐다.
+            config = importlib.import_module(CONFIG_MODULE)
+            app_uri = ASGI_APP
+            overrides['worker_class'] = config.ASGI_WORKER_CLASS
+            overrides['workers'] = options['workers'] or \
+                config.resolve_workers(config.ASGI_WORKER_CLASS)
+            if options['threads']:
+                # uvicorn worker는 threads 설정을 쓰지 않으므로 app.asgi의 스레드 풀 크기로 넘긴다.
+                os.environ['GUNICORN_THREADS'] = str(options['threads'])
+        application = DjangoApplication(app_uri, overrides)
+        if options['print_config']:
+            cfg = application.cfg
+            for name in ('bind', 'worker_class_str', 'workers', 'threads',
+                         'preload_app', 'max_requests', 'timeout'):
+                self.stdout.write(f'{name} = {getattr(cfg, name)}')
+            return
+        application.run()
@@ -1,25 +1,86 @@
+# 데이터베이스가 실제로 쿼리를 받을 수 있을 때까지 기다리는 명령어.
+# 컨테이너가 postgres보다 먼저 떠서 요청을 실패하지 않도록 다른 명령 전에 실행한다.
+# 실패하면 지수적으로 늘어나는 시간(최대 --max-delay)에서 무작위로 골라 기다린다.(full jitter)
+# 여러 컨테이너가 동시에 재시도하여 db에 몰리지 않게 한다.
+# 예) python manage.py wait_for_db --database default --database replica \
+#         --wait-for-migrations --timeout 120
+import random
 import time
 
-from django.db import connections
-from django.db.utils import OperationalError
-# 사용자 지정 명령을 생성하기위해 빌드해야하는 BaseCommnad
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
+
+from core.health import check_database, discard_connection, \
+    pending_migrations
+
+
+class NotReady(Exception):
+    pass
 
 
 class Command(BaseCommand):
     """Django command to pause execution until database is available"""
-    # 사용자 정의 인수와 옵션을 관리 명령에 전달. 대기 시간을 정의하거나 다른 옵션 사용 가능
+    help = 'Wait until the databases accept queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', action='append', dest='databases',
+            help='Database alias to wait for. Can be given more than once'
+        )
+        parser.add_argument(
+            '--timeout', type=float, default=60,
+            help='Seconds to wait before giving up, 0 to wait forever'
+        )
+        parser.add_argument('--initial-delay', type=float, default=0.1)
+        parser.add_argument('--max-delay', type=float, default=5)
+        parser.add_argument(
+            '--wait-for-migrations', action='store_true',
+            help='Also wait until every migration is applied'
+        )
 
     def handle(self, *args, **options):
-        # 관리 명령 중 실제로 출력 가능
+        aliases = options['databases'] or [DEFAULT_DB_ALIAS]
+        timeout = options['timeout']
+        delay = options['initial_delay']
         self.stdout.write('Waiting for database...')
-        # 디비 연결을 나타내는 변수. 기본값은 None
-        db_conn = None
-        while not db_conn:
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
             try:
-                db_conn = connections['default']
-            except OperationalError:
-                self.stdout.write('Database unavailable, waiting 1 second...')
-                time.sleep(1)
+                self._check(aliases, options['wait_for_migrations'])
+                break
+            except (DatabaseError, NotReady) as exc:
+                wait = random.uniform(0, delay)
+                elapsed = time.monotonic() - started
+                if timeout and elapsed + wait > timeout:
+                    raise CommandError(
+                        f'Database unavailable after {elapsed:.2f} seconds '
+                        f'and {attempt} attempts: {exc}'
+                    )
+                self.stdout.write(
+                    f'Database unavailable ({exc.__class__.__name__}), '
+                    f'waiting {wait:.2f} seconds...'
+                )
+                time.sleep(wait)
+                delay = min(delay * 2, options['max_delay'])
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Database available! ({elapsed:.2f} seconds, '
+            f'{attempt} attempts)'
+        ))
 
-        self.stdout.write(self.style.SUCCESS('Datavase available!'))
+    def _check(self, aliases, wait_for_migrations):
+        for alias in aliases:
+            try:
+                check_database(alias)
+                if wait_for_migrations:
+                    pending = pending_migrations(alias)
+                    if pending:
+                        raise NotReady(
+                            f'{len(pending)} unapplied migrations on {alias}'
+                        )
+            finally:
+                # 실패한 연결을 다시 쓰지 않고, 성공했어도 이어서 실행할 명령에 연결을 남기지 않는다.
+                discard_connection(alias)
@@ -0,0 +1,73 @@
+# Generated by Django 2.1.15 on 2026-10-18 10:03
+
+from django.conf import settings
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def is_postgres(schema_editor):
+    return schema_editor.connection.vendor == 'postgresql'
+
+
+# GIN 인덱스는 postgres에만 있으므로, 다른 db에서는 상태(state)에만 추가한다.
+def create_search_index(apps, schema_editor):
+    if is_postgres(schema_editor):
+        Recipe = apps.get_model('core', 'Recipe')
+        schema_editor.add_index(Recipe, django.contrib.postgres.indexes.GinIndex(
+            fields=['search_vector'], name='recipe_search_vector_gin'
+        ))
+
+
+def drop_search_index(apps, schema_editor):
+    if is_postgres(schema_editor):
+        Recipe = apps.get_model('core', 'Recipe')
+        schema_editor.remove_index(Recipe, django.contrib.postgres.indexes.GinIndex(
+            fields=['search_vector'], name='recipe_search_vector_gin'
+        ))
+
+
+# 이미 있는 레시피의 검색 컬럼을 채운다.
+# 검색어도 같은 설정으로 파싱하므로 실행 중에 쓰는 RECIPE_SEARCH_CONFIG와 같은 설정을 쓴다.
+def fill_search_vectors(apps, schema_editor):
+    if is_postgres(schema_editor):
+        config = getattr(settings, 'RECIPE_SEARCH_CONFIG', 'english')
+        schema_editor.execute("""
+            UPDATE core_recipe r SET search_vector =
+                setweight(to_tsvector(%(config)s::regconfig, r.title), 'A') ||
+                setweight(to_tsvector(%(config)s::regconfig, coalesce((
+                    SELECT string_agg(t.name, ' ') FROM core_tag t
+                    JOIN core_recipe_tags rt ON rt.tag_id = t.id
+                    WHERE rt.recipe_id = r.id), '')), 'B') ||
+                setweight(to_tsvector(%(config)s::regconfig, coalesce((
+                    SELECT string_agg(i.name, ' ') FROM core_ingredient i
+                    JOIN core_recipe_ingredients ri ON ri.ingredient_id = i.id
+                    WHERE ri.recipe_id = r.id), '')), 'C')
+        """, {'config': config})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='recipe',
+                    index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='recipe_search_vector_gin'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_search_index, drop_search_index),
+            ],
+        ),
+        migrations.RunPython(fill_search_vectors, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 2.1.15 on 2026-10-18 11:20
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+TABLES = ('core_tag', 'core_ingredient')
+
+
+# django 2.1의 Index는 함수 인덱스와 opclass를 지원하지 않으므로 sql로 만든다.
+# 상태(state)에는 영향이 없고, postgres가 아닌 db에서는 아무것도 하지 않는다.
+def create_name_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in TABLES:
+        # 자동완성 prefix 검색용. text_pattern_ops여야 LIKE 'abc%'에 쓰인다.
+        schema_editor.execute(
+            f'CREATE INDEX {table}_user_lower_name ON {table} '
+            f'(user_id, lower(name) text_pattern_ops)'
+        )
+        # fuzzy 검색용 trigram 인덱스.
+        schema_editor.execute(
+            f'CREATE INDEX {table}_name_trgm ON {table} '
+            f'USING gin (name gin_trgm_ops)'
+        )
+
+
+def drop_name_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in TABLES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {table}_user_lower_name')
+        schema_editor.execute(f'DROP INDEX IF EXISTS {table}_name_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_recipe_search_vector'),
+    ]
+
+    operations = [
+        # postgres가 아닌 db에서는 건너뛴다.
+        TrigramExtension(),
+        migrations.RunPython(create_name_indexes, drop_name_indexes),
+    ]
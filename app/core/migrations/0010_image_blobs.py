@@ -0,0 +1,52 @@
+# Generated by Django 2.1.15 on 2026-10-18 20:29
+
+import core.models
+import core.storage
+from collections import Counter
+
+from django.db import migrations, models
+
+
+# 이미 저장된 이미지도 레시피 수를 세어둔다. 기존 파일은 uuid 이름이라 각각 1개씩이다.
+def count_image_references(apps, schema_editor):
+    Recipe = apps.get_model('core', 'Recipe')
+    ImageBlob = apps.get_model('core', 'ImageBlob')
+    storage = Recipe._meta.get_field('image').storage
+    counts = Counter(
+        Recipe.objects.exclude(image__isnull=True).exclude(image='')
+        .values_list('image', flat=True)
+    )
+    ImageBlob.objects.bulk_create([
+        ImageBlob(
+            name=name,
+            refcount=count,
+            size=storage.size(name) if storage.exists(name) else 0
+        )
+        for name, count in counts.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recipe_image_renditions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.BigIntegerField()),
+                ('refcount', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(null=True, storage=core.storage.ContentAddressedStorage(), upload_to=core.models.recipe_image_file_path),
+        ),
+        migrations.RunPython(count_image_references, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 2.1.15 on 2026-10-18 20:32
+
+import core.models
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_image_blobs'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(null=True, storage=core.storage.RecipeImageStorage(), upload_to=core.models.recipe_image_file_path),
+        ),
+        migrations.AlterField(
+            model_name='recipeimagerendition',
+            name='file',
+            field=models.FileField(storage=core.storage.MediaStorage(), upload_to=core.models.recipe_rendition_file_path),
+        ),
+    ]
@@ -0,0 +1,115 @@
+# Generated by Django 2.1.15 on 2026-10-18 20:52
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# 모든 목록은 유저로 거르고 정렬한다. (테이블, 인덱스 이름, 컬럼)
+# 태그/재료 -> 레시피 방향의 중간 테이블 인덱스는 assigned_only와 태그/재료 필터에 쓰인다.
+# 자동으로 만들어진 중간 테이블은 모델 상태에 인덱스를 둘 수 없으므로 sql로만 만든다.
+INDEXES = (
+    ('core_tag', 'tag_user_name_idx', 'user_id, name'),
+    ('core_ingredient', 'ingredient_user_name_idx', 'user_id, name'),
+    ('core_recipe', 'recipe_user_id_idx', 'user_id, id'),
+    ('core_recipe_tags', 'core_recipe_tags_tag_recipe_idx',
+     'tag_id, recipe_id'),
+    ('core_recipe_ingredients', 'core_recipe_ingredients_ingredient_recipe_idx',
+     'ingredient_id, recipe_id'),
+)
+# 위의 인덱스가 user_id로 시작하므로 외래 키가 만든 user_id 인덱스는 필요 없다.
+OWNED_TABLES = ('core_tag', 'core_ingredient', 'core_recipe')
+
+
+# postgres에서는 CONCURRENTLY로 만들어 운영 중인 테이블에 쓰기 잠금을 걸지 않는다.
+# CONCURRENTLY는 트랜잭션 안에서 쓸 수 없으므로 이 마이그레이션은 atomic하지 않다.
+# 도중에 실패하면 INVALID 인덱스가 남으므로 그 인덱스를 지우고 다시 migrate한다.
+def concurrently(schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        return ' CONCURRENTLY'
+    return ''
+
+
+def user_indexes(schema_editor, table):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    return [
+        name for name, constraint in constraints.items()
+        if constraint['index'] and constraint['columns'] == ['user_id'] and
+        not constraint['unique']
+    ]
+
+
+def create_indexes(apps, schema_editor):
+    for table, name, columns in INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX{concurrently(schema_editor)} IF NOT EXISTS '
+            f'{name} ON {table} ({columns})'
+        )
+    # 새 인덱스가 다 만들어진 뒤에 지운다.
+    # AlterField는 외래 키 제약을 지웠다가 다시 만들면서 테이블 전체를 검사하므로 쓰지 않는다.
+    for table in OWNED_TABLES:
+        for name in user_indexes(schema_editor, table):
+            schema_editor.execute(
+                f'DROP INDEX{concurrently(schema_editor)} IF EXISTS {name}'
+            )
+
+
+def drop_indexes(apps, schema_editor):
+    for table in OWNED_TABLES:
+        schema_editor.execute(
+            f'CREATE INDEX{concurrently(schema_editor)} IF NOT EXISTS '
+            f'{table}_user_id ON {table} (user_id)'
+        )
+    for table, name, columns in INDEXES:
+        schema_editor.execute(
+            f'DROP INDEX{concurrently(schema_editor)} IF EXISTS {name}'
+        )
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0011_media_storage'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='ingredient',
+                    name='user',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+                ),
+                migrations.AlterField(
+                    model_name='recipe',
+                    name='user',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+                ),
+                migrations.AlterField(
+                    model_name='tag',
+                    name='user',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+                ),
+                migrations.AddIndex(
+                    model_name='ingredient',
+                    index=models.Index(fields=['user', 'name'], name='ingredient_user_name_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='recipe',
+                    index=models.Index(fields=['user', 'id'], name='recipe_user_id_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='tag',
+                    index=models.Index(fields=['user', 'name'], name='tag_user_name_idx'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_indexes, drop_indexes),
+            ],
+        ),
+    ]
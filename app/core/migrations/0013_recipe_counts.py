@@ -0,0 +1,39 @@
+# Generated by Django 2.1.15 on 2026-10-18 20:59
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+# 이미 있는 태그와 재료의 레시피 수를 센다.
+def fill_recipe_counts(apps, schema_editor):
+    Recipe = apps.get_model('core', 'Recipe')
+    for name, column in (('tags', 'tag_id'), ('ingredients', 'ingredient_id')):
+        field = Recipe._meta.get_field(name)
+        counts = field.remote_field.through.objects.filter(
+            **{column: OuterRef('pk')}
+        ).order_by().values(column).annotate(count=Count('*')).values('count')
+        field.related_model.objects.update(recipe_count=Coalesce(
+            Subquery(counts, output_field=IntegerField()), 0
+        ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_ownership_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='recipe_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipe_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_recipe_counts, migrations.RunPython.noop),
+    ]
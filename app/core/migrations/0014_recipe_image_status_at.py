@@ -0,0 +1,18 @@
+# Generated by Django 2.1.15 on 2026-10-18 21:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_recipe_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_status_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+    ]
@@ -3,12 +3,16 @@ import uuid
 # os 정확한 파일 경로를 가져오기 위해서
 import os
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
     PermissionsMixin
 
 # auth user model을 가져옴.
 from django.conf import settings
 
+from core.storage import MediaStorage, RecipeImageStorage
+
 
 def recipe_image_file_path(instance, filename):
     """Generate file path for new recipe image"""
@@ -19,6 +23,12 @@ def recipe_image_file_path(instance, filename):
     return os.path.join('uploads/recipe/', filename)
 
 
+def recipe_rendition_file_path(instance, filename):
+    """Generate file path for a content addressed recipe image rendition"""
+    # 파일 이름이 내용의 해시이므로 그대로 쓰고, 앞 두글자로 폴더를 나눈다.
+    return os.path.join('uploads/recipe/renditions/', filename[:2], filename)
+
+
 class UserManager(BaseUserManager):
 
     def create_user(self, email, password=None, **extra_fields):
@@ -56,10 +66,23 @@ class Tag(models.Model):
     """Tag to be used for a recipe"""
     name = models.CharField(max_length=255)
     # 유저를 직접 참조하는 것 보다, django settings에서 auth user model을 직접 가져온다.
+    # 유저로 거르는 조회는 (user, name) 인덱스를 쓰므로 user만의 인덱스는 만들지 않는다.
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
+        db_index=False,
     )
+    # 변경 시각. 클라이언트가 조건부 요청(ETag, Last-Modified)으로 재검증할 때 쓴다.
+    updated_at = models.DateTimeField(auto_now=True)
+    # 이 태그를 쓰는 레시피 수. 관계가 바뀔 때 시그널이 더하고 뺀다. (recipe.usage 참고)
+    # 값이 어긋난 채로 빼더라도 쓰기가 실패하지 않도록 음수를 막는 제약은 두지 않는다.
+    recipe_count = models.IntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            # 유저별 목록을 이름 순서로 읽는다. (마이그레이션 0012 참고)
+            models.Index(fields=['user', 'name'], name='tag_user_name_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -70,8 +93,18 @@ class Ingredient(models.Model):
     name = models.CharField(max_length=255)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_index=False,
     )
+    updated_at = models.DateTimeField(auto_now=True)
+    recipe_count = models.IntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'name'], name='ingredient_user_name_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -79,9 +112,11 @@ class Ingredient(models.Model):
 
 class Recipe(models.Model):
     """Recipe object"""
+    # 유저로 거르는 조회는 (user, id) 인덱스를 쓴다.
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_index=False,
     )
     title = models.CharField(max_length=255)
     time_minutes = models.IntegerField()
@@ -92,7 +127,83 @@ class Recipe(models.Model):
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
     # 함수()하지 않기. 참조를 전달할 함수만 전달. 왜냐하면 백그라운드에서 호출하기 위함.
-    image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    # 같은 사진은 한번만 저장되도록 내용의 해시로 파일 이름을 정한다.
+    image = models.ImageField(
+        null=True,
+        upload_to=recipe_image_file_path,
+        storage=RecipeImageStorage()
+    )
+    # 업로드된 이미지는 백그라운드에서 크기별로 변환된다. (recipe.images 참고)
+    IMAGE_NONE = 'none'
+    IMAGE_PENDING = 'pending'
+    IMAGE_PROCESSING = 'processing'
+    IMAGE_READY = 'ready'
+    IMAGE_FAILED = 'failed'
+    IMAGE_STATUS_CHOICES = (
+        (IMAGE_NONE, 'None'),
+        (IMAGE_PENDING, 'Pending'),
+        (IMAGE_PROCESSING, 'Processing'),
+        (IMAGE_READY, 'Ready'),
+        (IMAGE_FAILED, 'Failed'),
+    )
+    image_status = models.CharField(
+        max_length=20, choices=IMAGE_STATUS_CHOICES, default=IMAGE_NONE
+    )
+    # image_status가 바뀐 시각. 작업이 중간에 죽어서 pending, processing에 멈춘 것을 찾는다.
+    image_status_at = models.DateTimeField(null=True, editable=False)
+    # 원본 이미지의 크기(회전 정보를 적용한 뒤). 처리가 끝나야 채워진다.
+    image_width = models.PositiveIntegerField(null=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    # 전문 검색용 컬럼. 제목, 태그 이름, 재료 이름을 합친 것으로 시그널이 갱신한다.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # postgres에서만 만들어진다. (마이그레이션 0007 참고)
+            GinIndex(
+                fields=['search_vector'], name='recipe_search_vector_gin'
+            ),
+            # 유저별 목록을 최신순으로 읽는다.
+            models.Index(fields=['user', 'id'], name='recipe_user_id_idx'),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class RecipeImageRendition(models.Model):
+    """Resized copy of a recipe image in one size and format"""
+    recipe = models.ForeignKey(
+        'Recipe',
+        on_delete=models.CASCADE,
+        related_name='renditions'
+    )
+    # thumbnail, card, full
+    size = models.CharField(max_length=20)
+    # webp, jpeg
+    format = models.CharField(max_length=10)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    file = models.FileField(
+        upload_to=recipe_rendition_file_path,
+        storage=MediaStorage()
+    )
+
+    class Meta:
+        unique_together = (('recipe', 'size', 'format'),)
+
+    def __str__(self):
+        return f'{self.recipe_id} {self.size} {self.format}'
+
+
+class ImageBlob(models.Model):
+    """Stored image file shared by every recipe using the same content"""
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField()
+    # 이 파일을 쓰는 레시피 수. 0이 되면 파일을 지운다.
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,345 @@
+# 레시피 이미지 파일 저장소.
+# 실제로 파일을 두는 곳(로컬 파일 시스템 또는 S3 호환 저장소)은 RECIPE_IMAGE_STORAGE 설정으로 고른다.
+# 이미지는 내용 주소(content addressed)로 저장한다. 파일 이름이 내용의 sha256 해시이므로,
+# 같은 사진을 여러번 올려도 파일은 하나만 저장된다.
+# 해시는 파일을 조각(chunk)으로 읽으면서 계산하므로 큰 파일도 메모리에 올리지 않는다.
+# 몇 개의 레시피가 같은 파일을 쓰는지는 core.models.ImageBlob에 센다. (recipe.blobs 참고)
+# 로컬 저장소의 url에는 만료되는 서명(?sig=)을 붙인다. 서명이 맞는 요청만 파일을 받는다. (recipe.media 참고)
+import base64
+import hashlib
+import mimetypes
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, Storage
+from django.db import transaction
+from django.utils import baseconv
+from django.utils.deconstruct import deconstructible
+from django.utils.functional import cached_property
+from django.utils.http import urlencode
+
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+except ImportError:
+    # S3 저장소를 쓸 때만 필요하다.
+    boto3 = None
+
+MEDIA_SIGNING_SALT = 'core.media'
+# 파일을 읽을 때 이 크기까지만 메모리에 두고, 넘으면 임시 파일에 쓴다.
+SPOOL_SIZE = 1024 * 1024
+
+
+def content_hash(content):
+    """Return the sha256 hex digest of a file read in chunks"""
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    # chunks()는 처음부터 읽으므로, 저장할 때도 처음부터 다시 읽힌다.
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def media_url_max_age():
+    """Return the seconds a signed media url stays valid"""
+    return getattr(settings, 'MEDIA_URL_MAX_AGE', 24 * 60 * 60)
+
+
+class MediaSigner(signing.TimestampSigner):
+    """Timestamp signer rounding the time down to half the url lifetime"""
+
+    def timestamp(self):
+        # 같은 구간에서 만든 url은 같으므로 브라우저가 캐시한 것을 다시 쓸 수 있다.
+        # 구간의 처음 시각으로 서명하므로 url은 적어도 유효 시간의 절반 동안 쓸 수 있다.
+        step = max(media_url_max_age() // 2, 1)
+        return baseconv.base62.encode(int(time.time()) // step * step)
+
+
+def media_signature(name):
+    """Return the expiring signature authorizing access to a media file"""
+    # name:시각:서명 에서 이름을 뺀 시각:서명
+    signed = MediaSigner(salt=MEDIA_SIGNING_SALT).sign(name)
+    return signed[len(name) + 1:]
+
+
+def media_signature_expires_in(name, signature):
+    """Return the seconds a media signature stays valid, or None"""
+    max_age = media_url_max_age()
+    try:
+        MediaSigner(salt=MEDIA_SIGNING_SALT).unsign(
+            f'{name}:{signature}', max_age=max_age
+        )
+    except signing.BadSignature:
+        # 만료된 서명(SignatureExpired)도 여기에 들어간다.
+        return None
+    timestamp = baseconv.base62.decode(signature.split(':', 1)[0])
+    return max(int(timestamp + max_age - time.time()), 0)
+
+
+class ContentAddressedStorageMixin:
+    """Name saved files after the hash of their content"""
+
+    def content_name(self, name, content):
+        """Return the content addressed name for a file"""
+        return self.digest_name(name, content_hash(content))
+
+    def digest_name(self, name, digest):
+        """Return the content addressed name for a content digest"""
+        # 폴더와 확장자는 upload_to가 정한 것을 그대로 쓴다.
+        # uploads/recipe/ab/abcdef....jpg
+        dirname = os.path.dirname(name)
+        ext = os.path.splitext(name)[1].lower()
+        return os.path.join(dirname, digest[:2], f'{digest}{ext}')
+
+    def get_available_name(self, name, max_length=None):
+        # 같은 이름이면 같은 내용이므로 다른 이름을 찾지 않는다.
+        return name
+
+    def lock_content(self, name):
+        """Wait until no one else is deleting the file of a name"""
+
+    def _save(self, name, content):
+        name = self.content_name(name, content)
+        self.lock_content(name)
+        if self.exists(name):
+            # 이미 같은 내용이 저장되어 있으므로 쓰지 않는다.
+            return name
+        return super()._save(name, content)
+
+    def save_copy(self, source, name):
+        """Copy a stored file to the content addressed name of a name"""
+        # 파일을 저장소 밖으로 가져오지 않고 저장소 안에서 복사한다. (S3는 CopyObject)
+        name = self.digest_name(name, self.content_digest(source))
+        self.lock_content(name)
+        if not self.exists(name):
+            self.copy(source, name)
+        return name
+
+
+@deconstructible
+class ContentAddressedStorage(ContentAddressedStorageMixin,
+                              FileSystemStorage):
+    """File system storage deduplicating files by content"""
+
+
+@deconstructible
+class SignedFileSystemStorage(FileSystemStorage):
+    """File system storage whose urls carry an access signature"""
+
+    def url(self, name):
+        # 서명에는 시각이 들어가서 MEDIA_URL_MAX_AGE가 지나면 쓸 수 없다.
+        url = super().url(name)
+        return f'{url}?{urlencode({"sig": media_signature(name)})}'
+
+
+@deconstructible
+class S3Storage(Storage):
+    """Storage keeping files in an S3 compatible bucket"""
+
+    def __init__(self, bucket=None, endpoint_url=None, region=None,
+                 url_expire=None):
+        self.bucket = bucket or getattr(settings, 'AWS_S3_BUCKET', None)
+        # MinIO처럼 S3 호환 저장소를 쓸 때 설정한다.
+        self.endpoint_url = endpoint_url or \
+            getattr(settings, 'AWS_S3_ENDPOINT_URL', None)
+        self.region = region or getattr(settings, 'AWS_S3_REGION', None)
+        self.url_expire = url_expire or \
+            getattr(settings, 'AWS_S3_URL_EXPIRE', 3600)
+
+    @cached_property
+    def client(self):
+        if boto3 is None:
+            raise ImproperlyConfigured(
+                'The S3 storage backend requires boto3 to be installed.'
+            )
+        if not self.bucket:
+            raise ImproperlyConfigured('AWS_S3_BUCKET must be set.')
+        # 인증 정보는 boto3가 환경 변수(AWS_ACCESS_KEY_ID 등)에서 읽는다.
+        return boto3.client(
+            's3', endpoint_url=self.endpoint_url, region_name=self.region
+        )
+
+    def _open(self, name, mode='rb'):
+        body = self.client.get_object(Bucket=self.bucket, Key=name)['Body']
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        for chunk in iter(lambda: body.read(64 * 1024), b''):
+            spool.write(chunk)
+        spool.seek(0)
+        return File(spool, name)
+
+    def _save(self, name, content):
+        content.seek(0)
+        content_type = mimetypes.guess_type(name)[0] or \
+            'application/octet-stream'
+        # 큰 파일은 여러 조각(multipart)으로 나눠서 올라간다.
+        self.client.upload_fileobj(
+            content, self.bucket, name,
+            ExtraArgs={'ContentType': content_type}
+        )
+        return name
+
+    def delete(self, name):
+        self.client.delete_object(Bucket=self.bucket, Key=name)
+
+    def exists(self, name):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=name)
+        except ClientError as exc:
+            if exc.response['Error']['Code'] in ('404', 'NoSuchKey'):
+                return False
+            raise
+        return True
+
+    def size(self, name):
+        return self.client.head_object(
+            Bucket=self.bucket, Key=name
+        )['ContentLength']
+
+    def url(self, name):
+        return self.client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self.bucket, 'Key': name},
+            ExpiresIn=self.url_expire
+        )
+
+    def read_prefix(self, name, length):
+        """Return the first bytes of a file without downloading all of it"""
+        return self.client.get_object(
+            Bucket=self.bucket, Key=name, Range=f'bytes=0-{length - 1}'
+        )['Body'].read()
+
+    def content_digest(self, name):
+        """Return the sha256 hex digest of a file"""
+        # SHA256 체크섬과 함께 올린 객체는 HEAD만으로 해시를 알 수 있다.
+        # 여러 조각으로 올린 객체의 체크섬(...-N)은 조각 체크섬의 해시이므로 쓸 수 없다.
+        checksum = self.client.head_object(
+            Bucket=self.bucket, Key=name, ChecksumMode='ENABLED'
+        ).get('ChecksumSHA256')
+        if checksum and '-' not in checksum:
+            return base64.b64decode(checksum).hex()
+        # 체크섬이 없으면 읽으면서 해시를 계산한다. 파일은 메모리나 디스크에 모으지 않는다.
+        body = self.client.get_object(Bucket=self.bucket, Key=name)['Body']
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: body.read(64 * 1024), b''):
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    def copy(self, source, name):
+        """Copy a file inside the bucket"""
+        content_type = mimetypes.guess_type(name)[0] or \
+            'application/octet-stream'
+        self.client.copy_object(
+            Bucket=self.bucket, Key=name,
+            CopySource={'Bucket': self.bucket, 'Key': source},
+            ContentType=content_type, MetadataDirective='REPLACE'
+        )
+
+    def presigned_upload(self, name, content_type, max_bytes, expires):
+        """Return a form the client can post a file to directly"""
+        post = self.client.generate_presigned_post(
+            self.bucket, name,
+            Fields={'Content-Type': content_type},
+            Conditions=[
+                {'Content-Type': content_type},
+                ['content-length-range', 1, max_bytes],
+            ],
+            ExpiresIn=expires
+        )
+        return {'method': 'POST', 'url': post['url'], 'fields': post['fields']}
+
+
+STORAGE_BACKENDS = {
+    'local': SignedFileSystemStorage,
+    's3': S3Storage,
+}
+
+
+def get_storage_backend():
+    """Return a new instance of the configured media storage backend"""
+    name = getattr(settings, 'RECIPE_IMAGE_STORAGE', 'local')
+    try:
+        return STORAGE_BACKENDS[name]()
+    except KeyError:
+        raise ImproperlyConfigured(
+            f'Unknown RECIPE_IMAGE_STORAGE {name!r}. '
+            f'Use one of: {", ".join(STORAGE_BACKENDS)}.'
+        )
+
+
+class DelegatingStorage(Storage):
+    """Storage forwarding every operation to the configured backend"""
+    # 모델 필드에는 이 객체가 들어가므로 설정에 따라 마이그레이션이 바뀌지 않는다.
+
+    @cached_property
+    def backend(self):
+        return get_storage_backend()
+
+    def _open(self, name, mode='rb'):
+        return self.backend._open(name, mode)
+
+    def _save(self, name, content):
+        return self.backend._save(name, content)
+
+    def get_available_name(self, name, max_length=None):
+        return self.backend.get_available_name(name, max_length=max_length)
+
+    def delete(self, name):
+        self.backend.delete(name)
+
+    def exists(self, name):
+        return self.backend.exists(name)
+
+    def size(self, name):
+        return self.backend.size(name)
+
+    def url(self, name):
+        return self.backend.url(name)
+
+    def path(self, name):
+        return self.backend.path(name)
+
+    def read_prefix(self, name, length):
+        """Return the first bytes of a file"""
+        if hasattr(self.backend, 'read_prefix'):
+            return self.backend.read_prefix(name, length)
+        with self.open(name) as file:
+            return file.read(length)
+
+    def content_digest(self, name):
+        """Return the sha256 hex digest of a file"""
+        if hasattr(self.backend, 'content_digest'):
+            return self.backend.content_digest(name)
+        with self.open(name) as file:
+            return content_hash(file)
+
+    def copy(self, source, name):
+        """Copy a file to a new name"""
+        if hasattr(self.backend, 'copy'):
+            return self.backend.copy(source, name)
+        with self.open(source) as file:
+            self.backend._save(name, file)
+
+
+@deconstructible
+class MediaStorage(DelegatingStorage):
+    """Storage for recipe media on the configured backend"""
+
+
+@deconstructible
+class RecipeImageStorage(ContentAddressedStorageMixin, MediaStorage):
+    """Content addressed storage for recipe images"""
+
+    def lock_content(self, name):
+        # 같은 파일을 고아 파일로 지우는 중일 수 있으므로 ImageBlob 행을 잠근 뒤에 있는지 확인한다.
+        # 잠금은 트랜잭션이 끝날 때까지 유지되므로, 참조 수를 올리는 것까지 같은 트랜잭션에서 한다.
+        # core.models가 이 모듈을 가져오므로 여기서 가져온다.
+        from core.models import ImageBlob
+        if transaction.get_connection().in_atomic_block:
+            ImageBlob.objects.select_for_update().filter(
+                name=name
+            ).values_list('pk', flat=True).first()
@@ -4,14 +4,26 @@
 # 따라서 프로젝트의 안정성을 향상시키기 위해서 docker compose에서 실행할 모든 명령 전에
 # 이 도우미 명령을 추가하고, 데이터베이스에 엑세스 하기 전에 준비가 되었는지를 확인한다.
 
-# 먼저, patch func. 이것을 통해 우리는 django get database function의 행동을 mock할 수 있다.
+# 먼저, patch func. 이것을 통해 우리는 db에 SELECT 1을 보내는 check_database의 행동을 mock할 수 있다.
 # 이렇게 하면 기본적으로 명령을 테스트할 때, 사용할 수 있는 데이터베이스와 사용할 수 없는 데이터베이스를 시뮬레이션 할 수 있다.
-from unittest.mock import patch
+import asyncio
+import threading
+from io import StringIO
+from unittest.mock import Mock, patch
 # 밑에 call command function을 추가할 것이다. 소스코드의 호출을 허용해준다.
-from django.core.management import call_command
+from django.core.management import CommandError, call_command
 # 여기서 데이터베이스를 사용할 수 없을 때 operation error을 가져온다. 이걸로 데이터베이스의 사용가능 여부를 테스트한다.
 from django.db.utils import OperationalError
-from django.test import TestCase
+from django.test import TestCase, override_settings
+
+from app.asgi import ThreadPoolWsgiToAsgi
+from app.gunicorn_conf import ASGI_WORKER_CLASS, default_workers, \
+    on_starting
+
+
+CHECK_DATABASE = 'core.management.commands.wait_for_db.check_database'
+PENDING_MIGRATIONS = 'core.management.commands.wait_for_db.pending_migrations'
+DISCARD_CONNECTION = 'core.management.commands.wait_for_db.discard_connection'
 
 
 class CommandTests(TestCase):
@@ -20,24 +32,150 @@ class CommandTests(TestCase):
     def test_wait_for_db_ready(self):
         """Test waiting for db when db is available"""
         # 여기서 테스트를 setup하려면, 데이터베이스가 사용가능할 때 django의 동작을 시뮬레이션해야한다.
-        # 관리 명령어는 기본적으로 django에서 데이터베이스 연결을 검색하여 언제 데이터베이스 연결을 검색할 지 여부를 확인한다.
-        # 따라서 테스트를 설정하기 위해 ConnectionHandler의 동작을 오버라이드할 것이다.
-        # true 반환할 거고, exception을 반환하지 않을 것이다.
-
-        # github에 djagno 코드가 있으니 참고하고, 여기서 실제로 호출되는 함수는 getitem이다.
+        # 관리 명령어는 check_database로 실제로 쿼리를 보내서 데이터베이스가 준비되었는지 확인한다.
+        # exception을 반환하지 않으면 사용 가능한 것이다.
         # patch를 사용함으로써, 우리가 지정한 값을 반환할 수도 있고, 몇번 호출되었는지 등 모니터링도 가능해진다.
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.return_value = True
+        with patch(CHECK_DATABASE) as check:
             # wait_for_db는 우리가 만들 management 명령의 이름
-            call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 1)
+            call_command('wait_for_db', stdout=StringIO())
+            check.assert_called_once_with('default')
 
     # db 명령을 기다리는 동안 데이터베이스가 5번 시도되고, 6번째일 때 성공한다.
     # patch 데코레이터를 걸어놓으면 실행할 때의 시간이 줄어듦.
     @patch('time.sleep', return_value=True)
     def test_wait_for_db(self, ts):
         """Test waiting for db"""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
-            call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 6)
+        with patch(CHECK_DATABASE) as check:
+            check.side_effect = [OperationalError] * 5 + [None]
+            call_command('wait_for_db', stdout=StringIO())
+            self.assertEqual(check.call_count, 6)
+        # 기다리는 시간은 지수적으로 늘어나되 최대값을 넘지 않는다.
+        waits = [call[0][0] for call in ts.call_args_list]
+        self.assertEqual(len(waits), 5)
+        self.assertTrue(all(0 <= wait <= 1.6 for wait in waits))
+
+    @patch('time.sleep', return_value=True)
+    @patch('time.monotonic', side_effect=range(0, 1000, 10))
+    def test_wait_for_db_timeout(self, tm, ts):
+        """Test waiting for db gives up after the timeout"""
+        with patch(CHECK_DATABASE, side_effect=OperationalError):
+            with self.assertRaises(CommandError):
+                call_command(
+                    'wait_for_db', '--timeout', '30', stdout=StringIO()
+                )
+
+    # 테스트에는 replica db가 없으므로 연결을 닫는 것도 mock한다.
+    @patch(DISCARD_CONNECTION)
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_migrations(self, ts, dc):
+        """Test waiting until every database has no pending migrations"""
+        with patch(CHECK_DATABASE) as check, \
+                patch(PENDING_MIGRATIONS) as pending:
+            pending.side_effect = [['core.0001_initial'], [], []]
+            call_command(
+                'wait_for_db', '--database', 'default',
+                '--database', 'replica', '--wait-for-migrations',
+                stdout=StringIO()
+            )
+
+        self.assertEqual(
+            [call[0][0] for call in check.call_args_list],
+            ['default', 'default', 'replica']
+        )
+
+
+class ServeCommandTests(TestCase):
+
+    def _config(self, *args):
+        out = StringIO()
+        call_command('serve', '--print-config', *args, stdout=out)
+        return out.getvalue()
+
+    def test_serve_config(self):
+        """Test the server preloads the app with the given workers"""
+        config = self._config('--workers', '3', '--bind', '127.0.0.1:9000')
+
+        self.assertIn('workers = 3', config)
+        self.assertIn("bind = ['127.0.0.1:9000']", config)
+        self.assertIn('preload_app = True', config)
+
+    def test_serve_asgi(self):
+        """Test the ASGI mode uses uvicorn workers"""
+        config = self._config('--asgi')
+
+        self.assertIn(f'worker_class_str = {ASGI_WORKER_CLASS}', config)
+
+    def test_default_workers(self):
+        """Test the number of workers follows the cpu count"""
+        self.assertEqual(default_workers('sync', cpu_count=4), 9)
+        self.assertEqual(default_workers('gthread', cpu_count=4), 5)
+
+    def test_serve_requires_shared_cache(self):
+        """Test several workers do not start with a per process cache"""
+        server = Mock()
+        server.cfg.workers = 1
+        on_starting(server)
+
+        server.cfg.workers = 3
+        with self.assertRaises(SystemExit):
+            on_starting(server)
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': '/tmp/recipe-app-cache',
+        }}):
+            on_starting(server)
+
+    def test_serve_runs_gunicorn(self):
+        """Test the command starts the gunicorn arbiter"""
+        target = 'core.management.commands.serve.DjangoApplication.run'
+        with patch(target) as run:
+            call_command('serve')
+
+        run.assert_called_once()
+
+
+class AsgiApplicationTests(TestCase):
+
+    def test_slow_requests_overlap(self):
+        """Test slow requests are served at the same time"""
+        started = []
+        both_started = threading.Event()
+        overlapped = []
+
+        # 두 요청이 동시에 실행되어야 서로를 기다리지 않고 끝난다.
+        def wsgi_app(environ, start_response):
+            started.append(environ['PATH_INFO'])
+            if len(started) == 2:
+                both_started.set()
+            overlapped.append(both_started.wait(timeout=1))
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return [b'ok']
+
+        application = ThreadPoolWsgiToAsgi(wsgi_app, threads=2)
+
+        async def request(path):
+            messages = []
+
+            async def receive():
+                return {'type': 'http.request', 'body': b''}
+
+            async def send(message):
+                messages.append(message)
+
+            scope = {
+                'type': 'http', 'method': 'GET', 'path': path,
+                'query_string': b'', 'http_version': '1.1', 'headers': [],
+            }
+            await application(scope, receive, send)
+            return messages
+
+        async def both():
+            return await asyncio.gather(request('/a'), request('/b'))
+
+        responses = asyncio.get_event_loop().run_until_complete(both())
+
+        self.assertEqual(overlapped, [True, True])
+        self.assertEqual(
+            [messages[0]['status'] for messages in responses], [200, 200]
+        )
+        self.assertEqual(responses[0][1]['body'], b'ok')
@@ -0,0 +1,228 @@
+import threading
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.db import connection, connections
+from django.test import TestCase, override_settings
+
+from psycopg2 import extensions
+
+from core.db.pool import ConnectionMetrics, ConnectionPool, PoolTimeout, \
+    pools
+from core.db.routers import ReplicaRouter, replica_aliases, \
+    replica_reads, replica_reads_enabled
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.closed = 0
+
+    def close(self):
+        self.closed = 1
+
+
+class ConnectionPoolTests(TestCase):
+    """Test the database connection pool"""
+
+    def test_reuse_released_connection(self):
+        """Test released connections are handed out again"""
+        pool = ConnectionPool(FakeConnection, size=2)
+
+        conn, reused = pool.acquire()
+        self.assertFalse(reused)
+        pool.release(conn)
+        again, reused = pool.acquire()
+
+        self.assertIs(again, conn)
+        self.assertTrue(reused)
+
+    def test_pool_size_limit(self):
+        """Test acquiring waits for a free connection and times out"""
+        pool = ConnectionPool(FakeConnection, size=1, timeout=0.01)
+        pool.acquire()
+
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+
+    def test_failed_check_discards_connection(self):
+        """Test connections failing the health check are replaced"""
+        pool = ConnectionPool(
+            FakeConnection, size=1, check=lambda conn: False
+        )
+        conn, _ = pool.acquire()
+        pool.release(conn)
+
+        new, reused = pool.acquire()
+
+        self.assertIsNot(new, conn)
+        self.assertFalse(reused)
+        self.assertTrue(conn.closed)
+
+    def test_check_runs_outside_lock(self):
+        """Test other threads can use the pool during a health check"""
+        acquired = []
+
+        def try_lock():
+            acquired.append(pool._condition.acquire(timeout=1))
+            if acquired[-1]:
+                pool._condition.release()
+
+        def check(conn):
+            # 확인하는 동안 다른 스레드가 풀의 잠금을 얻을 수 있어야 한다.
+            thread = threading.Thread(target=try_lock)
+            thread.start()
+            thread.join()
+            return True
+
+        pool = ConnectionPool(FakeConnection, size=1, check=check)
+        conn, _ = pool.acquire()
+        pool.release(conn)
+        pool.acquire()
+
+        self.assertEqual(acquired, [True])
+
+    def test_recycle_old_connections(self):
+        """Test connections older than the recycle age are closed"""
+        pool = ConnectionPool(FakeConnection, size=1, recycle=0)
+        conn, _ = pool.acquire()
+
+        pool.release(conn)
+
+        self.assertTrue(conn.closed)
+        self.assertFalse(pool.acquire()[1])
+
+    def test_forked_pool_drops_parent_connections(self):
+        """Test a pool used after fork does not reuse or close them"""
+        pool = ConnectionPool(FakeConnection, size=1)
+        conn, _ = pool.acquire()
+        pool.release(conn)
+        pool.pid = -1
+
+        new, reused = pool.acquire()
+
+        self.assertIsNot(new, conn)
+        self.assertFalse(conn.closed)
+
+    def test_metrics_snapshot(self):
+        """Test the reuse ratio and acquire times are reported"""
+        metrics = ConnectionMetrics()
+        metrics.record_acquire(0.004, False)
+        metrics.record_acquire(0.002, True)
+        metrics.record_acquire(0.000, True)
+        metrics.record_acquire(0.002, True)
+
+        snapshot = metrics.snapshot()
+
+        self.assertEqual(snapshot['acquired'], 4)
+        self.assertEqual(snapshot['reuse_ratio'], 0.75)
+        self.assertEqual(snapshot['acquire_ms_avg'], 2.0)
+        self.assertEqual(snapshot['acquire_ms_max'], 4.0)
+
+
+class ReplicaRouterTests(TestCase):
+    """Test routing reads to replicas"""
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_reads_use_primary_by_default(self):
+        """Test reads go to the primary unless replicas are allowed"""
+        with patch.object(self.router, 'choose_replica') as choose:
+            self.assertIsNone(self.router.db_for_read(None))
+
+        choose.assert_not_called()
+
+    def test_replica_reads(self):
+        """Test reads go to a replica inside replica_reads"""
+        target = 'core.db.routers.replica_aliases'
+        with patch(target, return_value=['replica']), replica_reads():
+            self.assertEqual(self.router.db_for_read(None), 'replica')
+            self.assertEqual(self.router.db_for_write(None), 'default')
+
+        self.assertFalse(replica_reads_enabled())
+
+    @override_settings(DATABASE_REPLICAS=['default'])
+    def test_mirror_is_not_a_replica(self):
+        """Test a replica pointing at the primary is not used"""
+        self.assertEqual(replica_aliases(), [])
+        with replica_reads():
+            self.assertIsNone(self.router.db_for_read(None))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'PostgreSQL only')
+class DatabaseWrapperTests(TestCase):
+    """Test the health checked postgres backend"""
+
+    def _wrapper(self, **settings):
+        # 테스트 트랜잭션 밖에서 쓰는 별도의 연결
+        wrapper = connections['default'].__class__(
+            {**connection.settings_dict, **settings}, alias='default'
+        )
+
+        def close():
+            wrapper.close()
+            if wrapper.pool is not None:
+                pools.pop('default').close()
+
+        self.addCleanup(close)
+        return wrapper
+
+    def test_health_check_replaces_broken_connection(self):
+        """Test an unusable connection is replaced on the next request"""
+        wrapper = self._wrapper(CONN_HEALTH_CHECKS=True)
+        wrapper.ensure_connection()
+        broken = wrapper.connection
+        failures = wrapper.metrics.health_check_failures
+
+        # 요청이 끝나고 다음 요청이 시작된다.
+        wrapper.close_if_unusable_or_obsolete()
+        with patch.object(wrapper, 'is_usable', return_value=False):
+            wrapper.ensure_connection()
+
+        self.assertIsNot(wrapper.connection, broken)
+        self.assertEqual(
+            wrapper.metrics.health_check_failures, failures + 1
+        )
+
+    def test_persistent_connection_reused(self):
+        """Test a persistent connection is reused by the next request"""
+        wrapper = self._wrapper(CONN_MAX_AGE=60)
+        wrapper.ensure_connection()
+        conn = wrapper.connection
+        reused = wrapper.metrics.reused
+
+        wrapper.close_if_unusable_or_obsolete()
+        wrapper.ensure_connection()
+
+        self.assertIs(wrapper.connection, conn)
+        self.assertEqual(wrapper.metrics.reused, reused + 1)
+
+    def test_pooled_connection_returned_after_request(self):
+        """Test pooled connections go back to the pool after a request"""
+        wrapper = self._wrapper(POOL={'SIZE': 1})
+        wrapper.ensure_connection()
+        conn = wrapper.connection
+
+        wrapper.close_if_unusable_or_obsolete()
+        self.assertIsNone(wrapper.connection)
+        wrapper.ensure_connection()
+
+        self.assertIs(wrapper.connection, conn)
+        self.assertTrue(wrapper.reused_from_pool)
+
+    def test_pooled_connection_isolation_level(self):
+        """Test pooled connections use the isolation level in OPTIONS"""
+        level = extensions.ISOLATION_LEVEL_SERIALIZABLE
+        wrapper = self._wrapper(
+            POOL={'SIZE': 1}, OPTIONS={'isolation_level': level}
+        )
+
+        # 격리 수준은 트랜잭션을 시작할 때 적용된다.
+        wrapper.set_autocommit(False)
+        with wrapper.cursor() as cursor:
+            cursor.execute('SHOW transaction_isolation')
+            self.assertEqual(cursor.fetchone()[0], 'serializable')
+        wrapper.rollback()
+        wrapper.set_autocommit(True)
+        self.assertEqual(wrapper.isolation_level, level)
@@ -0,0 +1,46 @@
+from unittest.mock import patch
+
+from django.db.utils import OperationalError
+from django.test import TestCase
+from django.urls import reverse
+
+from core.health import check_database, pending_migrations
+
+
+class HealthTests(TestCase):
+    """Test the health check endpoints"""
+
+    def test_healthz(self):
+        """Test the liveness check does not touch the database"""
+        with self.assertNumQueries(0):
+            res = self.client.get(reverse('healthz'))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json(), {'status': 'ok'})
+        self.assertIn('no-cache', res['Cache-Control'])
+
+    def test_readyz(self):
+        """Test the readiness check queries every database"""
+        res = self.client.get(reverse('readyz'))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res.json()['databases']['default']['ok'])
+
+    def test_readyz_database_unavailable(self):
+        """Test the readiness check fails when a database is down"""
+        with patch('core.health.check_database') as check:
+            check.side_effect = OperationalError
+            res = self.client.get(reverse('readyz'))
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json()['status'], 'unavailable')
+        self.assertEqual(
+            res.json()['databases']['default']['error'], 'OperationalError'
+        )
+
+    def test_database_checks(self):
+        """Test a query is run and no migrations are pending"""
+        with self.assertNumQueries(1):
+            check_database('default')
+
+        self.assertEqual(pending_migrations('default'), [])
@@ -0,0 +1,37 @@
+import hashlib
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import TestCase
+
+from core.storage import ContentAddressedStorage
+
+
+class ContentAddressedStorageTests(TestCase):
+    """Test naming stored files after their content"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.storage = ContentAddressedStorage(location=self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_name_is_content_hash(self):
+        """Test the file name is the sha256 of the content"""
+        digest = hashlib.sha256(b'content').hexdigest()
+
+        name = self.storage.save(
+            'uploads/recipe/x.JPG', ContentFile(b'content')
+        )
+
+        self.assertEqual(name, f'uploads/recipe/{digest[:2]}/{digest}.jpg')
+
+    def test_same_content_saved_once(self):
+        """Test saving identical content returns the existing name"""
+        name1 = self.storage.save('a/one.txt', ContentFile(b'content'))
+        name2 = self.storage.save('a/two.txt', ContentFile(b'content'))
+        name3 = self.storage.save('a/three.txt', ContentFile(b'other'))
+
+        self.assertEqual(name1, name2)
+        self.assertNotEqual(name1, name3)
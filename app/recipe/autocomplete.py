@@ -0,0 +1,99 @@
+# 태그, 재료 이름 자동완성.
+# 입력 중인 글자로 시작하는 이름(prefix) 또는 철자가 비슷한 이름(fuzzy)을 상위 N개만 돌려준다.
+# postgres에서는 (user_id, lower(name)) btree 인덱스와 pg_trgm GIN 인덱스를 쓴다.
+# (마이그레이션 0008 참고)
+# 다른 db에서는 istartswith와 difflib로 대신한다.
+import difflib
+
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connections
+from django.db.models.functions import Lower
+from django.utils.translation import ugettext_lazy as _
+
+from rest_framework import serializers
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+
+MODE_PREFIX = 'prefix'
+MODE_FUZZY = 'fuzzy'
+MODE_CHOICES = (MODE_PREFIX, MODE_FUZZY)
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+# pg_trgm.similarity_threshold의 기본값과 같다.
+SIMILARITY_THRESHOLD = 0.3
+
+
+def parse_limit(value):
+    """Convert the limit query param to a bounded integer"""
+    if value is None:
+        return DEFAULT_LIMIT
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_LIMIT:
+        raise serializers.ValidationError({
+            'limit': [_('Expected an integer between 1 and %d.') % MAX_LIMIT]
+        })
+    return limit
+
+
+def _fallback_fuzzy(queryset, q, limit):
+    """Rank names by similarity in python"""
+    q = q.lower()
+    ranks = {}
+    for obj_id, name in queryset.values_list('id', 'name'):
+        ratio = difflib.SequenceMatcher(None, q, name.lower()).ratio()
+        if ratio >= SIMILARITY_THRESHOLD:
+            ranks[obj_id] = (-ratio, name)
+    top = sorted(ranks, key=lambda obj_id: ranks[obj_id])[:limit]
+    objs = queryset.in_bulk(top)
+    return [objs[obj_id] for obj_id in top]
+
+
+def autocomplete(queryset, q, mode=MODE_PREFIX, limit=DEFAULT_LIMIT):
+    """Return the objects whose names best complete q"""
+    postgres = connections[queryset.db].vendor == 'postgresql'
+    if mode == MODE_PREFIX:
+        if postgres:
+            # lower(name) LIKE 'q%' 는 (user_id, lower(name)) 인덱스를 쓴다.
+            queryset = queryset.annotate(lower_name=Lower('name')).filter(
+                lower_name__startswith=q.lower()
+            )
+        else:
+            queryset = queryset.filter(name__istartswith=q)
+        return list(queryset.order_by('name', 'id')[:limit])
+
+    if not postgres:
+        return _fallback_fuzzy(queryset, q, limit)
+    # % 연산자(trigram_similar)는 GIN 인덱스로 후보를 찾고, 유사도로 정렬한다.
+    return list(queryset.filter(name__trigram_similar=q).annotate(
+        similarity=TrigramSimilarity('name', q)
+    ).order_by('-similarity', 'name', 'id')[:limit])
+
+
+class AutocompleteMixin:
+    """Autocomplete the names of user owned objects"""
+
+    # ?q=입력한 글자&mode=prefix|fuzzy&limit=10
+    @action(methods=['GET'], detail=False, url_path='autocomplete')
+    def autocomplete(self, request):
+        """Return the top matching names for the given query"""
+        mode = request.query_params.get('mode', MODE_PREFIX)
+        if mode not in MODE_CHOICES:
+            raise serializers.ValidationError({
+                'mode': [_('Expected one of: prefix, fuzzy.')]
+            })
+        limit = parse_limit(request.query_params.get('limit'))
+        q = request.query_params.get('q', '').strip()
+        if not q:
+            return Response([])
+
+        objs = autocomplete(
+            self.queryset.filter(user=request.user).only('id', 'name'),
+            q, mode, limit
+        )
+        serializer = self.get_serializer(objs, many=True)
+        return Response(serializer.data)
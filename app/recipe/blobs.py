@@ -0,0 +1,80 @@
+# 레시피 이미지 파일의 참조 수 관리.
+# 같은 내용의 이미지는 하나의 파일을 같이 쓰므로, 어떤 레시피가 이미지를 바꾸거나 지워져도
+# 다른 레시피가 쓰고 있으면 파일을 지우면 안된다. 그래서 파일마다 쓰는 레시피 수를 센다.
+# 수가 0이 된 파일(고아 파일)은 트랜잭션이 커밋된 뒤에 지운다.
+# 같은 내용을 새로 올리는 요청과 겹치지 않도록, 파일을 지우는 것과 참조 수를 올리는 것은
+# 모두 ImageBlob 행을 잠그고 한다. 저장소도 파일이 있는지 보기 전에 같은 행을 잠근다.
+# (core.storage.RecipeImageStorage 참고)
+from django.db import transaction
+from django.db.models import BigIntegerField, Count, ExpressionWrapper, \
+    F, Sum
+
+from core.models import ImageBlob, Recipe
+
+
+def _storage():
+    return Recipe._meta.get_field('image').storage
+
+
+def retain_image(name):
+    """Count one more recipe using an image file"""
+    with transaction.atomic():
+        while True:
+            # 같은 파일을 처음 올리는 요청 둘이 동시에 행을 만들면 하나는 unique 제약에 걸린다.
+            # get_or_create는 그때 다른 요청이 만든 행을 가져오므로 그 행의 수를 올린다.
+            # 크기는 행을 만들 때만 저장소에서 읽는다.
+            blob, created = ImageBlob.objects.get_or_create(
+                name=name, defaults={
+                    'size': lambda: _storage().size(name), 'refcount': 1
+                }
+            )
+            if created:
+                return
+            # update()는 행을 잠그므로, 고아 파일로 지우는 중이면 끝날 때까지 기다린다.
+            # 그 사이에 행이 지워졌으면 다시 만든다.
+            if ImageBlob.objects.filter(pk=blob.pk).update(
+                refcount=F('refcount') + 1
+            ):
+                return
+
+
+def release_image(name):
+    """Count one less recipe using an image file"""
+    ImageBlob.objects.filter(name=name, refcount__gt=0).update(
+        refcount=F('refcount') - 1
+    )
+    transaction.on_commit(lambda: delete_orphan(name))
+
+
+def delete_orphan(name):
+    """Delete an image file once no recipe uses it"""
+    with transaction.atomic():
+        blob = ImageBlob.objects.select_for_update().filter(name=name).first()
+        if blob is None or blob.refcount > 0:
+            return
+        # 참조 수를 올리기 전에 같은 파일로 저장된 레시피가 있을 수 있으므로 한번 더 확인한다.
+        if Recipe.objects.filter(image=name).exists():
+            return
+        # 잠금을 가진 채로 지워야 같은 내용을 올리는 요청이 지운 뒤에 파일을 다시 쓴다.
+        _storage().delete(name)
+        blob.delete()
+
+
+def storage_report():
+    """Return the bytes stored and the bytes saved by deduplication"""
+    totals = ImageBlob.objects.filter(refcount__gt=0).aggregate(
+        files=Count('id'),
+        stored=Sum('size'),
+        # 중복을 없애지 않았다면 저장했을 크기
+        referenced=Sum(ExpressionWrapper(
+            F('size') * F('refcount'), output_field=BigIntegerField()
+        )),
+    )
+    stored = totals['stored'] or 0
+    referenced = totals['referenced'] or 0
+    return {
+        'files': totals['files'],
+        'stored_bytes': stored,
+        'referenced_bytes': referenced,
+        'saved_bytes': referenced - stored,
+    }
@@ -0,0 +1,178 @@
+# 여러 객체를 한번의 요청으로 생성, 수정, 삭제하는 기능.
+# 가져오기(import) 작업처럼 많은 객체를 쓸 때, 객체마다 요청을 보내면 인증, 검증, INSERT가 매번 반복된다.
+# 여기서는 한 트랜잭션 안에서 bulk_create와 CASE WHEN UPDATE로 묶어서 처리한다.
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, Value, When
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from core.models import Recipe
+from recipe.cache import bump_data_version_on_commit
+from recipe.queries import plan_queryset
+from recipe.search import recipes_using, update_search_vectors
+from recipe.usage import COUNTED_RELATIONS, count_replaced_links
+
+
+BULK_BATCH_SIZE = getattr(settings, 'RECIPE_BULK_BATCH_SIZE', 500)
+
+
+def bulk_create(model, objs):
+    """Insert objects in batches and make sure their ids are set"""
+    # postgres는 INSERT ... RETURNING으로 id를 돌려주지만, 지원하지 않는 db는 하나씩 저장한다.
+    # N:N 관계를 넣으려면 id가 꼭 필요하기 때문이다.
+    if connection.features.can_return_ids_from_bulk_insert:
+        return model.objects.bulk_create(objs, batch_size=BULK_BATCH_SIZE)
+    for obj in objs:
+        obj.save(force_insert=True)
+    return objs
+
+
+def bulk_update(model, objs, field_names):
+    """Update the given fields of many objects with one query per batch"""
+    fields = [model._meta.get_field(name) for name in field_names]
+    extra = {}
+    if any(f.name == 'updated_at' for f in model._meta.concrete_fields):
+        # update()는 auto_now를 적용하지 않으므로 직접 넣는다.
+        extra['updated_at'] = timezone.now()
+
+    for start in range(0, len(objs), BULK_BATCH_SIZE):
+        batch = objs[start:start + BULK_BATCH_SIZE]
+        # postgres는 CASE의 결과를 text로 보므로 컬럼 타입으로 변환한다.
+        updates = {
+            field.attname: Cast(Case(
+                *[When(pk=obj.pk, then=Value(
+                    getattr(obj, field.attname), output_field=field
+                )) for obj in batch],
+                output_field=field
+            ), output_field=field)
+            for field in fields
+        }
+        model.objects.filter(pk__in=[obj.pk for obj in batch]).update(
+            **updates, **extra
+        )
+
+
+def set_many_related(model, name, related_ids):
+    """Replace a many to many relation of many objects at once"""
+    # related_ids는 {객체 id: [관계 객체 id 목록]} 형태이다.
+    field = model._meta.get_field(name)
+    through = field.remote_field.through
+    source = field.m2m_column_name()
+    target = field.m2m_reverse_name()
+
+    links = through.objects.filter(**{f'{source}__in': list(related_ids)})
+    counted = model is Recipe and name in COUNTED_RELATIONS
+    # 시그널이 발생하지 않으므로 태그와 재료의 레시피 수를 직접 바꾼다.
+    old_links = list(links.values_list(source, target)) if counted else []
+    links.delete()
+    new_links = [
+        (obj_id, related_id)
+        for obj_id, ids in related_ids.items()
+        for related_id in ids
+    ]
+    through.objects.bulk_create(
+        [
+            through(**{source: obj_id, target: related_id})
+            for obj_id, related_id in new_links
+        ],
+        batch_size=BULK_BATCH_SIZE
+    )
+    if counted:
+        count_replaced_links(name, old_links, new_links)
+    if any(f.name == 'updated_at' for f in model._meta.concrete_fields):
+        # 관계만 바뀌어도 상세 응답이 달라지므로 변경 시각(ETag, Last-Modified)을 바꾼다.
+        model.objects.filter(pk__in=list(related_ids)).update(
+            updated_at=timezone.now()
+        )
+
+
+class BulkIdListSerializer(serializers.Serializer):
+    """Serializer for the ids of objects to delete"""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        max_length=getattr(settings, 'RECIPE_BULK_MAX_ITEMS', 1000),
+        allow_empty=False
+    )
+
+
+class BulkModelMixin:
+    """Create, update and delete many user owned objects in one request"""
+    # 입력을 검증하고 저장하는 시리얼라이저. 응답은 serializer_class로 만든다.
+    bulk_serializer_class = None
+
+    def get_bulk_serializer(self, *args, **kwargs):
+        kwargs['context'] = self.get_serializer_context()
+        kwargs['many'] = True
+        return self.bulk_serializer_class(*args, **kwargs)
+
+    def _bulk_response(self, objs, status_code):
+        # 저장한 객체를 다시 가져와서 목록과 같은 형태로 돌려준다. 관계는 한번에 가져온다.
+        # 주소를 절대 경로로 만들 수 있도록 요청을 context로 넘긴다.
+        context = self.get_serializer_context()
+        queryset = plan_queryset(
+            self.queryset.filter(id__in=[obj.id for obj in objs]),
+            self.serializer_class, context
+        )
+        order = {obj.id: index for index, obj in enumerate(objs)}
+        objs = sorted(queryset, key=lambda obj: order[obj.id])
+        serializer = self.serializer_class(objs, many=True, context=context)
+        return Response(serializer.data, status=status_code)
+
+    # 배열을 POST하면 생성, PATCH하면 수정, DELETE로 id 목록을 보내면 삭제한다.
+    @action(methods=['POST', 'PATCH', 'DELETE'], detail=False, url_path='bulk')
+    def bulk(self, request):
+        """Create, update or delete many objects at once"""
+        if request.method == 'DELETE':
+            return self.bulk_destroy(request)
+
+        partial = request.method == 'PATCH'
+        instance = None
+        if partial:
+            # 요청에 들어있는 id의 객체들을 한번에 가져온다. 잘못된 id는 검증에서 걸러진다.
+            ids = [
+                item.get('id') for item in request.data
+                if isinstance(item, dict) and isinstance(item.get('id'), int)
+            ] if isinstance(request.data, list) else []
+            instance = self.queryset.filter(user=request.user, id__in=ids)
+
+        serializer = self.get_bulk_serializer(
+            instance, data=request.data, partial=partial
+        )
+        serializer.is_valid(raise_exception=True)
+        # 하나라도 실패하면 전부 취소된다.
+        with transaction.atomic():
+            objs = serializer.save(user=request.user)
+            # bulk_create, update()와 중간 테이블 쓰기는 시그널이 발생하지 않으므로
+            # 검색 컬럼도 직접 다시 만든다. 태그와 재료는 그것을 쓰는 레시피를 다시 만든다.
+            update_search_vectors(recipes_using(
+                self.queryset.model, [obj.id for obj in objs]
+            ))
+        # 같은 이유로 캐시 버전도 직접 올린다.
+        bump_data_version_on_commit(request.user.id)
+
+        return self._bulk_response(
+            objs, status.HTTP_200_OK if partial else status.HTTP_201_CREATED
+        )
+
+    def bulk_destroy(self, request):
+        """Delete the objects with the given ids"""
+        serializer = BulkIdListSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = set(serializer.validated_data['ids'])
+
+        queryset = self.queryset.filter(user=request.user, id__in=ids)
+        found = set(queryset.values_list('id', flat=True))
+        # delete()는 객체마다 pre_delete, post_delete를 보내므로 태그와 재료를 쓰던 레시피의
+        # 변경 시각과 검색 컬럼, 레시피 수도 한 객체를 지울 때와 같이 바뀐다. (recipe.signals 참고)
+        with transaction.atomic():
+            queryset.delete()
+
+        return Response({
+            'deleted': sorted(found),
+            'not_found': sorted(ids - found),
+        }, status=status.HTTP_200_OK)
@@ -0,0 +1,178 @@
+# 유저별 목록 응답 캐시.
+# 레시피, 태그, 재료 목록은 그 유저가 데이터를 바꿀 때만 달라진다.
+# 그래서 유저마다 데이터 버전을 두고, 쓰기가 일어날 때 버전을 올린다.
+# 캐시 키에 버전이 들어가므로 버전이 바뀌면 이전 캐시는 자연스럽게 쓰이지 않는다.
+# 버전은 모든 워커가 같이 봐야 하므로, 프로세스 메모리 캐시(locmem)에서는 캐시하지 않는다.
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import http_date, parse_etags, \
+    parse_http_date_safe, quote_etag
+
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.cache import cache_is_shared
+from core.db.routers import replica_reads_enabled
+
+
+VERSION_KEY = 'recipe:version:{user_id}'
+# 마지막으로 버전이 바뀐 시각. 목록의 Last-Modified로 쓴다.
+MODIFIED_KEY = 'recipe:modified:{user_id}'
+LIST_KEY = 'recipe:list:{digest}'
+
+# 응답 내용에 영향을 주는 쿼리 파라미터만 키에 넣는다.
+CACHED_QUERY_PARAMS = (
+    'tags', 'ingredients', 'exclude_tags', 'exclude_ingredients', 'match',
+    'assigned_only', 'cursor', 'page_size', 'q', 'page', 'min_usage',
+    'ordering', 'fields', 'expand',
+)
+# 쉼표로 구분된 id 목록은 순서와 상관없이 같은 키가 되도록 정렬한다.
+ID_LIST_PARAMS = ('tags', 'ingredients', 'exclude_tags', 'exclude_ingredients')
+
+
+def get_data_version(user_id):
+    """Return the current data version and modification time of a user"""
+    key = VERSION_KEY.format(user_id=user_id)
+    modified_key = MODIFIED_KEY.format(user_id=user_id)
+    # 한번의 캐시 조회로 버전과 변경 시각을 같이 가져온다.
+    values = cache.get_many([key, modified_key])
+    version = values.get(key)
+    modified = values.get(modified_key)
+    if version is None:
+        # 캐시에서 버전이 사라졌을 때 1부터 다시 시작하면 예전 캐시와 겹칠 수 있으므로 시간을 쓴다.
+        now = time.time()
+        cache.add(key, int(now * 1000), None)
+        cache.set(modified_key, now, None)
+        version = cache.get(key)
+        modified = now
+    elif modified is None:
+        # 변경 시각을 모르면 지금 바뀐 것으로 본다.
+        modified = time.time()
+        cache.set(modified_key, modified, None)
+    return version, modified
+
+
+def bump_data_version(user_id):
+    """Invalidate every cached list of a user"""
+    key = VERSION_KEY.format(user_id=user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # 아직 버전이 없으면 새로 만든다.
+        get_data_version(user_id)
+    cache.set(MODIFIED_KEY.format(user_id=user_id), time.time(), None)
+
+
+def bump_data_version_on_commit(user_id, using=None):
+    """Invalidate every cached list of a user once the data is committed"""
+    # 커밋 전에 올리면, 그 사이에 다른 요청이 커밋 전의 목록을 새 버전으로 캐시할 수 있다.
+    # 트랜잭션 밖이라면 바로 올린다.
+    transaction.on_commit(lambda: bump_data_version(user_id), using=using)
+
+
+def normalize_query_params(query_params):
+    """Return the cache relevant query params as a stable string"""
+    items = []
+    for name in CACHED_QUERY_PARAMS:
+        value = query_params.get(name)
+        if value is None:
+            continue
+        if name in ID_LIST_PARAMS:
+            value = ','.join(sorted(set(value.split(','))))
+        items.append(f'{name}={value}')
+    return '&'.join(items)
+
+
+class LazyValue:
+    """A value of a cached list that is made again for each request"""
+
+    def resolve(self, request):
+        raise NotImplementedError
+
+
+def resolve_lazy_values(data, request):
+    """Replace the lazy values in list data for a request"""
+    # 파일 주소처럼 호스트나 서명 시각에 따라 달라지는 값은 캐시하지 않고 응답마다 만든다.
+    if isinstance(data, LazyValue):
+        return data.resolve(request)
+    if isinstance(data, dict):
+        for key, value in data.items():
+            data[key] = resolve_lazy_values(value, request)
+    elif isinstance(data, list):
+        data[:] = [resolve_lazy_values(value, request) for value in data]
+    return data
+
+
+class CachedListMixin:
+    """Cache list responses per user, data version and query params"""
+    list_cache_timeout = getattr(settings, 'RECIPE_LIST_CACHE_TIMEOUT', 600)
+
+    def _list_cache_digest(self, request, version):
+        # 뷰셋마다(레시피, 태그, 재료) 다른 키가 되도록 basename도 넣는다.
+        raw = ':'.join((
+            self.basename,
+            str(request.user.id),
+            str(version),
+            normalize_query_params(request.query_params),
+        ))
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action == 'list' and cache_is_shared():
+            context['lazy_file_urls'] = True
+        return context
+
+    def _not_modified(self, request, etag, last_modified):
+        """Return whether the client already has the current list"""
+        # If-None-Match가 있으면 If-Modified-Since보다 우선한다.
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            etags = parse_etags(if_none_match)
+            return '*' in etags or etag in etags
+
+        if_modified_since = parse_http_date_safe(
+            request.META.get('HTTP_IF_MODIFIED_SINCE')
+        )
+        return if_modified_since is not None and \
+            int(last_modified) <= if_modified_since
+
+    def list(self, request, *args, **kwargs):
+        if not cache_is_shared():
+            # 다른 워커에서 올린 버전을 볼 수 없으므로 캐시도, 304도 쓰지 않는다.
+            return super().list(request, *args, **kwargs)
+        version, modified = get_data_version(request.user.id)
+        digest = self._list_cache_digest(request, version)
+        headers = {
+            'ETag': quote_etag(digest),
+            'Last-Modified': http_date(modified),
+        }
+
+        # 클라이언트가 가진 버전과 같으면 직렬화 없이 304를 반환한다.
+        if self._not_modified(request, headers['ETag'], modified):
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED,
+                headers=headers
+            )
+
+        key = LIST_KEY.format(digest=digest)
+        data = cache.get(key)
+        if data is None:
+            response = super().list(request, *args, **kwargs)
+            if replica_reads_enabled():
+                # 복제본은 늦게 반영될 수 있으므로 지금 버전의 목록이라고 할 수 없다.
+                # 캐시에 넣지 않고, 클라이언트도 이 목록으로 304를 받지 않도록 검증 헤더를 뺀다.
+                headers = {}
+            else:
+                cache.set(key, response.data, self.list_cache_timeout)
+        else:
+            response = Response(data)
+        resolve_lazy_values(response.data, request)
+
+        for name, value in headers.items():
+            response[name] = value
+        return response
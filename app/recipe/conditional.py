@@ -0,0 +1,126 @@
+# 상세 응답에 대한 조건부 요청 처리.
+# 조회할 때는 ETag/Last-Modified로 재검증해서 바뀌지 않았으면 직렬화 없이 304를 반환한다.
+# 수정, 삭제할 때는 If-Match로 다른 클라이언트가 먼저 바꾸지 않았는지 확인한다. (낙관적 동시성 제어)
+# 확인과 수정 사이에 다른 요청이 끼어들지 않도록 행을 잠그고 확인한 뒤 같은 트랜잭션에서 수정한다.
+import hashlib
+from calendar import timegm
+
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from recipe.fieldsets import parse_name_list
+
+
+class ConditionalDetailMixin:
+    """Handle conditional requests on detail actions of a viewset"""
+    # 조회 응답의 모양을 바꾸는 쿼리 파라미터. 예) ('fields', 'expand')
+    # 같은 객체라도 값이 다르면 다른 표현(representation)이므로 다른 ETag를 준다.
+    representation_params = ()
+
+    def get_last_modified_queryset(self):
+        """Return a queryset annotated with a last_modified value"""
+        raise NotImplementedError(
+            '`get_last_modified_queryset()` must be implemented.'
+        )
+
+    def get_representation_key(self):
+        """Return a normalized key of the params shaping a read response"""
+        # 수정, 삭제의 If-Match와 수정 응답은 전체 표현의 ETag를 쓴다.
+        if self.request.method not in ('GET', 'HEAD'):
+            return ''
+        # 응답 필드의 순서는 시리얼라이저가 정하므로 이름의 순서와 중복은 무시한다.
+        parts = []
+        for param in self.representation_params:
+            names = sorted(set(parse_name_list(
+                self.request.query_params.get(param)
+            )))
+            if names:
+                parts.append(f'{param}={",".join(names)}')
+        return '&'.join(parts)
+
+    def _lookup_kwargs(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        return {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+
+    def lock_object(self):
+        """Lock the row of the object until the transaction ends"""
+        # 변경 시각은 GROUP BY로 구하므로 FOR UPDATE를 같이 쓸 수 없어서 따로 잠근다.
+        # 동시에 온 두번째 요청은 여기서 기다렸다가 먼저 커밋된 변경 시각으로 다시 확인한다.
+        try:
+            self.get_queryset().select_for_update().filter(
+                **self._lookup_kwargs()
+            ).values_list('pk', flat=True).first()
+        except (TypeError, ValueError):
+            pass
+
+    def get_detail_validators(self):
+        """Return the ETag and Last-Modified timestamp of the object"""
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        filter_kwargs = self._lookup_kwargs()
+        # 객체 전체를 가져오지 않고 변경 시각만 가져온다.
+        try:
+            last_modified = self.get_last_modified_queryset().filter(
+                **filter_kwargs
+            ).values_list('last_modified', flat=True).first()
+        except (TypeError, ValueError):
+            last_modified = None
+        if last_modified is None:
+            # 없는 객체는 원래 흐름에서 404가 되도록 한다.
+            return None, None
+
+        raw = f'{self.kwargs[lookup_url_kwarg]}:{last_modified.isoformat()}'
+        key = self.get_representation_key()
+        if key:
+            raw = f'{raw}:{key}'
+        etag = quote_etag(hashlib.md5(raw.encode()).hexdigest())
+        return etag, timegm(last_modified.utctimetuple())
+
+    def _set_validators(self, response, etag, last_modified):
+        if etag is not None:
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def _check_preconditions(self, request):
+        """Return validators and a response if a precondition decides it"""
+        etag, last_modified = self.get_detail_validators()
+        if etag is None:
+            return etag, last_modified, None
+        # GET은 304, 수정과 삭제는 412를 반환한다. 조건을 만족하면 None이다.
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is not None:
+            self._set_validators(response, etag, last_modified)
+        return etag, last_modified, response
+
+    def retrieve(self, request, *args, **kwargs):
+        etag, last_modified, response = self._check_preconditions(request)
+        if response is not None:
+            return response
+        response = super().retrieve(request, *args, **kwargs)
+        return self._set_validators(response, etag, last_modified)
+
+    # partial_update도 update를 호출하므로 같이 처리된다.
+    def update(self, request, *args, **kwargs):
+        with transaction.atomic():
+            self.lock_object()
+            etag, last_modified, response = self._check_preconditions(
+                request
+            )
+            if response is not None:
+                return response
+            response = super().update(request, *args, **kwargs)
+        # 수정된 뒤의 새 ETag를 돌려준다.
+        return self._set_validators(response, *self.get_detail_validators())
+
+    def destroy(self, request, *args, **kwargs):
+        with transaction.atomic():
+            self.lock_object()
+            etag, last_modified, response = self._check_preconditions(
+                request
+            )
+            if response is not None:
+                return response
+            return super().destroy(request, *args, **kwargs)
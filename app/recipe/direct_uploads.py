@@ -0,0 +1,174 @@
+# 저장소로 바로 올리는(direct) 레시피 이미지 업로드.
+# 1. 클라이언트가 업로드 주소를 요청하면 짧은 시간 동안만 쓸 수 있는 서명된 주소와 토큰을 준다.
+# 2. 클라이언트는 이미지를 그 주소(S3라면 버킷)로 바로 올린다. 이미지 바이트가 api 서버를 거치지 않는다.
+# 3. 업로드가 끝나면 토큰으로 완료를 알리고, 서버는 파일의 크기와 헤더를 확인한 뒤
+#    내용 주소 이름으로 복사해서 레시피에 붙인다. 같은 내용의 이미지가 있으면 그 파일을 같이 쓴다.
+#    복사는 저장소 안에서 한다. S3라면 파일이 api 서버로 내려오지 않는다.
+# 완료된 업로드는 uploads/incoming/에서 지우므로, 완료되지 않고 남은 파일만
+# 저장소의 수명 주기 규칙(예: 하루 뒤 만료)으로 지우면 된다.
+import os
+import tempfile
+import uuid
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.files import File
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import ugettext_lazy as _
+
+from rest_framework import serializers
+
+from core.models import Recipe
+from recipe.images import process_recipe_image
+from recipe.tasks import enqueue
+from recipe.uploadhandlers import HEADER_LIMIT, ImageTooLarge, \
+    inspect_image_header, invalid_image_error
+
+
+UPLOAD_SALT = 'recipe.direct-upload'
+UPLOAD_PREFIX = 'uploads/incoming/'
+# 완료된 업로드가 복사된 이름. 같은 토큰으로 다시 완료를 요청하면 그대로 돌려준다.
+COMPLETED_KEY = 'recipe:upload-completed:{key}'
+CONTENT_TYPES = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/webp': '.webp',
+    'image/gif': '.gif',
+}
+
+
+def _url_ttl():
+    return getattr(settings, 'RECIPE_IMAGE_UPLOAD_URL_TTL', 300)
+
+
+def _token_max_age():
+    # 큰 파일은 올리는 데 오래 걸리므로 완료 토큰은 주소보다 오래 쓸 수 있다.
+    return getattr(settings, 'RECIPE_IMAGE_UPLOAD_TOKEN_MAX_AGE', 3600)
+
+
+def _max_bytes():
+    return getattr(settings, 'RECIPE_IMAGE_MAX_BYTES', 25 * 1024 * 1024)
+
+
+def _storage():
+    return Recipe._meta.get_field('image').storage
+
+
+def issue_upload(request, recipe, content_type):
+    """Return a signed upload target for a new image of a recipe"""
+    key = f'{UPLOAD_PREFIX}{uuid.uuid4()}{CONTENT_TYPES[content_type]}'
+    token = signing.dumps({
+        'recipe': recipe.id,
+        'user': request.user.id,
+        'key': key,
+        'content_type': content_type,
+    }, salt=UPLOAD_SALT)
+
+    backend = _storage().backend
+    if hasattr(backend, 'presigned_upload'):
+        upload = backend.presigned_upload(
+            key, content_type, _max_bytes(), _url_ttl()
+        )
+    else:
+        # 로컬 저장소는 S3의 서명된 주소 대신 토큰으로 인증하는 PUT 주소를 쓴다.
+        upload = {
+            'method': 'PUT',
+            'url': request.build_absolute_uri(
+                reverse('recipe:image-upload', args=[token])
+            ),
+            'fields': {},
+        }
+    return {'token': token, 'upload': upload, 'expires_in': _url_ttl()}
+
+
+def load_token(token, max_age):
+    """Return the payload of a valid upload token"""
+    try:
+        return signing.loads(token, salt=UPLOAD_SALT, max_age=max_age)
+    except signing.SignatureExpired:
+        raise serializers.ValidationError({
+            'token': [_('Upload token has expired.')]
+        })
+    except signing.BadSignature:
+        raise serializers.ValidationError({
+            'token': [_('Invalid upload token.')]
+        })
+
+
+def receive_local_upload(token, stream, content_length):
+    """Store a file uploaded to the local upload url"""
+    payload = load_token(token, _url_ttl())
+    if stream is None:
+        # 본문이 없다.
+        raise invalid_image_error()
+    if content_length > _max_bytes():
+        raise ImageTooLarge()
+
+    received = 0
+    # 본문은 조각으로 읽어서 임시 파일에 쓰므로 메모리에 모이지 않는다.
+    spool = tempfile.SpooledTemporaryFile(max_size=HEADER_LIMIT)
+    with File(spool) as file:
+        for chunk in iter(lambda: stream.read(64 * 1024), b''):
+            received += len(chunk)
+            if received > _max_bytes():
+                raise ImageTooLarge()
+            file.write(chunk)
+        file.seek(0)
+        _storage().backend.save(payload['key'], file)
+
+
+def complete_upload(recipe, user, token):
+    """Attach an uploaded file to a recipe after checking it"""
+    payload = load_token(token, _token_max_age())
+    if payload['recipe'] != recipe.id or payload['user'] != user.id:
+        raise serializers.ValidationError({
+            'token': [_('Invalid upload token.')]
+        })
+
+    key = payload['key']
+    storage = _storage()
+    completed = cache.get(COMPLETED_KEY.format(key=key))
+    if completed is not None and recipe.image.name == completed:
+        # 같은 토큰으로 다시 완료를 요청한 경우
+        return recipe
+    if not storage.exists(key):
+        raise serializers.ValidationError({
+            'token': [_('The file has not been uploaded yet.')]
+        })
+
+    # 파일 전체가 아니라 크기와 헤더만 읽어서 확인한다.
+    try:
+        if storage.size(key) > _max_bytes():
+            raise ImageTooLarge()
+        header = storage.read_prefix(key, HEADER_LIMIT)
+        max_pixels = getattr(
+            settings, 'RECIPE_IMAGE_MAX_PIXELS', 50 * 1000 * 1000
+        )
+        if not inspect_image_header(header, max_pixels):
+            raise invalid_image_error()
+    except Exception:
+        storage.delete(key)
+        raise
+
+    # 일반 업로드와 같이 내용 주소 이름으로 복사하고, 같은 내용이 이미 있으면 복사하지 않는다.
+    # 참조 수는 저장할 때 시그널이 센다. (recipe.blobs 참고)
+    # 파일을 복사하고 참조 수를 올리는 것을 한 트랜잭션에서 한다.
+    with transaction.atomic():
+        name = recipe.image.field.generate_filename(
+            recipe, os.path.basename(key)
+        )
+        recipe.image = storage.save_copy(key, name)
+        recipe.image_status = Recipe.IMAGE_PENDING
+        recipe.image_status_at = timezone.now()
+        recipe.image_width = None
+        recipe.image_height = None
+        recipe.save()
+    cache.set(
+        COMPLETED_KEY.format(key=key), recipe.image.name, _token_max_age()
+    )
+    transaction.on_commit(lambda: storage.delete(key))
+    enqueue(process_recipe_image, recipe.id)
+    return recipe
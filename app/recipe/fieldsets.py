@@ -0,0 +1,59 @@
+# 응답 필드 선택(sparse fieldsets).
+# ?fields=id,title 이면 그 필드만, ?expand=tags 이면 태그를 id 대신 객체로 응답한다.
+# 시리얼라이저의 필드를 줄이면 plan_queryset도 그 필드만 가져오고, 요청하지 않은 관계는 prefetch하지 않는다.
+from django.utils.translation import ugettext_lazy as _
+
+from rest_framework import serializers
+
+
+def parse_name_list(value):
+    """Convert a comma separated string of names to a list"""
+    if not value:
+        return []
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def parse_fieldsets(query_params, serializer_class):
+    """Return the fields and expansions asked by the query params"""
+    context = {}
+    fields = parse_name_list(query_params.get('fields'))
+    expand = parse_name_list(query_params.get('expand'))
+    if fields:
+        known = serializer_class().fields
+        unknown = [name for name in fields if name not in known]
+        if unknown:
+            raise serializers.ValidationError({
+                'fields': [_('Unknown fields: %s.') % ', '.join(unknown)]
+            })
+        context['fields'] = fields
+    if expand:
+        expandable = getattr(serializer_class, 'expandable_fields', {})
+        unknown = [name for name in expand if name not in expandable]
+        if unknown:
+            raise serializers.ValidationError({
+                'expand': [_('Expected some of: %s.') % ', '.join(expandable)]
+            })
+        context['expand'] = expand
+    return context
+
+
+class SparseFieldsetMixin:
+    """Serializer rendering only the fields asked in its context"""
+    # 객체로 펼칠 수 있는 관계와 그 시리얼라이저. 예) {'tags': TagSerializer}
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # many=True일 때 ListSerializer의 자식도 같은 context를 받는다.
+        expand = self.context.get('expand', ())
+        for name in expand:
+            self.fields[name] = self.expandable_fields[name](
+                many=True, read_only=True
+            )
+        fields = self.context.get('fields')
+        if fields is not None:
+            # 펼친 관계는 fields에 없어도 응답에 넣는다.
+            keep = set(fields) | set(expand)
+            for name in list(self.fields):
+                if name not in keep:
+                    self.fields.pop(name)
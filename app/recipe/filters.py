@@ -0,0 +1,132 @@
+# 태그와 재료로 레시피를 필터링하는 기능.
+# tags__id__in 처럼 JOIN을 하면 조건에 맞는 관계 수만큼 레시피가 중복되고, distinct()로 다시 정렬해야한다.
+# 여기서는 중간 테이블(through)에 대한 서브쿼리(semi-join)로 걸러서 레시피가 한번씩만 나오게 한다.
+# 태그와 재료 목록도 같은 방법으로 레시피에 쓰인 것만 거른다.
+from django.db.models import Count
+from django.utils.translation import ugettext_lazy as _
+
+from rest_framework import serializers
+
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+MATCH_CHOICES = (MATCH_ANY, MATCH_ALL)
+
+# 태그와 재료 목록의 ?ordering=. usage는 그것을 쓰는 레시피가 많은 순서이다.
+# 레시피 수는 세어서 저장해둔 값을 쓴다. (recipe.usage 참고)
+ATTR_ORDERINGS = {
+    'name': ('-name', 'id'),
+    'usage': ('-recipe_count', '-name', 'id'),
+}
+
+
+def parse_id_list(value, param):
+    """Convert a comma separated string of ids to a list of integers"""
+    if not value:
+        return []
+    try:
+        return [int(str_id) for str_id in value.split(',')]
+    except ValueError:
+        raise serializers.ValidationError({
+            param: [_('Expected a comma separated list of ids.')]
+        })
+
+
+def filter_by_relation(queryset, field_name, include_ids=(), exclude_ids=(),
+                       match=MATCH_ANY):
+    """Filter objects by ids of a many to many relation"""
+    field = queryset.model._meta.get_field(field_name)
+    through = field.remote_field.through
+    # 예를 들어 tags라면 source는 recipe_id, target은 tag_id 컬럼이다.
+    source = field.m2m_column_name()
+    target = field.m2m_reverse_name()
+
+    if include_ids:
+        links = through.objects.filter(**{f'{target}__in': include_ids})
+        if match == MATCH_ALL:
+            # 요청한 id를 모두 가진 레시피만 남긴다. (GROUP BY ... HAVING COUNT = n)
+            links = links.values(source).annotate(
+                matched=Count(target, distinct=True)
+            ).filter(matched=len(set(include_ids)))
+        queryset = queryset.filter(id__in=links.values(source))
+
+    if exclude_ids:
+        queryset = queryset.exclude(id__in=through.objects.filter(
+            **{f'{target}__in': exclude_ids}
+        ).values(source))
+
+    return queryset
+
+
+def filter_recipes(queryset, query_params):
+    """Filter recipes by the tags and ingredients query params"""
+    # ?tags=1,2&ingredients=3&match=all&exclude_tags=4&exclude_ingredients=5
+    match = query_params.get('match', MATCH_ANY)
+    if match not in MATCH_CHOICES:
+        raise serializers.ValidationError({
+            'match': [_('Expected one of: any, all.')]
+        })
+
+    for field_name in ('tags', 'ingredients'):
+        exclude_param = f'exclude_{field_name}'
+        queryset = filter_by_relation(
+            queryset,
+            field_name,
+            include_ids=parse_id_list(
+                query_params.get(field_name), field_name
+            ),
+            exclude_ids=parse_id_list(
+                query_params.get(exclude_param), exclude_param
+            ),
+            match=match,
+        )
+    return queryset
+
+
+def parse_int(value, param, default=0, minimum=0):
+    """Convert a query param to an integer not less than a minimum"""
+    if value in (None, ''):
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        number = None
+    if number is None or number < minimum:
+        raise serializers.ValidationError({
+            param: [_('Expected an integer of at least %d.') % minimum]
+        })
+    return number
+
+
+def recipe_links(model):
+    """Return the through model linking recipes to a model and its column"""
+    # Tag라면 Recipe.tags의 중간 테이블과 tag_id 컬럼이다.
+    field = model._meta.get_field('recipe').field
+    return field.remote_field.through, field.m2m_reverse_name()
+
+
+def attr_ordering(query_params):
+    """Return the ordering of tags or ingredients asked by the query params"""
+    ordering = query_params.get('ordering') or 'name'
+    if ordering not in ATTR_ORDERINGS:
+        raise serializers.ValidationError({
+            'ordering': [_('Expected one of: name, usage.')]
+        })
+    return ATTR_ORDERINGS[ordering]
+
+
+def filter_recipe_attrs(queryset, query_params):
+    """Filter tags or ingredients by the recipes using them"""
+    # ?assigned_only=1&min_usage=3&ordering=usage
+    # assigned_only는 0아니면 1이 온다. 문자열 '0'을 그대로 bool로 바꾸면 true가 되므로 정수로 바꾼다.
+    assigned_only = parse_int(
+        query_params.get('assigned_only'), 'assigned_only'
+    )
+    min_usage = parse_int(query_params.get('min_usage'), 'min_usage')
+    if assigned_only:
+        # 레시피가 있는 것들만 반환한다. JOIN이 아니므로 중복이 생기지 않아 distinct가 필요 없다.
+        through, target = recipe_links(queryset.model)
+        queryset = queryset.filter(id__in=through.objects.values(target))
+    if min_usage:
+        queryset = queryset.filter(recipe_count__gte=min_usage)
+    return queryset
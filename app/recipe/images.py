@@ -0,0 +1,273 @@
+# 레시피 이미지 처리.
+# 업로드된 원본은 그대로 두고, 백그라운드에서 크기별(thumbnail, card, full) WebP/JPEG 사본을 만든다.
+# 사본은 회전 정보(EXIF Orientation)를 적용한 뒤 EXIF 등 메타데이터를 모두 지운 것이다.
+# 사본의 파일 이름은 원본 내용과 변환 옵션의 해시이므로, 같은 사본은 다시 만들지 않는다.
+import hashlib
+import io
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+
+from PIL import Image, features
+
+from core.models import Recipe, RecipeImageRendition
+from recipe.cache import bump_data_version_on_commit
+from recipe.tasks import enqueue
+
+
+logger = logging.getLogger(__name__)
+
+# 이름: 긴 변의 최대 길이(px). 원본보다 크게 늘리지는 않는다.
+RENDITION_SIZES = (
+    ('thumbnail', 200),
+    ('card', 600),
+    ('full', 1600),
+)
+# 형식: (PIL 형식, 확장자, 저장 옵션)
+# WebP는 Pillow가 libwebp와 함께 빌드된 경우에만 만든다. 없으면 JPEG만 만든다.
+RENDITION_FORMATS = tuple(
+    rendition_format for rendition_format in (
+        ('webp', 'WEBP', 'webp', {'quality': 80, 'method': 4}),
+        ('jpeg', 'JPEG', 'jpg', {
+            'quality': 85, 'optimize': True, 'progressive': True
+        }),
+    ) if rendition_format[0] != 'webp' or features.check('webp')
+)
+
+ORIENTATION_TAG = 0x0112
+# EXIF Orientation 값에 맞게 돌리는 방법.
+ORIENTATION_TRANSPOSE = {
+    2: Image.FLIP_LEFT_RIGHT,
+    3: Image.ROTATE_180,
+    4: Image.FLIP_TOP_BOTTOM,
+    5: Image.TRANSPOSE,
+    6: Image.ROTATE_270,
+    7: Image.TRANSVERSE,
+    8: Image.ROTATE_90,
+}
+
+# 없는 사본을 만드는 동안 같은 레시피의 작업이 또 시작되지 않도록 거는 잠금.
+RENDITION_LOCK_KEY = 'recipe:rendition-lock:{recipe_id}'
+RENDITION_LOCK_TIMEOUT = 300
+CHUNK_SIZE = 64 * 1024
+
+
+def _orientation(image):
+    getexif = getattr(image, '_getexif', None)
+    exif = getexif() if getexif else None
+    return (exif or {}).get(ORIENTATION_TAG)
+
+
+def image_size(image):
+    """Return the upright width and height of an image without decoding"""
+    width, height = image.size
+    # 5~8은 90도 회전이므로 가로, 세로가 바뀐다.
+    if _orientation(image) in (5, 6, 7, 8):
+        return height, width
+    return width, height
+
+
+def load_image(image):
+    """Decode an image upright and without metadata"""
+    orientation = _orientation(image)
+    # JPEG는 가장 큰 사본에 필요한 만큼만 축소해서 디코딩한다.
+    largest = RENDITION_SIZES[-1][1]
+    image.draft('RGB', (largest, largest))
+    has_alpha = image.mode in ('RGBA', 'LA') or \
+        (image.mode == 'P' and 'transparency' in image.info)
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+    if orientation in ORIENTATION_TRANSPOSE:
+        image = image.transpose(ORIENTATION_TRANSPOSE[orientation])
+    # 저장할 때 EXIF, ICC 등이 따라가지 않도록 비운다.
+    image.info = {}
+    return image
+
+
+def render(image, max_size, pil_format, options):
+    """Resize an image into the given bounding box and encode it"""
+    image = image.copy()
+    image.thumbnail((max_size, max_size), Image.LANCZOS)
+    if pil_format == 'JPEG' and image.mode == 'RGBA':
+        # JPEG는 투명도가 없으므로 흰 배경에 합친다.
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.split()[3])
+        image = background
+    buffer = io.BytesIO()
+    image.save(buffer, pil_format, **options)
+    return image.size, buffer.getvalue()
+
+
+def file_digest(file):
+    """Return the sha256 hex digest of a file read in chunks"""
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in iter(lambda: file.read(CHUNK_SIZE), b''):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def rendition_file_name(source_digest, max_size, pil_format, ext, options):
+    """Return the content addressed file name of a rendition"""
+    spec = f'{source_digest}:{max_size}:{pil_format}:{sorted(options.items())}'
+    return f'{hashlib.sha256(spec.encode()).hexdigest()}.{ext}'
+
+
+def set_image_status(recipe, name, status, **fields):
+    """Update the image status of a recipe still using an image"""
+    # 처리하는 동안 새 이미지가 올라왔으면 새 이미지의 상태를 덮어쓰지 않는다.
+    # update()는 시그널과 auto_now를 거치지 않으므로 변경 시각과 캐시 버전을 직접 바꾼다.
+    now = timezone.now()
+    updated = Recipe.objects.filter(pk=recipe.pk, image=name).update(
+        image_status=status, image_status_at=now, updated_at=now, **fields
+    )
+    if updated:
+        bump_data_version_on_commit(recipe.user_id)
+    return bool(updated)
+
+
+def delete_unreferenced_files(names):
+    """Delete rendition files no rendition points to any more"""
+    # 같은 원본을 쓰는 다른 레시피가 같은 파일을 가리킬 수 있다.
+    names = set(names)
+    referenced = set(RecipeImageRendition.objects.filter(
+        file__in=names
+    ).values_list('file', flat=True))
+    storage = RecipeImageRendition._meta.get_field('file').storage
+    for name in names - referenced:
+        storage.delete(name)
+
+
+def _build_renditions(recipe_id, file):
+    """Return unsaved renditions of an image and the names of new files"""
+    source = Image.open(file)
+    # load_image()의 draft()가 source.size를 줄여 놓으므로 디코딩 전에 원본 크기를 읽는다.
+    source_size = image_size(source)
+    source_digest = file_digest(file)
+    image = None
+    renditions, created = [], []
+    for size, max_size in RENDITION_SIZES:
+        for fmt, pil_format, ext, options in RENDITION_FORMATS:
+            rendition = RecipeImageRendition(
+                recipe_id=recipe_id, size=size, format=fmt
+            )
+            filename = rendition_file_name(
+                source_digest, max_size, pil_format, ext, options
+            )
+            name = rendition.file.field.generate_filename(rendition, filename)
+            if rendition.file.storage.exists(name):
+                # 이미 만든 사본이면 헤더만 읽어서 크기를 가져온다.
+                rendition.file.name = name
+                with rendition.file.open('rb') as existing:
+                    rendition.width, rendition.height = \
+                        Image.open(existing).size
+            else:
+                if image is None:
+                    image = load_image(source)
+                (rendition.width, rendition.height), content = render(
+                    image, max_size, pil_format, options
+                )
+                rendition.file.save(filename, ContentFile(content), save=False)
+                created.append(rendition.file.name)
+            renditions.append(rendition)
+    return renditions, source_size, created
+
+
+def process_recipe_image(recipe_id):
+    """Create the renditions of a recipe image and record its size"""
+    recipe = Recipe.objects.filter(pk=recipe_id).only(
+        'id', 'user_id', 'image'
+    ).first()
+    if recipe is None or not recipe.image:
+        return
+    name = recipe.image.name
+    if not set_image_status(recipe, name, Recipe.IMAGE_PROCESSING):
+        # 그 사이에 이미지가 바뀌었으면 새 이미지의 작업이 처리한다.
+        return
+
+    created = []
+    try:
+        with recipe.image.open('rb') as file:
+            renditions, (width, height), created = _build_renditions(
+                recipe_id, file
+            )
+    except Exception:
+        logger.exception('Processing the image of recipe %s failed', recipe_id)
+        delete_unreferenced_files(created)
+        set_image_status(recipe, name, Recipe.IMAGE_FAILED)
+        return
+
+    old = []
+    with transaction.atomic():
+        # 처리하는 동안 새 이미지가 올라왔으면 이 결과는 버린다.
+        current = Recipe.objects.select_for_update().filter(
+            pk=recipe_id
+        ).values_list('image', flat=True).first()
+        if current == name:
+            old_renditions = RecipeImageRendition.objects.filter(
+                recipe_id=recipe_id
+            )
+            old = list(old_renditions.values_list('file', flat=True))
+            old_renditions.delete()
+            RecipeImageRendition.objects.bulk_create(renditions)
+            set_image_status(
+                recipe, name, Recipe.IMAGE_READY,
+                image_width=width, image_height=height
+            )
+
+    # 파일은 트랜잭션이 끝난 뒤에 지운다.
+    delete_unreferenced_files(old + created)
+
+
+def build_missing_renditions(recipe_id):
+    """Build the renditions of a recipe and release its lock"""
+    try:
+        process_recipe_image(recipe_id)
+    finally:
+        cache.delete(RENDITION_LOCK_KEY.format(recipe_id=recipe_id))
+
+
+def has_all_renditions(renditions):
+    """Return whether every configured size and format exists"""
+    expected = {
+        (size, fmt)
+        for size, _ in RENDITION_SIZES
+        for fmt, _, _, _ in RENDITION_FORMATS
+    }
+    return expected <= {
+        (rendition.size, rendition.format) for rendition in renditions
+    }
+
+
+def is_processing(recipe):
+    """Return whether an image task of a recipe is queued or running"""
+    if recipe.image_status not in (
+        Recipe.IMAGE_PENDING, Recipe.IMAGE_PROCESSING
+    ):
+        return False
+    # 작업이 중간에 죽으면 상태가 그대로 남으므로, 오래된 것은 작업이 없는 것으로 본다.
+    # 시각이 없는 것은 이 필드가 생기기 전에 저장된 상태이다.
+    stale_after = timedelta(seconds=getattr(
+        settings, 'RECIPE_IMAGE_STALE_AFTER', 900
+    ))
+    return recipe.image_status_at is not None and \
+        recipe.image_status_at > timezone.now() - stale_after
+
+
+def schedule_missing_renditions(recipe):
+    """Build missing renditions of a recipe once, in the background"""
+    # 업로드 직후에는 이미 작업이 예약되어 있다.
+    if is_processing(recipe):
+        return
+    # 처리에 실패한 이미지는 다시 해도 실패하므로, 새 이미지가 올라올 때까지 예약하지 않는다.
+    if recipe.image_status == Recipe.IMAGE_FAILED:
+        return
+    # 동시에 여러 요청이 와도 잠금을 얻은 하나만 작업을 예약한다.
+    key = RENDITION_LOCK_KEY.format(recipe_id=recipe.id)
+    if cache.add(key, True, RENDITION_LOCK_TIMEOUT):
+        enqueue(build_missing_renditions, recipe.id)
@@ -0,0 +1,74 @@
+# 태그 이름 자동완성의 응답 시간을 합성 데이터로 측정하는 명령어.
+# 유저 한명에게 많은 이름을 만들고, 무작위 입력으로 prefix/fuzzy 모드의 p50, p99를 출력한다.
+# 데이터는 하나의 트랜잭션 안에서 만들고 마지막에 롤백하므로 db에 남지 않는다.
+import random
+import string
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Tag
+from recipe.autocomplete import MODE_CHOICES, autocomplete
+
+
+BATCH_SIZE = 10000
+
+
+def random_name():
+    """Return a random name of one or two words"""
+    return ' '.join(
+        ''.join(random.choices(string.ascii_lowercase, k=random.randint(3, 9)))
+        for _ in range(random.randint(1, 2))
+    ).capitalize()
+
+
+def percentile(values, fraction):
+    """Return the nearest rank percentile of some values"""
+    # statistics.quantiles는 python 3.8부터 있다.
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+class Command(BaseCommand):
+    """Django command to benchmark name autocompletion on synthetic data"""
+    help = 'Benchmark tag name autocompletion on synthetic data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--names', type=int, default=50000)
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(
+                f'benchmark-{time.time()}@example.com', 'benchmark'
+            )
+            names = [random_name() for _ in range(options['names'])]
+            for start in range(0, len(names), BATCH_SIZE):
+                Tag.objects.bulk_create([
+                    Tag(user=user, name=name)
+                    for name in names[start:start + BATCH_SIZE]
+                ])
+            queryset = Tag.objects.filter(user=user).only('id', 'name')
+            for mode in MODE_CHOICES:
+                self._run(queryset, names, mode, options)
+            # 벤치마크 데이터는 남기지 않는다.
+            transaction.set_rollback(True)
+
+    def _run(self, queryset, names, mode, options):
+        timings = []
+        for _ in range(options['queries']):
+            # 입력 중인 상태를 흉내내서 이름의 앞 2~5글자를 쓴다.
+            q = random.choice(names)[:random.randint(2, 5)]
+            started = time.perf_counter()
+            autocomplete(queryset, q, mode, options['limit'])
+            timings.append((time.perf_counter() - started) * 1000)
+
+        self.stdout.write(
+            f'{mode:<10} p50 {percentile(timings, 0.5):>8.2f} ms '
+            f'p99 {percentile(timings, 0.99):>8.2f} ms'
+        )
@@ -0,0 +1,144 @@
+# 레시피 목록 직렬화를 합성 데이터로 측정하는 명령어.
+# 시리얼라이저로 만드는 방식과 values() 행으로 만드는 방식(recipe.fastpath)의
+# 쿼리부터 JSON 렌더링까지의 실행 시간을 비교하고, 두 JSON이 바이트 단위로 같은지 확인한다.
+# 데이터는 하나의 트랜잭션 안에서 만들고 마지막에 롤백하므로 db에 남지 않는다.
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.fastpath import fast_list_plan
+from recipe.queries import plan_queryset
+from recipe.serializers import RecipeSerializer
+
+
+BATCH_SIZE = 10000
+
+
+class Command(BaseCommand):
+    """Django command to benchmark rendering recipe lists"""
+    help = 'Benchmark the serializer and values() paths of recipe lists'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+            help='Numbers of recipes rendered in one list'
+        )
+        parser.add_argument('--tags', type=int, default=3,
+                            help='Tags of each recipe')
+        parser.add_argument('--ingredients', type=int, default=5,
+                            help='Ingredients of each recipe')
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        with transaction.atomic():
+            user = self._seed(max(options['sizes']), options)
+            for size in options['sizes']:
+                self._run(user, size, options['repeat'])
+            # 벤치마크 데이터는 남기지 않는다.
+            transaction.set_rollback(True)
+
+    def _seed(self, count, options):
+        """Create a user with synthetic recipes, tags and ingredients"""
+        started = time.perf_counter()
+        user = get_user_model().objects.create_user(
+            f'benchmark-{time.time()}@example.com', 'benchmark'
+        )
+        Tag.objects.bulk_create(
+            [Tag(user=user, name=f'Tag {i}') for i in range(100)]
+        )
+        Ingredient.objects.bulk_create(
+            [Ingredient(user=user, name=f'Ingredient {i}') for i in range(500)]
+        )
+        for start in range(0, count, BATCH_SIZE):
+            Recipe.objects.bulk_create([
+                Recipe(user=user, title=f'Recipe {start + i}',
+                       time_minutes=random.randint(1, 120),
+                       price=f'{random.randint(1, 99999) / 100:.2f}',
+                       link=f'https://example.com/{start + i}')
+                for i in range(min(BATCH_SIZE, count - start))
+            ])
+
+        # bulk_create가 id를 돌려주지 않는 db도 있으므로 다시 조회한다.
+        tag_ids = list(Tag.objects.filter(user=user).values_list(
+            'id', flat=True
+        ))
+        ingredient_ids = list(Ingredient.objects.filter(
+            user=user
+        ).values_list('id', flat=True))
+        recipe_ids = Recipe.objects.filter(user=user).values_list(
+            'id', flat=True
+        )
+        tag_rows, ingredient_rows = [], []
+        for recipe_id in recipe_ids.iterator():
+            tag_rows.extend(
+                Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+                for tag_id in random.sample(tag_ids, options['tags'])
+            )
+            ingredient_rows.extend(
+                Recipe.ingredients.through(
+                    recipe_id=recipe_id, ingredient_id=ingredient_id
+                )
+                for ingredient_id in random.sample(
+                    ingredient_ids, options['ingredients']
+                )
+            )
+            if len(tag_rows) + len(ingredient_rows) >= BATCH_SIZE:
+                self._flush(tag_rows, ingredient_rows)
+        self._flush(tag_rows, ingredient_rows)
+
+        self.stdout.write(
+            f'Seeded {count} recipes with {options["tags"]} tags and '
+            f'{options["ingredients"]} ingredients each in '
+            f'{time.perf_counter() - started:.1f}s'
+        )
+        return user
+
+    def _flush(self, tag_rows, ingredient_rows):
+        Recipe.tags.through.objects.bulk_create(tag_rows)
+        Recipe.ingredients.through.objects.bulk_create(ingredient_rows)
+        tag_rows.clear()
+        ingredient_rows.clear()
+
+    def _time(self, render, repeat):
+        """Return the median run time in ms and the rendered JSON"""
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            content = render()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), content
+
+    def _run(self, user, size, repeat):
+        queryset = Recipe.objects.filter(user=user).order_by('-id')[:size]
+        renderer = JSONRenderer()
+        context = {}
+        plan = fast_list_plan(RecipeSerializer, context)
+
+        def serializer_path():
+            serializer = RecipeSerializer(
+                plan_queryset(queryset, RecipeSerializer, context),
+                many=True, context=context
+            )
+            return renderer.render(serializer.data)
+
+        def fast_path():
+            return renderer.render(plan.render(queryset, context))
+
+        slow_ms, expected = self._time(serializer_path, repeat)
+        fast_ms, content = self._time(fast_path, repeat)
+        if content != expected:
+            raise CommandError(f'{size} recipes: the JSON differs')
+        self.stdout.write(
+            f'{size:>8} recipes  serializer {slow_ms:>10.1f} ms  '
+            f'values {fast_ms:>10.1f} ms  {slow_ms / fast_ms:>5.1f}x  '
+            f'{len(content) / 1024:>10.0f} KiB'
+        )
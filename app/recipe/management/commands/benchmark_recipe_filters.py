@@ -0,0 +1,148 @@
+# 태그/재료 필터를 합성 데이터로 측정하는 명령어.
+# 기존의 JOIN 방식(tags__id__in)과 서브쿼리 방식(recipe.filters)의 실행 시간과 결과 행 수를 비교한다.
+# 데이터는 하나의 트랜잭션 안에서 만들고 마지막에 롤백하므로 db에 남지 않는다.
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Tag, Ingredient, Recipe
+from recipe.filters import MATCH_ALL, MATCH_ANY, filter_by_relation
+
+
+BATCH_SIZE = 10000
+
+
+class Command(BaseCommand):
+    """Django command to benchmark recipe filters on synthetic data"""
+    help = 'Benchmark tag and ingredient recipe filters on synthetic data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100000)
+        parser.add_argument(
+            '--links', type=int, default=1000000,
+            help='Total number of recipe tag and ingredient rows'
+        )
+        parser.add_argument('--tags', type=int, default=100)
+        parser.add_argument('--ingredients', type=int, default=500)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        with transaction.atomic():
+            user, tag_ids, ingredient_ids = self._seed(options)
+            self._run(user, tag_ids, ingredient_ids, options['repeat'])
+            # 벤치마크 데이터는 남기지 않는다.
+            transaction.set_rollback(True)
+
+    def _seed(self, options):
+        """Create a user with synthetic recipes, tags and ingredients"""
+        started = time.perf_counter()
+        user = get_user_model().objects.create_user(
+            f'benchmark-{time.time()}@example.com', 'benchmark'
+        )
+        Tag.objects.bulk_create(
+            [Tag(user=user, name=f'Tag {i}') for i in range(options['tags'])]
+        )
+        Ingredient.objects.bulk_create([
+            Ingredient(user=user, name=f'Ingredient {i}')
+            for i in range(options['ingredients'])
+        ])
+        for start in range(0, options['recipes'], BATCH_SIZE):
+            count = min(BATCH_SIZE, options['recipes'] - start)
+            Recipe.objects.bulk_create([
+                Recipe(user=user, title=f'Recipe {start + i}',
+                       time_minutes=10, price=5)
+                for i in range(count)
+            ])
+
+        # bulk_create가 id를 돌려주지 않는 db도 있으므로 다시 조회한다.
+        tag_ids = list(Tag.objects.filter(user=user).values_list(
+            'id', flat=True
+        ))
+        ingredient_ids = list(Ingredient.objects.filter(
+            user=user
+        ).values_list('id', flat=True))
+        recipe_ids = Recipe.objects.filter(user=user).values_list(
+            'id', flat=True
+        )
+
+        # 관계 행의 절반은 태그, 절반은 재료로 나눈다.
+        per_recipe = max(1, options['links'] // max(1, options['recipes']))
+        tags_per_recipe = min(len(tag_ids), max(1, per_recipe // 2))
+        ingredients_per_recipe = min(
+            len(ingredient_ids), max(1, per_recipe - tags_per_recipe)
+        )
+        tag_rows, ingredient_rows = [], []
+        for recipe_id in recipe_ids.iterator():
+            tag_rows.extend(
+                Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+                for tag_id in random.sample(tag_ids, tags_per_recipe)
+            )
+            ingredient_rows.extend(
+                Recipe.ingredients.through(
+                    recipe_id=recipe_id, ingredient_id=ingredient_id
+                )
+                for ingredient_id in random.sample(
+                    ingredient_ids, ingredients_per_recipe
+                )
+            )
+            if len(tag_rows) + len(ingredient_rows) >= BATCH_SIZE:
+                self._flush(tag_rows, ingredient_rows)
+        self._flush(tag_rows, ingredient_rows)
+
+        self.stdout.write(
+            f'Seeded {options["recipes"]} recipes with '
+            f'{tags_per_recipe} tags and {ingredients_per_recipe} '
+            f'ingredients each in {time.perf_counter() - started:.1f}s'
+        )
+        return user, tag_ids, ingredient_ids
+
+    def _flush(self, tag_rows, ingredient_rows):
+        Recipe.tags.through.objects.bulk_create(tag_rows)
+        Recipe.ingredients.through.objects.bulk_create(ingredient_rows)
+        tag_rows.clear()
+        ingredient_rows.clear()
+
+    def _time(self, queryset, repeat):
+        """Return the median run time in ms and the number of rows"""
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            rows = len(list(queryset.values_list('id', flat=True)))
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), rows
+
+    def _run(self, user, tag_ids, ingredient_ids, repeat):
+        base = Recipe.objects.filter(user=user)
+        tags = tag_ids[:2]
+        ingredients = ingredient_ids[:2]
+        excluded = tag_ids[2:3]
+
+        # 기존 방식: JOIN으로 걸러서 중복이 생기거나, distinct()로 다시 정렬한다.
+        legacy = base.filter(tags__id__in=tags)
+        legacy_both = legacy.filter(ingredients__id__in=ingredients)
+        scenarios = (
+            ('any tags (join)', legacy),
+            ('any tags (join, distinct)', legacy.distinct()),
+            ('any tags', filter_by_relation(base, 'tags', tags)),
+            ('all tags', filter_by_relation(
+                base, 'tags', tags, match=MATCH_ALL
+            )),
+            ('tags + ingredients (join)', legacy_both),
+            ('tags + ingredients (join, distinct)', legacy_both.distinct()),
+            ('tags + ingredients', filter_by_relation(
+                filter_by_relation(base, 'tags', tags),
+                'ingredients', ingredients
+            )),
+            ('any tags, exclude tag', filter_by_relation(
+                base, 'tags', tags, excluded, match=MATCH_ANY
+            )),
+        )
+        for name, queryset in scenarios:
+            median, rows = self._time(queryset, repeat)
+            self.stdout.write(f'{name:<40} {median:>10.1f} ms {rows:>10} rows')
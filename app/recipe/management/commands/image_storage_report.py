@@ -0,0 +1,24 @@
+# 레시피 이미지 저장소가 중복 제거로 얼마나 공간을 아꼈는지 보여주는 명령어.
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+
+from recipe.blobs import storage_report
+
+
+class Command(BaseCommand):
+    """Django command to report storage saved by image deduplication"""
+    help = 'Report the storage saved by content addressed recipe images'
+
+    def handle(self, *args, **options):
+        report = storage_report()
+        referenced = report['referenced_bytes']
+        ratio = report['saved_bytes'] / referenced if referenced else 0
+        self.stdout.write(f'Files:      {report["files"]}')
+        self.stdout.write(
+            f'Stored:     {filesizeformat(report["stored_bytes"])}'
+        )
+        self.stdout.write(f'Referenced: {filesizeformat(referenced)}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Saved:      {filesizeformat(report["saved_bytes"])} '
+            f'({ratio:.1%})'
+        ))
@@ -0,0 +1,149 @@
+# 레시피 api의 처리량을 서버별로 비교하는 부하 테스트 명령어.
+# 여러 서버 주소를 주면 같은 데이터, 같은 요청으로 차례로 부하를 주고 초당 요청 수와 p50, p99를 출력한다.
+# 예) 개발 서버와 운영 서버를 같은 db로 띄운 뒤 비교한다.
+#   python manage.py runserver 0.0.0.0:8001
+#   python manage.py serve --bind 0.0.0.0:8000
+#   python manage.py loadtest dev=http://127.0.0.1:8001 \
+#       gunicorn=http://127.0.0.1:8000
+# 서버들이 볼 수 있도록 테스트 데이터는 커밋하고, 끝나면 유저와 함께 지운다.
+import http.client
+import itertools
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from rest_framework.authtoken.models import Token
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.bulk import bulk_create
+
+
+ENDPOINTS = (
+    '/api/recipe/recipes/',
+    '/api/recipe/recipes/{recipe_id}/',
+    '/api/recipe/tags/',
+    '/api/recipe/ingredients/',
+)
+
+
+def parse_target(value):
+    """Return the name, host and port of a name=url target"""
+    name, _, url = value.rpartition('=')
+    parts = urlsplit(url)
+    if parts.scheme != 'http' or not parts.hostname:
+        raise CommandError(
+            f'Invalid target {value!r}. Use [name=]http://host:port'
+        )
+    return name or parts.netloc, parts.hostname, parts.port or 80
+
+
+def percentile(values, fraction):
+    """Return the nearest rank percentile of some values"""
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+class Command(BaseCommand):
+    """Django command to compare the throughput of recipe api servers"""
+    help = 'Load test the recipe endpoints of one or more running servers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('targets', nargs='+', metavar='[name=]url')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--duration', type=float, default=10)
+        parser.add_argument('--recipes', type=int, default=50)
+
+    def handle(self, *args, **options):
+        targets = [parse_target(target) for target in options['targets']]
+        user = get_user_model().objects.create_user(
+            f'loadtest-{uuid.uuid4().hex}@example.com', uuid.uuid4().hex
+        )
+        try:
+            token, recipe_ids = self._create_data(user, options['recipes'])
+            # 목록과 상세를 같은 비율로, 상세는 여러 레시피를 돌아가며 요청한다.
+            paths = [
+                path.format(recipe_id=recipe_id)
+                for recipe_id in recipe_ids[:10] for path in ENDPOINTS
+            ]
+            self.stdout.write(
+                f'{"target":<16}{"requests":>10}{"req/s":>10}'
+                f'{"p50 ms":>10}{"p99 ms":>10}{"errors":>8}'
+            )
+            for name, host, port in targets:
+                self._run(name, host, port, token, paths, options)
+        finally:
+            # 레시피, 태그, 재료, 토큰은 유저와 함께 지워진다.
+            user.delete()
+
+    def _create_data(self, user, count):
+        tags = bulk_create(Tag, [
+            Tag(user=user, name=f'Tag {index}') for index in range(10)
+        ])
+        ingredients = bulk_create(Ingredient, [
+            Ingredient(user=user, name=f'Ingredient {index}')
+            for index in range(20)
+        ])
+        recipe_ids = []
+        for index in range(count):
+            recipe = Recipe.objects.create(
+                user=user, title=f'Recipe {index}', time_minutes=10, price=5
+            )
+            recipe.tags.set(tags[index % 10:index % 10 + 3])
+            recipe.ingredients.set(ingredients[index % 20:index % 20 + 5])
+            recipe_ids.append(recipe.id)
+        return Token.objects.create(user=user).key, recipe_ids
+
+    def _run(self, name, host, port, token, paths, options):
+        deadline = time.perf_counter() + options['duration']
+        timings, errors = [], []
+        lock = threading.Lock()
+
+        def worker(offset):
+            # 실제 클라이언트처럼 keep-alive 연결을 다시 쓴다.
+            connection = http.client.HTTPConnection(host, port, timeout=30)
+            local_timings, local_errors = [], 0
+            # 스레드마다 다른 위치부터 주소를 돌아가며 요청한다.
+            cycle = itertools.islice(
+                itertools.cycle(paths), offset, None
+            )
+            headers = {'Authorization': f'Token {token}'}
+            while time.perf_counter() < deadline:
+                path = next(cycle)
+                started = time.perf_counter()
+                try:
+                    connection.request('GET', path, headers=headers)
+                    response = connection.getresponse()
+                    response.read()
+                    ok = response.status == 200
+                except (OSError, http.client.HTTPException):
+                    connection.close()
+                    ok = False
+                local_timings.append(time.perf_counter() - started)
+                local_errors += not ok
+            connection.close()
+            with lock:
+                timings.extend(local_timings)
+                errors.append(local_errors)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            futures = [
+                pool.submit(worker, offset)
+                for offset in range(options['concurrency'])
+            ]
+        for future in futures:
+            future.result()
+        elapsed = time.perf_counter() - started
+
+        if not timings:
+            raise CommandError(f'No responses from {name}.')
+        self.stdout.write(
+            f'{name:<16}{len(timings):>10}{len(timings) / elapsed:>10.1f}'
+            f'{percentile(timings, 0.5) * 1000:>10.2f}'
+            f'{percentile(timings, 0.99) * 1000:>10.2f}{sum(errors):>8}'
+        )
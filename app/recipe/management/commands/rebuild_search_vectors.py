@@ -0,0 +1,36 @@
+# 모든 레시피의 검색 컬럼(search_vector)을 다시 만드는 명령어. (postgres에서만)
+# RECIPE_SEARCH_CONFIG를 바꾸면 예전 설정으로 만든 컬럼은 새 설정으로 파싱한 검색어와 맞지 않는다.
+# id 순서로 나눠서 batch마다 짧은 트랜잭션으로 고치므로 운영 중에 실행해도 테이블을 오래 잠그지 않는다.
+# 예) python manage.py rebuild_search_vectors --batch-size 5000
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Recipe
+from recipe.search import SEARCH_CONFIG, is_postgres, update_search_vectors
+
+
+class Command(BaseCommand):
+    """Django command to rebuild the search vectors of every recipe"""
+    help = 'Rebuild the stored full-text search vectors of recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not is_postgres(Recipe.objects.all()):
+            self.stdout.write('Search vectors are only stored on postgres')
+            return
+        rebuilt = 0
+        last_id = 0
+        while True:
+            ids = list(Recipe.objects.filter(id__gt=last_id).order_by('id')
+                       .values_list('id', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            last_id = ids[-1]
+            with transaction.atomic():
+                update_search_vectors(Recipe.objects.filter(id__in=ids))
+            rebuilt += len(ids)
+        self.stdout.write(
+            f'{rebuilt} search vectors rebuilt with {SEARCH_CONFIG!r}'
+        )
@@ -0,0 +1,55 @@
+# 태그와 재료의 레시피 수(recipe_count)를 실제 연결 수와 맞추는 명령어.
+# 시그널 없이 중간 테이블을 바꾸면(raw sql, 직접 bulk_create 등) 저장된 값이 어긋난다.
+# id 순서로 나눠서 batch마다 짧은 트랜잭션으로 고치므로 운영 중에 실행해도 테이블을 오래 잠그지 않는다.
+# 예) python manage.py reconcile_usage_counts --batch-size 5000 --dry-run
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from recipe.usage import COUNTED_RELATIONS, actual_usage, relation_columns
+
+
+class Command(BaseCommand):
+    """Django command to repair the recipe counts of tags and ingredients"""
+    help = 'Recount the recipes using each tag and ingredient'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report the counts that are wrong'
+        )
+
+    def handle(self, *args, **options):
+        for name in COUNTED_RELATIONS:
+            model = relation_columns(name)[0]
+            checked, fixed = self._reconcile(name, model, options)
+            verb = 'wrong' if options['dry_run'] else 'fixed'
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: {fixed} of {checked} '
+                f'counts {verb}'
+            )
+
+    def _reconcile(self, name, model, options):
+        checked = fixed = 0
+        last_id = 0
+        while True:
+            ids = list(model.objects.filter(id__gt=last_id).order_by('id')
+                       .values_list('id', flat=True)[:options['batch_size']])
+            if not ids:
+                return checked, fixed
+            last_id = ids[-1]
+            checked += len(ids)
+            with transaction.atomic():
+                wrong = list(
+                    model.objects.filter(id__in=ids)
+                    .annotate(actual=actual_usage(name))
+                    .exclude(recipe_count=F('actual'))
+                    .values_list('id', flat=True)
+                )
+                if wrong and not options['dry_run']:
+                    # 세는 것과 쓰는 것을 한 문장으로 해서 그 사이에 바뀐 연결도 반영한다.
+                    model.objects.filter(id__in=wrong).update(
+                        recipe_count=actual_usage(name)
+                    )
+            fixed += len(wrong)
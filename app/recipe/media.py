@@ -0,0 +1,180 @@
+# 미디어 파일(레시피 이미지와 사본) 전송.
+# 로컬 저장소의 파일 url에는 만료되는 서명(?sig=)이 붙어 있고, 서명이 맞는 요청만 파일을 받는다.
+# 앞단 프록시가 설정되어 있으면 X-Accel-Redirect(nginx) 또는 X-Sendfile 헤더로 전송을 넘기고
+# 워커는 바로 다음 요청을 처리한다.
+# 프록시가 없으면 FileResponse로 보낸다. gunicorn처럼 wsgi.file_wrapper가 있는 서버는
+# sendfile로 파일을 복사 없이 보낸다. Range 요청(이어 받기, 부분 요청)도 처리한다.
+import mimetypes
+import os
+import re
+import stat
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, \
+    SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.encoding import filepath_to_uri
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+
+from core.models import Recipe
+from core.storage import media_signature_expires_in
+
+
+SENDFILE_HEADERS = {
+    'nginx': 'X-Accel-Redirect',
+    'sendfile': 'X-Sendfile',
+}
+# 여러 구간(multipart/byteranges)은 지원하지 않는다. 그런 요청에는 파일 전체를 보낸다.
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+class MediaFileResponse(FileResponse):
+    # sendfile을 못 쓰는 서버에서 파일을 읽는 크기
+    block_size = 64 * 1024
+
+
+class FileRange:
+    """File-like object reading a byte range of a file"""
+    # fileno()가 있으므로 gunicorn은 현재 위치부터 Content-Length만큼 sendfile로 보낸다.
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """Return the first and last byte of a single range request"""
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first:
+        # bytes=-500 은 마지막 500 byte
+        if not last or int(last) == 0:
+            raise RangeNotSatisfiable()
+        return max(size - int(last), 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if last and int(last) < start:
+        # 잘못된 Range는 무시하고 파일 전체를 보낸다.
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    return start, end
+
+
+def _media_storage():
+    return Recipe._meta.get_field('image').storage
+
+
+def _sendfile_response(name, path, content_type):
+    mode = getattr(settings, 'MEDIA_SENDFILE', '')
+    if mode not in SENDFILE_HEADERS:
+        raise ImproperlyConfigured(
+            f'Unknown MEDIA_SENDFILE {mode!r}. '
+            f'Use one of: {", ".join(SENDFILE_HEADERS)}.'
+        )
+    response = HttpResponse(content_type=content_type)
+    if mode == 'nginx':
+        # nginx의 internal location 주소. 그 location이 MEDIA_ROOT를 가리킨다.
+        prefix = getattr(settings, 'MEDIA_ACCEL_PREFIX', '/protected-media/')
+        response[SENDFILE_HEADERS[mode]] = prefix + filepath_to_uri(name)
+    else:
+        response[SENDFILE_HEADERS[mode]] = path
+    return response
+
+
+def _file_response(request, path, size, etag, last_modified, content_type):
+    byte_range = None
+    header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    # If-Range가 지금 파일과 다르면 파일이 바뀐 것이므로 전체를 보낸다.
+    current = (etag, http_date(last_modified))
+    if header and (not if_range or if_range in current):
+        try:
+            byte_range = parse_range(header, size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(
+                status=416, content_type=content_type
+            )
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    file = open(path, 'rb')
+    if byte_range is None:
+        response = MediaFileResponse(file, content_type=content_type)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = MediaFileResponse(
+            FileRange(file, start, length), status=206,
+            content_type=content_type
+        )
+        response['Content-Length'] = length
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+@require_safe
+def serve_media(request, name):
+    """Serve a media file to requests carrying its signature"""
+    # 서명이 없거나 틀리거나 만료되었으면 파일이 있는지도 알려주지 않는다.
+    expires_in = media_signature_expires_in(name, request.GET.get('sig', ''))
+    if expires_in is None:
+        raise Http404()
+    try:
+        path = _media_storage().path(name)
+        st = os.stat(path)
+    except (NotImplementedError, SuspiciousFileOperation, OSError):
+        # S3 같은 저장소의 url은 이 뷰가 아니라 저장소를 가리킨다.
+        raise Http404()
+    if not stat.S_ISREG(st.st_mode):
+        raise Http404()
+
+    etag = quote_etag(f'{st.st_size:x}-{int(st.st_mtime):x}')
+    last_modified = int(st.st_mtime)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        content_type = mimetypes.guess_type(name)[0] or \
+            'application/octet-stream'
+        if getattr(settings, 'MEDIA_SENDFILE', ''):
+            response = _sendfile_response(name, path, content_type)
+        else:
+            response = _file_response(
+                request, path, st.st_size, etag, last_modified, content_type
+            )
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    # 이미지 파일 이름은 내용의 해시이므로 같은 url의 파일은 바뀌지 않는다.
+    # 서명을 가진 사람만 받아야 하므로 공유 캐시(CDN, 프록시)에는 두지 않고,
+    # 서명이 만료되면 브라우저 캐시도 쓰지 않는다.
+    max_age = min(
+        getattr(settings, 'MEDIA_CACHE_MAX_AGE', 365 * 24 * 60 * 60),
+        expires_in
+    )
+    response['Cache-Control'] = f'private, max-age={max_age}, immutable'
+    return response
@@ -0,0 +1,157 @@
+# 커서 기반(keyset) 페이지네이션.
+# OFFSET을 쓰지 않고 정렬 키의 마지막 값 이후부터 가져오므로, 몇번째 페이지든 비용이 같다.
+# DRF의 CursorPagination은 정렬의 첫번째 필드만 커서에 넣고 같은 값은 OFFSET으로 건너뛴다.
+# 사용 횟수나 이름처럼 같은 값이 많은 정렬에서는 OFFSET이 커지고, offset_cutoff(1000)를 넘으면
+# 페이지가 반복된다. 여기서는 정렬의 모든 필드 값을 커서에 넣고 (a, b, id) 다음부터 가져온다.
+# 커서는 base64로 인코딩되어 클라이언트 입장에서는 불투명한 문자열이다.
+import json
+from base64 import b64decode, b64encode
+from urllib import parse
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, \
+    _reverse_ordering
+from rest_framework.utils.urls import replace_query_param
+
+
+def keyset_filter(ordering, position):
+    """Return a filter for the rows after a position in an ordering"""
+    # 방향이 섞인 정렬은 (a, b, c) > (x, y, z) 한번으로 쓸 수 없으므로 나눠서 쓴다.
+    # a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+    condition = Q()
+    equal = {}
+    for order, value in zip(ordering, position):
+        name = order.lstrip('-')
+        lookup = 'lt' if order.startswith('-') else 'gt'
+        condition |= Q(**equal, **{f'{name}__{lookup}': value})
+        equal[name] = value
+    return condition
+
+
+class OptionalCursorPagination(CursorPagination):
+    """Cursor pagination that is only applied when the client asks for it"""
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # 기존 클라이언트는 전체 목록을 받으므로, cursor나 page_size를 보낸 경우에만 나눈다.
+        params = request.query_params
+        if self.cursor_query_param not in params and \
+                self.page_size_query_param not in params:
+            return None
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+
+        # 이전 페이지는 정렬을 뒤집어서 커서 앞의 행을 가져온 뒤 다시 뒤집는다.
+        reverse = self.cursor is not None and self.cursor.reverse
+        ordering = _reverse_ordering(self.ordering) if reverse \
+            else self.ordering
+        queryset = queryset.order_by(*ordering)
+        position = self.cursor.position if self.cursor else None
+        if position is not None:
+            position = self.clean_position(queryset.model, position)
+            queryset = queryset.filter(keyset_filter(ordering, position))
+
+        # 다음 페이지가 있는지 알기 위해 하나 더 가져온다.
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+            self.has_previous = has_more
+            # 위치가 없는 이전 커서는 마지막 페이지이다.
+            self.has_next = position is not None
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def _position(self, instance):
+        return [
+            getattr(instance, order.lstrip('-')) for order in self.ordering
+        ]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        # 이전 페이지가 비어있으면 기준이 없으므로 처음부터 보여준다.
+        position = self._position(self.page[-1]) if self.page else None
+        return self.encode_cursor(Cursor(0, False, position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        # 다음 페이지가 비어있으면 마지막 페이지로 돌아간다.
+        position = self._position(self.page[0]) if self.page else None
+        return self.encode_cursor(Cursor(0, True, position))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            tokens = parse.parse_qs(
+                b64decode(encoded.encode('ascii')).decode('ascii'),
+                keep_blank_values=True
+            )
+            reverse = bool(int(tokens.get('r', ['0'])[0]))
+            position = tokens.get('p', [None])[0]
+            if position is not None:
+                position = json.loads(position)
+                if not isinstance(position, list) or \
+                        len(position) != len(self.ordering):
+                    raise ValueError(position)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        return Cursor(offset=0, reverse=reverse, position=position)
+
+    def clean_position(self, model, position):
+        """Return cursor values converted to the types of their fields"""
+        # 커서는 클라이언트가 바꿀 수 있으므로, 필드에 맞지 않는 값은 쿼리 전에 404로 돌려준다.
+        cleaned = []
+        for order, value in zip(self.ordering, position):
+            field = model._meta.get_field(order.lstrip('-'))
+            try:
+                if value is None or isinstance(value, (list, dict)):
+                    raise ValidationError(value)
+                cleaned.append(field.to_python(value))
+            except ValidationError:
+                raise NotFound(self.invalid_cursor_message)
+        return cleaned
+
+    def encode_cursor(self, cursor):
+        tokens = {}
+        if cursor.reverse:
+            tokens['r'] = '1'
+        if cursor.position is not None:
+            tokens['p'] = json.dumps(cursor.position, default=str)
+        encoded = b64encode(
+            parse.urlencode(tokens).encode('ascii')
+        ).decode('ascii')
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded
+        )
+
+
+class RecipeAttrCursorPagination(OptionalCursorPagination):
+    """Paginate tags and ingredients by name then id"""
+    ordering = ('-name', 'id')
+
+    def get_ordering(self, request, queryset, view):
+        # ?ordering=usage 이면 사용 횟수로 정렬된 목록을 나눈다.
+        if hasattr(view, 'get_ordering'):
+            return view.get_ordering()
+        return self.ordering
+
+
+class RecipeCursorPagination(OptionalCursorPagination):
+    """Paginate recipes by id, newest first"""
+    ordering = ('-id',)
@@ -0,0 +1,66 @@
+# 뷰셋이 시리얼라이저에 맞춰 쿼리셋을 계획하도록 도와주는 모듈.
+# 시리얼라이저가 렌더링하는 필드만 가져오고(only), N:N 관계는 미리 한번에 가져온다(prefetch).
+# 이렇게 하면 레시피가 몇 개든 관계마다 쿼리가 하나씩만 실행된다. (N+1 문제 방지)
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+
+from rest_framework import serializers
+
+
+def _concrete_fields(model, serializer_fields):
+    """Return model field names backing the given serializer fields"""
+    names = []
+    for field in serializer_fields.values():
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            continue
+        if model_field.concrete and not model_field.many_to_many:
+            names.append(model_field.attname)
+    return names
+
+
+def plan_queryset(queryset, serializer_class, context=None):
+    """Narrow and prefetch a queryset for rendering with serializer_class"""
+    model = queryset.model
+    # 응답에 쓸 것과 같은 context로 만들어야 ?fields=로 줄인 필드만 본다.
+    fields = serializer_class(context=context or {}).fields
+    only = ['id']
+    prefetches = []
+
+    for field in fields.values():
+        if field.write_only:
+            continue
+        # 모델 필드를 직접 쓰지 않는 필드는 필요한 모델 필드를 only_fields로 알려준다.
+        only.extend(getattr(field, 'only_fields', ()))
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            continue
+
+        if model_field.many_to_many or model_field.one_to_many:
+            related_model = model_field.related_model
+            # 중첩 시리얼라이저라면 그 시리얼라이저가 쓰는 필드만, id 목록이라면 id만 가져온다.
+            # 직접 만든 필드는 prefetch_fields로 필요한 필드를 알려준다.
+            if isinstance(field, serializers.ListSerializer):
+                related_fields = ['id'] + _concrete_fields(
+                    related_model, field.child.fields
+                )
+            else:
+                related_fields = ['id'] + list(
+                    getattr(field, 'prefetch_fields', ())
+                )
+            if model_field.one_to_many:
+                # 역방향 FK는 어느 객체의 것인지 알아야 하므로 FK 컬럼도 가져온다.
+                related_fields.append(model_field.field.attname)
+            # id 순서로 가져와야 응답이 db의 실행 계획과 상관없이 같다.
+            prefetches.append(Prefetch(
+                field.source,
+                queryset=related_model.objects.only(
+                    *related_fields
+                ).order_by('pk')
+            ))
+        elif model_field.concrete:
+            only.append(model_field.attname)
+
+    return queryset.only(*only).prefetch_related(*prefetches)
@@ -0,0 +1,36 @@
+# 조회 요청을 읽기 전용 복제본(replica) db로 보내는 뷰셋 믹스인.
+# GET, HEAD, OPTIONS 요청의 조회만 복제본으로 보내고 쓰기 요청은 모두 기본 db를 쓴다.
+# 복제본은 기본 db보다 조금 늦게 반영되므로, 데이터를 바꾼 유저는 잠시 기본 db에서 읽는다.(read your writes)
+# 데이터가 바뀐 시각은 목록 캐시의 데이터 버전과 같이 기록된 것을 쓴다. (recipe.cache 참고)
+# 그래서 요청으로 바꾼 것뿐 아니라 백그라운드 작업이 바꾼 것도 바로 보인다.
+import time
+
+from django.conf import settings
+
+from rest_framework.permissions import SAFE_METHODS
+
+from core.db.routers import replica_aliases, set_replica_reads
+from recipe.cache import get_data_version
+
+
+def recently_modified(user_id):
+    """Return whether a user changed their data a moment ago"""
+    window = getattr(settings, 'DB_READ_YOUR_WRITES_SECONDS', 5)
+    _, modified = get_data_version(user_id)
+    return time.time() - modified < window
+
+
+class ReplicaReadMixin:
+    """Read from a replica on safe requests unless the user just wrote"""
+
+    def initial(self, request, *args, **kwargs):
+        # 인증이 끝나야 어떤 유저인지 알 수 있다.
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and replica_aliases() and \
+                not recently_modified(request.user.id):
+            set_replica_reads(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        # 같은 스레드의 다음 요청이나 백그라운드 작업에 남지 않도록 끈다.
+        set_replica_reads(False)
+        return super().finalize_response(request, response, *args, **kwargs)
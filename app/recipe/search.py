@@ -0,0 +1,133 @@
+# 레시피 전문 검색(full-text search).
+# postgres에서는 레시피 제목(A), 태그 이름(B), 재료 이름(C)을 합친 search_vector 컬럼을 저장해두고
+# GIN 인덱스로 검색한 뒤 SearchRank로 순위를 매긴다. search_vector는 시그널로 갱신된다.
+# 다른 db(예: 테스트용 sqlite)에서는 같은 가중치를 쓰는 파이썬 인덱스로 대신한다.
+import re
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchRank, \
+    SearchVector
+from django.db import connections
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from rest_framework.pagination import PageNumberPagination
+
+from core.models import Recipe
+
+
+SEARCH_CONFIG = getattr(settings, 'RECIPE_SEARCH_CONFIG', 'english')
+# postgres의 기본 가중치(D, C, B, A)와 같은 비율을 쓴다.
+FALLBACK_WEIGHTS = {'title': 1.0, 'tags': 0.4, 'ingredients': 0.2}
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def is_postgres(queryset):
+    """Return whether the queryset runs on postgres"""
+    return connections[queryset.db].vendor == 'postgresql'
+
+
+def _names_subquery(field_name):
+    """Return a subquery joining the names of a recipe relation"""
+    through = Recipe._meta.get_field(field_name).remote_field.through
+    related = Recipe._meta.get_field(field_name).m2m_reverse_field_name()
+    return Subquery(
+        through.objects.filter(recipe=OuterRef('pk')).values(
+            'recipe'
+        ).annotate(
+            names=StringAgg(f'{related}__name', ' ')
+        ).values('names')
+    )
+
+
+def recipes_using(model, ids):
+    """Return the recipes whose search vector depends on the given objects"""
+    if model is Recipe:
+        return Recipe.objects.filter(id__in=ids)
+    for field_name in ('tags', 'ingredients'):
+        field = Recipe._meta.get_field(field_name)
+        if field.related_model is model:
+            return Recipe.objects.filter(
+                id__in=field.remote_field.through.objects.filter(**{
+                    f'{field.m2m_reverse_name()}__in': ids
+                }).values(field.m2m_column_name())
+            )
+    return Recipe.objects.none()
+
+
+def update_search_vectors(recipes):
+    """Rebuild the stored search vector of the given recipes"""
+    if not is_postgres(recipes):
+        return
+    # 태그, 재료 이름은 서브쿼리로 합쳐서 한번의 UPDATE로 갱신한다.
+    recipes.update(search_vector=(
+        SearchVector('title', weight='A', config=SEARCH_CONFIG) +
+        SearchVector(
+            Coalesce(_names_subquery('tags'), Value('')),
+            weight='B', config=SEARCH_CONFIG
+        ) +
+        SearchVector(
+            Coalesce(_names_subquery('ingredients'), Value('')),
+            weight='C', config=SEARCH_CONFIG
+        )
+    ))
+
+
+def tokenize(text):
+    """Split text into lower case search terms"""
+    return TOKEN_RE.findall(text.lower())
+
+
+def _fallback_search(queryset, q):
+    """Rank recipes in python when postgres search is not available"""
+    terms = set(tokenize(q))
+    if not terms:
+        return []
+
+    # 레시피마다 검색어가 나타나는 부분의 가중치를 모아서 인덱스를 만든다.
+    index = defaultdict(lambda: defaultdict(float))
+    for recipe_id, title in queryset.values_list('id', 'title'):
+        weights = index[recipe_id]
+        for term in tokenize(title):
+            weights[term] += FALLBACK_WEIGHTS['title']
+    for field_name in ('tags', 'ingredients'):
+        field = Recipe._meta.get_field(field_name)
+        related = field.m2m_reverse_field_name()
+        rows = field.remote_field.through.objects.filter(
+            recipe_id__in=list(index)
+        ).values_list('recipe_id', f'{related}__name')
+        for recipe_id, name in rows:
+            for term in tokenize(name):
+                index[recipe_id][term] += FALLBACK_WEIGHTS[field_name]
+
+    # postgres의 plainto_tsquery처럼 모든 검색어가 있어야 결과에 포함된다.
+    ranks = {
+        recipe_id: sum(weights[term] for term in terms)
+        for recipe_id, weights in index.items()
+        if terms.issubset(weights)
+    }
+    recipes = list(queryset.filter(id__in=list(ranks)))
+    recipes.sort(key=lambda recipe: (-ranks[recipe.id], -recipe.id))
+    return recipes
+
+
+def search_recipes(queryset, q):
+    """Return the recipes matching q ordered by rank"""
+    if not is_postgres(queryset):
+        return _fallback_search(queryset, q)
+
+    query = SearchQuery(q, config=SEARCH_CONFIG)
+    return queryset.filter(search_vector=query).annotate(
+        rank=SearchRank(F('search_vector'), query)
+    ).order_by('-rank', '-id')
+
+
+class RecipeSearchPagination(PageNumberPagination):
+    """Paginate ranked search results by page number"""
+    # 순위로 정렬된 결과는 커서로 나눌 수 없으므로 페이지 번호를 쓴다.
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -1,6 +1,148 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils.translation import ugettext_lazy as _
+
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+from rest_framework.settings import api_settings
+
+from core.models import Tag, Ingredient, Recipe, RecipeImageRendition
+from recipe.bulk import bulk_create, bulk_update, set_many_related
+from recipe.cache import LazyValue
+from recipe.direct_uploads import CONTENT_TYPES
+from recipe.fastpath import FALLBACK
+from recipe.fieldsets import SparseFieldsetMixin
+from recipe.images import RENDITION_SIZES, has_all_renditions, \
+    schedule_missing_renditions
+
+
+class UserOwnedManyRelatedField(serializers.ManyRelatedField):
+    """Many related field resolving every primary key with one query"""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        child = self.child_relation
+        queryset = child.get_queryset()
+        pk_field = queryset.model._meta.pk
+        pks = []
+        for item in data:
+            try:
+                pk = pk_field.to_python(item)
+            except (TypeError, DjangoValidationError):
+                child.fail('incorrect_type', data_type=type(item).__name__)
+            # 같은 id가 여러번 와도 한번만, 보낸 순서대로 처리한다.
+            if pk not in pks:
+                pks.append(pk)
+
+        # DRF는 id마다 get()을 하지만, 여기서는 한번의 IN 쿼리로 모두 가져온다.
+        found = queryset.in_bulk(pks)
+        missing = [pk for pk in pks if pk not in found]
+        if missing:
+            # 없는 id를 하나씩이 아니라 한번에 모두 알려준다.
+            raise serializers.ValidationError([
+                child.error_messages['does_not_exist'].format(pk_value=pk)
+                for pk in missing
+            ])
+        return [found[pk] for pk in pks]
+
+
+class UserOwnedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key related field limited to objects of the request user"""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        # many=True일 때 DRF의 ManyRelatedField 대신 한번에 조회하는 필드를 쓴다.
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return UserOwnedManyRelatedField(**list_kwargs)
+
+    def get_queryset(self):
+        # 다른 유저의 태그나 재료 id는 받지 않는다.
+        queryset = super().get_queryset()
+        request = self.context.get('request')
+        if request is None:
+            return queryset.none()
+        return queryset.filter(user=request.user)
+
+
+class RenditionUrls(LazyValue):
+    """Renditions of a recipe image with urls made for each request"""
+
+    def __init__(self, renditions):
+        # 주소는 호스트와 저장소 서명에 따라 달라지므로 저장소의 파일 이름만 가진다.
+        self.renditions = [
+            (rendition.size, rendition.format, rendition.width,
+             rendition.height, rendition.file.name)
+            for rendition in renditions
+        ]
 
-from core.models import Tag, Ingredient, Recipe
+    def resolve(self, request):
+        # {'thumbnail': {'width': 200, 'height': 150, 'webp': url, ...},
+        #  'srcset': {'webp': 'url 200w, url 600w', ...}}
+        storage = RecipeImageRendition._meta.get_field('file').storage
+        data = {}
+        srcset = {}
+        for size, fmt, width, height, name in self.renditions:
+            url = storage.url(name)
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            entry = data.setdefault(size, {'width': width, 'height': height})
+            entry[fmt] = url
+            # 원본이 작으면 여러 크기의 가로 길이가 같을 수 있으므로 한번만 넣는다.
+            widths = srcset.setdefault(fmt, {})
+            widths.setdefault(width, url)
+        data['srcset'] = {
+            fmt: ', '.join(f'{url} {width}w' for width, url in widths.items())
+            for fmt, widths in srcset.items()
+        }
+        return data
+
+
+class ImageRenditionsField(serializers.Field):
+    """Read only field mapping each image size to its rendition urls"""
+    # plan_queryset이 사본을 한번에 가져오고, 원본 정보를 only()에 넣도록 알려준다.
+    prefetch_fields = ('size', 'format', 'width', 'height', 'file')
+    only_fields = ('image', 'image_status', 'image_status_at')
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        kwargs.setdefault('source', 'renditions')
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        # 사본이 없는지 확인하려면 레시피도 필요하다.
+        return instance
+
+    def fast_representation(self, row):
+        """Return the value of a values() row or FALLBACK to render it"""
+        # 이미지가 없으면 사본을 가져올 필요가 없다. (recipe.fastpath 참고)
+        if not row['image']:
+            return None
+        return FALLBACK
+
+    def to_representation(self, recipe):
+        if not recipe.image:
+            return None
+        renditions = list(getattr(recipe, self.source).all())
+        if not has_all_renditions(renditions):
+            # 처음 접근할 때 빠진 사본을 만든다. 만들어질 때까지는 있는 것만 보여준다.
+            schedule_missing_renditions(recipe)
+
+        order = {
+            size: index for index, (size, _) in enumerate(RENDITION_SIZES)
+        }
+        renditions.sort(key=lambda rendition: order.get(rendition.size, 0))
+        value = RenditionUrls(renditions)
+        # 캐시하는 목록에는 파일 이름만 넣고, 응답을 보낼 때 주소로 바꾼다. (recipe.cache 참고)
+        if self.context.get('lazy_file_urls'):
+            return value
+        return value.resolve(self.context.get('request'))
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -22,27 +164,36 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+# 조회할 때 ?fields=, ?expand= 로 응답 필드를 고를 수 있다. (recipe.fieldsets 참고)
+class RecipeSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serialize a recipe"""
     # 관련 모델을 가져오기 위함이다. 1:N과 N:N 모델을 가져온다.
     # 재료에 대한 모든 것을 가져오는 것이 아니라, id만 가져오고 싶기 때문에 primarykeyrelatedfield를 넣는다.
-    ingredients = serializers.PrimaryKeyRelatedField(
+    # 요청한 유저의 것만, 모든 id를 한번의 쿼리로 확인한다.
+    ingredients = UserOwnedPrimaryKeyRelatedField(
         # N:N이므로 many=True
         many=True,
         queryset=Ingredient.objects.all()
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = UserOwnedPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
+    # 목록에서 원본 대신 작은 사본을 쓸 수 있도록 크기별 url을 준다.
+    image_renditions = ImageRenditionsField()
+    expandable_fields = {
+        'tags': TagSerializer,
+        'ingredients': IngredientSerializer,
+    }
 
     class Meta:
         model = Recipe
         fields = (
             'id', 'title', 'ingredients', 'tags', 'time_minutes',
-            'price', 'link'
+            'price', 'link', 'image_status', 'image_renditions'
         )
-        read_only_fields = ('id',)
+        # 이미지 처리 상태는 업로드한 뒤 백그라운드 작업이 바꾼다.
+        read_only_fields = ('id', 'image_status')
 
 
 class RecipeDetailSerializer(RecipeSerializer):
@@ -58,5 +209,159 @@ class RecipeImageSerializer(serializers.ModelSerializer):
     # 우리의 레시피에 업로드할 사진
     class Meta:
         model = Recipe
-        fields = ('id', 'image')
-        read_only_fields = ('id',)
+        fields = (
+            'id', 'image', 'image_status', 'image_width', 'image_height'
+        )
+        read_only_fields = ('id', 'image_status')
+
+
+class ImageUploadUrlSerializer(serializers.Serializer):
+    """Serializer for requesting a direct image upload url"""
+    content_type = serializers.ChoiceField(choices=list(CONTENT_TYPES))
+
+
+class ImageUploadCompleteSerializer(serializers.Serializer):
+    """Serializer for completing a direct image upload"""
+    token = serializers.CharField()
+
+
+class IdListField(serializers.ListField):
+    """List of integer ids without duplicates"""
+
+    def __init__(self, **kwargs):
+        kwargs['child'] = serializers.IntegerField()
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        # 같은 id가 여러번 와도 중간 테이블에는 한번만, 보낸 순서대로 넣는다.
+        return list(dict.fromkeys(super().to_internal_value(data)))
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """List serializer validating and writing many objects at once"""
+    # 자식 시리얼라이저에서 ListField로 선언된 N:N 관계의 id 목록을 한번의 쿼리로 검증한다.
+    default_error_messages = {
+        'max_items': _('Ensure there are no more than {max_items} items.'),
+        'does_not_exist': serializers.PrimaryKeyRelatedField
+        .default_error_messages['does_not_exist'],
+        'not_found': _('Object with this id does not exist.'),
+    }
+
+    def _related_models(self):
+        """Return the related model of each many to many id list field"""
+        model = self.child.Meta.model
+        return {
+            name: model._meta.get_field(name).related_model
+            for name, field in self.child.fields.items()
+            if isinstance(field, serializers.ListField)
+        }
+
+    def to_internal_value(self, data):
+        max_items = getattr(settings, 'RECIPE_BULK_MAX_ITEMS', 1000)
+        if isinstance(data, list) and len(data) > max_items:
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    self.error_messages['max_items'].format(
+                        max_items=max_items
+                    )
+                ]
+            })
+        validated = super().to_internal_value(data)
+
+        # 항목마다 오류를 모아서 어떤 항목이 왜 실패했는지 한번에 알려준다.
+        errors = [{} for _ in validated]
+        user = self.context['request'].user
+        if self.instance is not None:
+            found = {obj.id for obj in self.instance}
+            for index, item in enumerate(validated):
+                if item.get('id') not in found:
+                    errors[index]['id'] = [self.error_messages['not_found']]
+
+        for name, model in self._related_models().items():
+            ids = {pk for item in validated for pk in item.get(name, ())}
+            found = set(model.objects.filter(
+                user=user, id__in=ids
+            ).values_list('id', flat=True))
+            for index, item in enumerate(validated):
+                missing = [pk for pk in item.get(name, ()) if pk not in found]
+                if missing:
+                    errors[index][name] = [
+                        self.error_messages['does_not_exist'].format(
+                            pk_value=pk
+                        )
+                        for pk in missing
+                    ]
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return validated
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        related = {name: [] for name in self._related_models()}
+        objs = []
+        for item in validated_data:
+            item.pop('id', None)
+            for name, id_lists in related.items():
+                id_lists.append(item.pop(name, []))
+            objs.append(model(**item))
+
+        objs = bulk_create(model, objs)
+        for name, id_lists in related.items():
+            set_many_related(model, name, {
+                obj.id: ids for obj, ids in zip(objs, id_lists) if ids
+            })
+        return objs
+
+    def update(self, instance, validated_data):
+        model = self.child.Meta.model
+        instances = {obj.id: obj for obj in instance}
+        related = {name: {} for name in self._related_models()}
+        changed = set()
+        objs = []
+        for item in validated_data:
+            obj = instances[item.pop('id')]
+            # 소유자는 바꿀 수 없다.
+            item.pop('user', None)
+            for name, id_lists in related.items():
+                if name in item:
+                    id_lists[obj.id] = item.pop(name)
+            for attr, value in item.items():
+                setattr(obj, attr, value)
+                changed.add(attr)
+            objs.append(obj)
+
+        if changed:
+            bulk_update(model, list(instances.values()), changed)
+        for name, id_lists in related.items():
+            if id_lists:
+                set_many_related(model, name, id_lists)
+        return objs
+
+
+class TagBulkSerializer(TagSerializer):
+    """Serializer for creating and updating many tags"""
+    # 수정할 때는 어떤 객체인지 알아야 하므로 id를 쓸 수 있게 한다.
+    id = serializers.IntegerField(required=False)
+
+    class Meta(TagSerializer.Meta):
+        list_serializer_class = BulkListSerializer
+
+
+class IngredientBulkSerializer(IngredientSerializer):
+    """Serializer for creating and updating many ingredients"""
+    id = serializers.IntegerField(required=False)
+
+    class Meta(IngredientSerializer.Meta):
+        list_serializer_class = BulkListSerializer
+
+
+class RecipeBulkSerializer(RecipeSerializer):
+    """Serializer for creating and updating many recipes"""
+    id = serializers.IntegerField(required=False)
+    # 항목마다 id를 조회하지 않도록 정수 목록으로 받고, BulkListSerializer에서 한번에 검증한다.
+    ingredients = IdListField(required=False)
+    tags = IdListField(required=False)
+
+    class Meta(RecipeSerializer.Meta):
+        list_serializer_class = BulkListSerializer
@@ -0,0 +1,163 @@
+# 유저의 데이터가 바뀌면 목록 캐시의 버전을 올린다.
+# api의 perform_create, update, destroy, upload_image 뿐만 아니라 admin에서 바꾼 것도 반영된다.
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_init, post_save, post_delete, \
+    pre_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import Tag, Ingredient, Recipe
+from recipe.blobs import release_image, retain_image
+from recipe.cache import bump_data_version_on_commit
+from recipe.search import update_search_vectors
+from recipe.usage import count_recipe_delete, count_relation_change
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def bump_version_on_write(sender, instance, using, **kwargs):
+    """Bump the data version of the owner of a changed object"""
+    bump_data_version_on_commit(instance.user_id, using=using)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def bump_version_on_relation_change(sender, instance, action, reverse,
+                                    pk_set, using, **kwargs):
+    """Touch recipes and bump the data version when relations change"""
+    # 레시피의 태그나 재료가 바뀌면 레시피의 변경 시각도 바꿔서 ETag가 달라지게 한다.
+    # reverse는 tag.recipe_set.add() 처럼 반대쪽에서 바꾼 경우이다.
+    now = timezone.now()
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            Recipe.objects.filter(pk=instance.pk).update(updated_at=now)
+    elif action == 'pre_clear':
+        # 지운 뒤에는 어떤 레시피였는지 알 수 없으므로 지우기 전에 처리한다.
+        instance.recipe_set.update(updated_at=now)
+    elif action in ('post_add', 'post_remove'):
+        Recipe.objects.filter(pk__in=pk_set).update(updated_at=now)
+
+    if action.startswith('post_'):
+        bump_data_version_on_commit(instance.user_id, using=using)
+
+
+# 태그나 재료를 지우면 중간 테이블의 행은 m2m_changed 없이 같이 지워지고, 레시피의 변경 시각에서
+# 그 태그의 updated_at도 빠지므로 ETag가 그대로 남는다. 그래서 쓰던 레시피의 변경 시각을 바꾼다.
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def touch_recipes_on_delete(sender, instance, **kwargs):
+    """Touch the recipes using a tag or ingredient being deleted"""
+    instance.recipe_set.update(updated_at=timezone.now())
+
+
+# 새 유저는 이전 캐시와 겹치지 않도록 새 버전으로 시작한다.
+@receiver(post_save, sender=get_user_model())
+def bump_version_on_user_create(sender, instance, created, using,
+                                **kwargs):
+    """Start a new user with a fresh data version"""
+    if created:
+        bump_data_version_on_commit(instance.id, using=using)
+
+
+# 제목, 태그 이름, 재료 이름이 바뀌면 저장된 검색 컬럼을 다시 만든다. (postgres에서만)
+@receiver(post_save, sender=Recipe)
+def update_search_vector_on_recipe_save(sender, instance, **kwargs):
+    """Rebuild the search vector of a saved recipe"""
+    update_search_vectors(Recipe.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def update_search_vector_on_name_change(sender, instance, created, **kwargs):
+    """Rebuild the search vectors of recipes using a renamed object"""
+    if not created:
+        update_search_vectors(instance.recipe_set.all())
+
+
+# 태그나 재료를 지우면 중간 테이블의 행은 m2m_changed 없이 같이 지워진다.
+# 지운 뒤에는 어떤 레시피가 썼는지 알 수 없으므로 지우기 전에 찾아둔다.
+# 여러 개를 한번에 지우는 queryset.delete()도 객체마다 시그널을 보낸다.
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def remember_recipes_on_delete(sender, instance, **kwargs):
+    """Remember the recipes using a tag or ingredient being deleted"""
+    instance._recipe_ids = list(
+        instance.recipe_set.values_list('id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def update_search_vector_on_delete(sender, instance, **kwargs):
+    """Rebuild the search vectors of recipes that used a deleted object"""
+    recipe_ids = getattr(instance, '_recipe_ids', None)
+    if recipe_ids:
+        update_search_vectors(Recipe.objects.filter(id__in=recipe_ids))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def update_search_vector_on_relation_change(sender, instance, action,
+                                            reverse, pk_set, **kwargs):
+    """Rebuild search vectors when tags or ingredients are changed"""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        update_search_vectors(Recipe.objects.filter(pk=instance.pk))
+    elif action == 'post_clear':
+        # 지워진 뒤에는 어떤 레시피였는지 알 수 없으므로 그 유저의 레시피를 다시 만든다.
+        update_search_vectors(Recipe.objects.filter(user_id=instance.user_id))
+    else:
+        update_search_vectors(Recipe.objects.filter(pk__in=pk_set))
+
+
+# 이미지 파일을 쓰는 레시피 수를 센다. 이미지를 바꾸거나 레시피를 지우면 예전 파일의 수가 줄어든다.
+@receiver(post_init, sender=Recipe)
+def remember_image_name(sender, instance, **kwargs):
+    """Remember the image a recipe was loaded with"""
+    # only()로 image를 뺀 경우에는 읽으면 쿼리가 실행되므로 __dict__에서 확인한다.
+    value = instance.__dict__.get('image')
+    instance._loaded_image = getattr(value, 'name', value) or None
+
+
+@receiver(post_save, sender=Recipe)
+def count_image_references_on_save(sender, instance, **kwargs):
+    """Update image reference counts when the image of a recipe changes"""
+    if 'image' not in instance.__dict__:
+        return
+    old = instance._loaded_image
+    new = instance.image.name or None
+    if new == old:
+        return
+    if new:
+        retain_image(new)
+    if old:
+        release_image(old)
+    instance._loaded_image = new
+
+
+@receiver(post_delete, sender=Recipe)
+def count_image_references_on_delete(sender, instance, **kwargs):
+    """Release the image of a deleted recipe"""
+    if instance._loaded_image:
+        release_image(instance._loaded_image)
+
+
+# 태그와 재료를 쓰는 레시피 수를 바뀐 만큼 더하고 뺀다. (recipe.usage 참고)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def count_usage_on_relation_change(sender, instance, action, reverse,
+                                   pk_set, **kwargs):
+    """Keep the recipe counts of tags and ingredients in sync"""
+    count_relation_change(sender, instance, action, reverse, pk_set)
+
+
+@receiver(pre_delete, sender=Recipe)
+def count_usage_on_recipe_delete(sender, instance, **kwargs):
+    """Decrease the recipe counts of the tags and ingredients of a recipe"""
+    # 지운 뒤에는 중간 테이블의 행이 없으므로 지우기 전에 처리한다.
+    count_recipe_delete(instance)
@@ -0,0 +1,48 @@
+# 백그라운드 작업 실행.
+# 별도의 브로커 없이 프로세스 안의 스레드 풀에서 작업을 실행한다.
+# 요청은 작업을 넣기만 하고 바로 응답하며, 작업은 트랜잭션이 커밋된 뒤에 시작된다.
+# 테스트처럼 바로 실행해야 할 때는 RECIPE_TASKS_EAGER를 켠다.
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the worker pool of this process, creating it on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'RECIPE_TASK_WORKERS', 2),
+                thread_name_prefix='recipe-task'
+            )
+    return _executor
+
+
+def run_task(func, *args):
+    """Run a task in a worker thread and release its connections"""
+    try:
+        func(*args)
+    except Exception:
+        logger.exception('Background task %s failed', func.__name__)
+    finally:
+        # 작업 스레드가 연 db 연결은 요청이 끝날 때처럼 자동으로 닫히지 않는다.
+        connections.close_all()
+
+
+def enqueue(func, *args):
+    """Run a task in the background once the current transaction commits"""
+    if getattr(settings, 'RECIPE_TASKS_EAGER', False):
+        func(*args)
+        return
+    # 커밋 전에 시작하면 작업 스레드에서 아직 저장되지 않은 데이터를 보게 된다.
+    transaction.on_commit(lambda: get_executor().submit(run_task, func, *args))
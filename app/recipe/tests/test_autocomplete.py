@@ -0,0 +1,96 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient
+
+
+TAGS_AUTOCOMPLETE_URL = reverse('recipe:tag-autocomplete')
+INGREDIENTS_AUTOCOMPLETE_URL = reverse('recipe:ingredient-autocomplete')
+
+
+class AutocompleteTests(TestCase):
+    """Test autocompleting tag and ingredient names"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_autocomplete_login_required(self):
+        """Test that login is required to autocomplete"""
+        res = APIClient().get(TAGS_AUTOCOMPLETE_URL, {'q': 've'})
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_prefix_autocomplete(self):
+        """Test names starting with the query are returned by name"""
+        Tag.objects.create(user=self.user, name='Vegetarian')
+        Tag.objects.create(user=self.user, name='vegan')
+        Tag.objects.create(user=self.user, name='Dessert')
+        user2 = get_user_model().objects.create_user(
+            'other@londonappdev.com',
+            'testpass'
+        )
+        Tag.objects.create(user=user2, name='Veggie')
+
+        res = self.client.get(TAGS_AUTOCOMPLETE_URL, {'q': 'VEG'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [tag['name'] for tag in res.data], ['Vegetarian', 'vegan']
+        )
+
+    def test_autocomplete_limit(self):
+        """Test only the requested number of names is returned"""
+        for i in range(5):
+            Ingredient.objects.create(user=self.user, name=f'Salt {i}')
+
+        res = self.client.get(
+            INGREDIENTS_AUTOCOMPLETE_URL, {'q': 'salt', 'limit': 2}
+        )
+
+        self.assertEqual(
+            [ingredient['name'] for ingredient in res.data],
+            ['Salt 0', 'Salt 1']
+        )
+
+    def test_fuzzy_autocomplete(self):
+        """Test misspelled queries find similar names"""
+        Ingredient.objects.create(user=self.user, name='Tomato')
+        Ingredient.objects.create(user=self.user, name='Potato')
+        Ingredient.objects.create(user=self.user, name='Cucumber')
+
+        res = self.client.get(
+            INGREDIENTS_AUTOCOMPLETE_URL, {'q': 'tomatoe', 'mode': 'fuzzy'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0]['name'], 'Tomato')
+        self.assertNotIn('Cucumber', [item['name'] for item in res.data])
+
+    def test_autocomplete_empty_query(self):
+        """Test an empty query returns no names"""
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.get(TAGS_AUTOCOMPLETE_URL, {'q': ' '})
+
+        self.assertEqual(res.data, [])
+
+    def test_autocomplete_invalid_params(self):
+        """Test an unknown mode or bad limit returns 400"""
+        res1 = self.client.get(
+            TAGS_AUTOCOMPLETE_URL, {'q': 'veg', 'mode': 'regex'}
+        )
+        res2 = self.client.get(
+            TAGS_AUTOCOMPLETE_URL, {'q': 'veg', 'limit': 1000}
+        )
+
+        self.assertEqual(res1.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res2.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,210 @@
+import io
+import os
+import threading
+import time
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from PIL import Image
+
+from core.models import ImageBlob, Recipe
+from recipe.blobs import delete_orphan, retain_image, storage_report
+
+
+def sample_image(color=(200, 30, 30)):
+    """Return the bytes of a sample JPEG image"""
+    buffer = io.BytesIO()
+    Image.new('RGB', (10, 10), color).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+# 테스트는 트랜잭션 안에서 실행되므로 커밋 뒤의 작업을 바로 실행한다.
+@patch('recipe.blobs.transaction.on_commit', lambda func, using=None: func())
+class ImageBlobTests(TestCase):
+    """Test deduplicated storage of recipe images"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@londonappdev.com',
+            'testpass'
+        )
+        self.recipe1 = self._recipe('Recipe 1')
+        self.recipe2 = self._recipe('Recipe 2')
+
+    def tearDown(self):
+        for blob in ImageBlob.objects.all():
+            Recipe._meta.get_field('image').storage.delete(blob.name)
+
+    def _recipe(self, title):
+        return Recipe.objects.create(
+            user=self.user, title=title, time_minutes=10, price=5
+        )
+
+    def test_same_content_stored_once(self):
+        """Test identical uploads share one file"""
+        self.recipe1.image.save('a.jpg', ContentFile(sample_image()))
+        self.recipe2.image.save('b.jpg', ContentFile(sample_image()))
+
+        self.assertEqual(self.recipe1.image.name, self.recipe2.image.name)
+        blob = ImageBlob.objects.get()
+        self.assertEqual(blob.name, self.recipe1.image.name)
+        self.assertEqual(blob.refcount, 2)
+
+    def test_replaced_image_released(self):
+        """Test replacing an image deletes the old file once unused"""
+        self.recipe1.image.save('a.jpg', ContentFile(sample_image()))
+        self.recipe2.image.save('b.jpg', ContentFile(sample_image()))
+        shared = self.recipe1.image.path
+
+        self.recipe1.image.save(
+            'c.jpg', ContentFile(sample_image((0, 0, 255)))
+        )
+        # 다른 레시피가 아직 쓰고 있다.
+        self.assertTrue(os.path.exists(shared))
+        self.assertEqual(
+            ImageBlob.objects.get(name=self.recipe2.image.name).refcount, 1
+        )
+
+        self.recipe2.delete()
+        self.assertFalse(os.path.exists(shared))
+        self.assertFalse(
+            ImageBlob.objects.filter(name=self.recipe2.image.name).exists()
+        )
+
+    def test_deleting_user_releases_images(self):
+        """Test cascading deletes release images too"""
+        self.recipe1.image.save('a.jpg', ContentFile(sample_image()))
+        path = self.recipe1.image.path
+
+        self.user.delete()
+
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(ImageBlob.objects.exists())
+
+    def test_storage_report(self):
+        """Test the report counts bytes saved by deduplication"""
+        self.recipe1.image.save('a.jpg', ContentFile(sample_image()))
+        self.recipe2.image.save('b.jpg', ContentFile(sample_image()))
+        size = len(sample_image())
+
+        report = storage_report()
+
+        self.assertEqual(report['files'], 1)
+        self.assertEqual(report['stored_bytes'], size)
+        self.assertEqual(report['saved_bytes'], size)
+
+        out = io.StringIO()
+        call_command('image_storage_report', stdout=out)
+        self.assertIn('(50.0%)', out.getvalue())
+
+
+@skipUnless(connection.vendor == 'postgresql', 'PostgreSQL only')
+class ConcurrentOrphanDeleteTests(TransactionTestCase):
+    """Test uploading a file while it is deleted as an orphan"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@londonappdev.com',
+            'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.storage = Recipe._meta.get_field('image').storage
+
+    def tearDown(self):
+        for blob in ImageBlob.objects.all():
+            self.storage.delete(blob.name)
+
+    @patch('recipe.views.enqueue')
+    def test_upload_during_orphan_delete(self, mock_enqueue):
+        """Test an upload of a file being deleted writes it again"""
+        old = Recipe.objects.create(
+            user=self.user, title='Old', time_minutes=10, price=5
+        )
+        old.image.save('a.jpg', ContentFile(sample_image()))
+        name = old.image.name
+        # 레시피가 이미지를 지워서 아무도 쓰지 않는 파일이 된 상태
+        Recipe.objects.filter(pk=old.pk).update(image=None)
+        ImageBlob.objects.filter(name=name).update(refcount=0)
+        recipe = Recipe.objects.create(
+            user=self.user, title='New', time_minutes=10, price=5
+        )
+
+        deleting = threading.Event()
+        delete = self.storage.delete
+
+        def slow_delete(name):
+            deleting.set()
+            # 파일을 지우는 동안 같은 내용이 올라온다.
+            time.sleep(0.5)
+            delete(name)
+
+        def delete_in_thread():
+            try:
+                delete_orphan(name)
+            finally:
+                connection.close()
+
+        with patch.object(self.storage, 'delete', side_effect=slow_delete):
+            thread = threading.Thread(target=delete_in_thread)
+            thread.start()
+            self.assertTrue(deleting.wait(5))
+            res = self.client.post(
+                reverse('recipe:recipe-upload-image', args=[recipe.id]),
+                {'image': SimpleUploadedFile('b.jpg', sample_image())},
+                format='multipart'
+            )
+            thread.join()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image.name, name)
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(ImageBlob.objects.get(name=name).refcount, 1)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'PostgreSQL only')
+class ConcurrentRetainTests(TransactionTestCase):
+    """Test counting the first uses of a file at the same time"""
+
+    @patch('recipe.blobs._storage')
+    def test_concurrent_first_retain(self, mock_storage):
+        """Test two first uploads of the same file are both counted"""
+        # 두 요청 모두 행이 없는 것을 본 뒤에 행을 만든다.
+        barrier = threading.Barrier(2, timeout=5)
+
+        def size(name):
+            barrier.wait()
+            return 10
+        mock_storage.return_value.size.side_effect = size
+        errors = []
+
+        def retain():
+            try:
+                retain_image('uploads/recipe/ab/ab.jpg')
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=retain) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(
+            ImageBlob.objects.get(name='uploads/recipe/ab/ab.jpg').refcount, 2
+        )
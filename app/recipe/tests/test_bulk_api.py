@@ -0,0 +1,253 @@
+from unittest.mock import Mock, patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, RecipeImageRendition, Tag
+
+from recipe.serializers import RecipeBulkSerializer
+
+
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+TAGS_BULK_URL = reverse('recipe:tag-bulk')
+INGREDIENTS_BULK_URL = reverse('recipe:ingredient-bulk')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class BulkApiTests(TestCase):
+    """Test creating, updating and deleting many objects at once"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_tags(self):
+        """Test creating many tags in one request"""
+        payload = [{'name': 'Vegan'}, {'name': 'Dessert'}]
+
+        res = self.client.post(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        names = [tag['name'] for tag in res.data]
+        self.assertEqual(names, ['Vegan', 'Dessert'])
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_create_recipes_with_relations(self):
+        """Test creating many recipes with tags and ingredients"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        payload = [
+            {
+                'title': f'Recipe {i}',
+                'time_minutes': 10,
+                'price': '5.00',
+                'tags': [tag.id],
+                'ingredients': [ingredient.id],
+            }
+            for i in range(5)
+        ]
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 5)
+        self.assertEqual(res.data[0]['title'], 'Recipe 0')
+        self.assertEqual(res.data[0]['tags'], [tag.id])
+        recipes = Recipe.objects.filter(user=self.user)
+        self.assertEqual(recipes.count(), 5)
+        self.assertEqual(tag.recipe_set.count(), 5)
+        self.assertEqual(ingredient.recipe_set.count(), 5)
+
+    def test_bulk_create_reports_errors_per_item(self):
+        """Test invalid items are reported by index and nothing is saved"""
+        user2 = get_user_model().objects.create_user(
+            'other@londonappdev.com',
+            'testpass'
+        )
+        other_tag = Tag.objects.create(user=user2, name='Fruity')
+        payload = [
+            {'title': 'Good', 'time_minutes': 10, 'price': '5.00'},
+            {'title': 'Bad tag', 'time_minutes': 10, 'price': '5.00',
+             'tags': [other_tag.id]},
+            {'title': 'Missing time', 'price': '5.00'},
+        ]
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('time_minutes', res.data[2])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_create_relation_errors(self):
+        """Test ids owned by other users are rejected per item"""
+        user2 = get_user_model().objects.create_user(
+            'other@londonappdev.com',
+            'testpass'
+        )
+        other_tag = Tag.objects.create(user=user2, name='Fruity')
+        payload = [
+            {'title': 'Good', 'time_minutes': 10, 'price': '5.00'},
+            {'title': 'Bad tag', 'time_minutes': 10, 'price': '5.00',
+             'tags': [other_tag.id]},
+        ]
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('tags', res.data[1])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_create_validates_relations_in_one_query(self):
+        """Test related ids are checked with one query for all items"""
+        tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+            for i in range(10)
+        ]
+        payload = [
+            {'title': f'Recipe {i}', 'time_minutes': 10, 'price': '5.00',
+             'tags': [tag.id for tag in tags]}
+            for i in range(3)
+        ]
+        request = Mock(user=self.user)
+        serializer = RecipeBulkSerializer(
+            data=payload, many=True, context={'request': request}
+        )
+
+        # 항목 수나 태그 수와 상관없이 태그 확인 쿼리 1번만 실행된다.
+        with self.assertNumQueries(1):
+            self.assertTrue(serializer.is_valid())
+
+    def test_bulk_update_recipes(self):
+        """Test updating fields and relations of many recipes"""
+        recipes = [
+            Recipe.objects.create(
+                user=self.user, title=f'Recipe {i}',
+                time_minutes=10, price=5
+            )
+            for i in range(3)
+        ]
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        payload = [
+            {'id': recipes[0].id, 'title': 'Updated', 'tags': [tag.id]},
+            {'id': recipes[1].id, 'price': '7.50'},
+        ]
+
+        res = self.client.patch(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        for recipe in recipes:
+            recipe.refresh_from_db()
+        self.assertEqual(recipes[0].title, 'Updated')
+        self.assertEqual(list(recipes[0].tags.all()), [tag])
+        self.assertEqual(str(recipes[1].price), '7.50')
+        self.assertEqual(recipes[1].title, 'Recipe 1')
+        self.assertEqual(recipes[2].title, 'Recipe 2')
+
+    def test_bulk_duplicate_relation_ids(self):
+        """Test repeated tag ids are linked once"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        payload = [{
+            'title': 'Recipe', 'time_minutes': 10, 'price': '5.00',
+            'tags': [tag.id, tag.id],
+        }]
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe_id = res.data[0]['id']
+        res = self.client.patch(
+            RECIPES_BULK_URL, [{'id': recipe_id, 'tags': [tag.id, tag.id]}],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0]['tags'], [tag.id])
+        tag.refresh_from_db()
+        self.assertEqual(tag.recipe_count, 1)
+
+    @patch('recipe.images.enqueue')
+    def test_bulk_response_absolute_urls(self, mock_enqueue):
+        """Test bulk responses render urls like the list endpoint"""
+        recipe = Recipe.objects.create(
+            user=self.user, title='Recipe', time_minutes=10, price=5,
+            image='uploads/recipe/photo.jpg'
+        )
+        RecipeImageRendition.objects.create(
+            recipe=recipe, size='thumbnail', format='webp', width=200,
+            height=100, file='renditions/thumbnail.webp'
+        )
+
+        res = self.client.patch(
+            RECIPES_BULK_URL, [{'id': recipe.id, 'title': 'Updated'}],
+            format='json'
+        )
+
+        thumbnail = res.data[0]['image_renditions']['thumbnail']
+        self.assertTrue(thumbnail['webp'].startswith('http://testserver/'))
+
+    def test_bulk_update_unknown_id(self):
+        """Test updating objects of other users fails per item"""
+        user2 = get_user_model().objects.create_user(
+            'other@londonappdev.com',
+            'testpass'
+        )
+        tag = Tag.objects.create(user=user2, name='Fruity')
+
+        res = self.client.patch(
+            TAGS_BULK_URL, [{'id': tag.id, 'name': 'Mine'}], format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('id', res.data[0])
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Fruity')
+
+    def test_bulk_delete_ingredients(self):
+        """Test deleting many ingredients by id"""
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name=f'Ing {i}')
+            for i in range(3)
+        ]
+        ids = [ingredients[0].id, ingredients[1].id, 0]
+
+        res = self.client.delete(
+            INGREDIENTS_BULK_URL, {'ids': ids}, format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['not_found'], [0])
+        remaining = Ingredient.objects.filter(user=self.user)
+        self.assertEqual(list(remaining), [ingredients[2]])
+
+    def test_bulk_create_refreshes_list_cache(self):
+        """Test the cached recipe list reflects bulk created recipes"""
+        self.client.get(RECIPES_URL)
+        payload = [{'title': 'New', 'time_minutes': 10, 'price': '5.00'}]
+
+        self.client.post(RECIPES_BULK_URL, payload, format='json')
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data), 1)
+
+    def test_bulk_too_many_items(self):
+        """Test requests over the item limit are rejected"""
+        with self.settings(RECIPE_BULK_MAX_ITEMS=1):
+            res = self.client.post(
+                TAGS_BULK_URL,
+                [{'name': 'One'}, {'name': 'Two'}],
+                format='json'
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Tag.objects.exists())
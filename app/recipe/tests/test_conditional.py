@@ -0,0 +1,259 @@
+import threading
+import time
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_BULK_URL = reverse('recipe:tag-bulk')
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+
+
+def detail_url(recipe_id):
+    """Return recipe detail URL"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def sample_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': 5.00
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class ConditionalRequestTests(TestCase):
+    """Test conditional requests on recipe endpoints"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(user=self.user)
+
+    def test_detail_has_validators(self):
+        """Test the recipe detail returns an ETag and Last-Modified"""
+        res = self.client.get(detail_url(self.recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('ETag', res)
+        self.assertIn('Last-Modified', res)
+
+    def test_detail_if_none_match_not_modified(self):
+        """Test an unchanged recipe returns 304 with a single query"""
+        res = self.client.get(detail_url(self.recipe.id))
+
+        with self.assertNumQueries(1):
+            res = self.client.get(
+                detail_url(self.recipe.id),
+                HTTP_IF_NONE_MATCH=res['ETag']
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertIn('ETag', res)
+
+    def test_detail_if_modified_since_not_modified(self):
+        """Test If-Modified-Since returns 304 for an unchanged recipe"""
+        res = self.client.get(detail_url(self.recipe.id))
+
+        res = self.client.get(
+            detail_url(self.recipe.id),
+            HTTP_IF_MODIFIED_SINCE=res['Last-Modified']
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_etag_changes_with_relations(self):
+        """Test the ETag changes when a tag is added or renamed"""
+        url = detail_url(self.recipe.id)
+        etag1 = self.client.get(url)['ETag']
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.recipe.tags.add(tag)
+        etag2 = self.client.get(url)['ETag']
+        tag.name = 'Vegetarian'
+        tag.save()
+        etag3 = self.client.get(url)['ETag']
+
+        self.assertEqual(len({etag1, etag2, etag3}), 3)
+
+    def test_detail_etag_changes_when_tag_deleted(self):
+        """Test deleting a tag, alone or in bulk, changes the ETag"""
+        url = detail_url(self.recipe.id)
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ('Vegan', 'Dessert')
+        ]
+        self.recipe.tags.add(*tags)
+        etag1 = self.client.get(url)['ETag']
+
+        tags[0].delete()
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag1)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        etag2 = res['ETag']
+
+        self.client.delete(TAGS_BULK_URL, {'ids': [tags[1].id]}, format='json')
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag2)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'], [])
+
+    def test_detail_etag_changes_after_bulk_relation_update(self):
+        """Test a bulk update of only the tags changes the ETag"""
+        url = detail_url(self.recipe.id)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        # 태그보다 레시피가 나중에 바뀌어서 태그의 변경 시각은 ETag에 영향이 없다.
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            updated_at=timezone.now()
+        )
+        etag = self.client.get(url)['ETag']
+
+        self.client.patch(
+            RECIPES_BULK_URL, [{'id': self.recipe.id, 'tags': [tag.id]}],
+            format='json'
+        )
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'][0]['id'], tag.id)
+
+    def test_detail_etag_per_fieldset(self):
+        """Test each ?fields= and ?expand= response has its own ETag"""
+        url = detail_url(self.recipe.id)
+        sparse = self.client.get(url, {'fields': 'title,id'})
+        full = self.client.get(url)
+
+        self.assertNotEqual(sparse['ETag'], full['ETag'])
+        # 다른 필드를 요청하면 다른 ETag로 304가 되지 않는다.
+        res = self.client.get(
+            url, {'fields': 'title'}, HTTP_IF_NONE_MATCH=sparse['ETag']
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(res.data), {'title'})
+        res = self.client.get(
+            url, {'fields': 'id', 'expand': 'tags'},
+            HTTP_IF_NONE_MATCH=sparse['ETag']
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        # 이름의 순서가 달라도 같은 응답이다.
+        res = self.client.get(
+            url, {'fields': 'id,title'}, HTTP_IF_NONE_MATCH=sparse['ETag']
+        )
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        # 수정할 때는 전체 응답의 ETag로 확인한다.
+        res = self.client.patch(
+            url, {'title': 'Changed'}, HTTP_IF_MATCH=full['ETag']
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_update_if_match_mismatch_fails(self):
+        """Test updating with a stale ETag fails and changes nothing"""
+        res = self.client.patch(
+            detail_url(self.recipe.id),
+            {'title': 'Chicken tikka'},
+            HTTP_IF_MATCH='"stale"'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.title, 'Sample recipe')
+
+    def test_update_if_match_succeeds(self):
+        """Test updating with the current ETag returns a new ETag"""
+        url = detail_url(self.recipe.id)
+        etag = self.client.get(url)['ETag']
+
+        res = self.client.patch(
+            url, {'title': 'Chicken tikka'}, HTTP_IF_MATCH=etag
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertEqual(res['ETag'], self.client.get(url)['ETag'])
+
+    def test_delete_if_match_mismatch_fails(self):
+        """Test deleting with a stale ETag fails"""
+        res = self.client.delete(
+            detail_url(self.recipe.id), HTTP_IF_MATCH='"stale"'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertTrue(Recipe.objects.filter(id=self.recipe.id).exists())
+
+    def test_detail_missing_recipe_not_found(self):
+        """Test conditional handling keeps 404 for unknown recipes"""
+        res = self.client.get(detail_url(0), HTTP_IF_NONE_MATCH='"x"')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    @patch('recipe.cache.cache_is_shared', return_value=True)
+    def test_list_if_modified_since_not_modified(self, mock_shared):
+        """Test If-Modified-Since returns 304 for an unchanged list"""
+        res = self.client.get(RECIPES_URL)
+
+        res = self.client.get(
+            RECIPES_URL, HTTP_IF_MODIFIED_SINCE=res['Last-Modified']
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'PostgreSQL only')
+class ConcurrentUpdateTests(TransactionTestCase):
+    """Test If-Match and the update it guards happen atomically"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(user=self.user)
+
+    def test_concurrent_update_with_same_etag(self):
+        """Test a write committed after the check makes If-Match fail"""
+        url = detail_url(self.recipe.id)
+        etag = self.client.get(url)['ETag']
+        locked = threading.Event()
+
+        # 다른 요청이 같은 ETag로 먼저 행을 잠그고 수정한 뒤 잠시 후 커밋한다.
+        def other_request():
+            try:
+                with transaction.atomic():
+                    Recipe.objects.select_for_update().get(pk=self.recipe.pk)
+                    Recipe.objects.filter(pk=self.recipe.pk).update(
+                        title='First', updated_at=timezone.now()
+                    )
+                    locked.set()
+                    time.sleep(0.5)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=other_request)
+        thread.start()
+        locked.wait(timeout=5)
+        res = self.client.patch(url, {'title': 'Second'}, HTTP_IF_MATCH=etag)
+        thread.join()
+
+        self.assertEqual(res.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.title, 'First')
@@ -0,0 +1,329 @@
+import hashlib
+import io
+import os
+import shutil
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from PIL import Image
+
+from core.models import ImageBlob, Recipe
+from core.storage import S3Storage
+
+try:
+    import boto3
+    from moto import mock_aws
+except ImportError:
+    boto3 = None
+
+
+UPLOAD_URL_URL_NAME = 'recipe:recipe-image-upload-url'
+UPLOAD_COMPLETE_URL_NAME = 'recipe:recipe-image-upload-complete'
+
+
+def upload_url_url(recipe_id):
+    """Return URL for requesting a direct upload url"""
+    return reverse(UPLOAD_URL_URL_NAME, args=[recipe_id])
+
+
+def upload_complete_url(recipe_id):
+    """Return URL for completing a direct upload"""
+    return reverse(UPLOAD_COMPLETE_URL_NAME, args=[recipe_id])
+
+
+def sample_image_bytes(size=(10, 10), format='JPEG'):
+    """Return the bytes of a sample image"""
+    buffer = io.BytesIO()
+    Image.frombytes('RGB', size, os.urandom(size[0] * size[1] * 3)).save(
+        buffer, format=format
+    )
+    return buffer.getvalue()
+
+
+# 테스트는 트랜잭션 안에서 실행되므로 커밋 뒤의 작업을 바로 실행한다.
+@patch('recipe.direct_uploads.transaction.on_commit', lambda f, **kw: f())
+@override_settings(RECIPE_IMAGE_STORAGE='local')
+class LocalDirectUploadTests(TestCase):
+    """Test direct image uploads to the local storage"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@londonappdev.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Sample recipe', time_minutes=10, price=5
+        )
+        self.storage = Recipe._meta.get_field('image').storage
+
+    def tearDown(self):
+        incoming = self.storage.path('uploads/incoming')
+        shutil.rmtree(incoming, ignore_errors=True)
+        for blob in ImageBlob.objects.all():
+            self.storage.delete(blob.name)
+
+    def _issue(self, content_type='image/jpeg'):
+        res = self.client.post(
+            upload_url_url(self.recipe.id), {'content_type': content_type}
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def _put(self, upload, body):
+        # 업로드 주소는 토큰으로 인증하므로 로그인하지 않은 클라이언트로 올린다.
+        return APIClient().put(
+            upload['url'], body, content_type='application/octet-stream'
+        )
+
+    def _upload(self, recipe, body):
+        """Upload an image for a recipe and complete the upload"""
+        res = self.client.post(
+            upload_url_url(recipe.id), {'content_type': 'image/jpeg'}
+        )
+        self._put(res.data['upload'], body)
+        with patch('recipe.direct_uploads.enqueue'):
+            return self.client.post(
+                upload_complete_url(recipe.id), {'token': res.data['token']}
+            )
+
+    def test_direct_upload(self):
+        """Test uploading an image directly and completing the upload"""
+        data = self._issue()
+        self.assertEqual(data['upload']['method'], 'PUT')
+
+        res = self._put(data['upload'], sample_image_bytes())
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+        with patch('recipe.direct_uploads.enqueue') as mock_enqueue:
+            res = self.client.post(
+                upload_complete_url(self.recipe.id), {'token': data['token']}
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        # 수명 주기 규칙으로 지워지는 incoming이 아니라 내용 주소 이름으로 옮겨진다.
+        self.assertTrue(self.recipe.image.name.startswith('uploads/recipe/'))
+        self.assertEqual(os.listdir(self.storage.path('uploads/incoming')), [])
+        self.assertEqual(
+            ImageBlob.objects.get(name=self.recipe.image.name).refcount, 1
+        )
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_PENDING)
+        self.assertEqual(res.data['image_status'], Recipe.IMAGE_PENDING)
+        mock_enqueue.assert_called_once()
+
+        # 같은 토큰으로 다시 완료해도 성공한다.
+        with patch('recipe.direct_uploads.enqueue'):
+            res = self.client.post(
+                upload_complete_url(self.recipe.id), {'token': data['token']}
+            )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_direct_uploads_deduplicated(self):
+        """Test identical direct uploads share one stored file"""
+        other = Recipe.objects.create(
+            user=self.user, title='Other recipe', time_minutes=5, price=1
+        )
+        body = sample_image_bytes()
+
+        self._upload(self.recipe, body)
+        self._upload(other, body)
+
+        self.recipe.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.recipe.image.name, other.image.name)
+        self.assertEqual(ImageBlob.objects.get().refcount, 2)
+
+    def test_complete_before_upload(self):
+        """Test completing an upload that has not been sent fails"""
+        data = self._issue()
+
+        res = self.client.post(
+            upload_complete_url(self.recipe.id), {'token': data['token']}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('token', res.data)
+
+    def test_invalid_token(self):
+        """Test tampered tokens are rejected"""
+        data = self._issue()
+
+        res = self.client.post(
+            upload_complete_url(self.recipe.id),
+            {'token': data['token'] + 'x'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_token_for_other_recipe(self):
+        """Test a token cannot attach an image to another recipe"""
+        data = self._issue()
+        self._put(data['upload'], sample_image_bytes())
+        other = Recipe.objects.create(
+            user=self.user, title='Other recipe', time_minutes=5, price=1
+        )
+
+        res = self.client.post(
+            upload_complete_url(other.id), {'token': data['token']}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        other.refresh_from_db()
+        self.assertFalse(other.image)
+
+    def test_other_users_recipe(self):
+        """Test upload urls are not issued for other users' recipes"""
+        other_user = get_user_model().objects.create_user(
+            'other@londonappdev.com',
+            'testpass'
+        )
+        recipe = Recipe.objects.create(
+            user=other_user, title='Other recipe', time_minutes=5, price=1
+        )
+
+        res = self.client.post(
+            upload_url_url(recipe.id), {'content_type': 'image/jpeg'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_unsupported_content_type(self):
+        """Test only image content types are accepted"""
+        res = self.client.post(
+            upload_url_url(self.recipe.id), {'content_type': 'text/html'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_complete_rejects_non_image(self):
+        """Test uploaded files that are not images are deleted"""
+        data = self._issue()
+        self._put(data['upload'], b'not an image')
+
+        res = self.client.post(
+            upload_complete_url(self.recipe.id), {'token': data['token']}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(os.listdir(self.storage.path('uploads/incoming')), [])
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    @override_settings(RECIPE_IMAGE_MAX_BYTES=100)
+    def test_upload_too_large(self):
+        """Test uploads over the size limit are rejected with 413"""
+        data = self._issue()
+
+        res = self._put(data['upload'], sample_image_bytes())
+
+        self.assertEqual(
+            res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+
+
+@skipUnless(boto3, 'boto3 and moto are required')
+class S3StorageTests(TestCase):
+    """Test the S3 storage backend against a mocked bucket"""
+
+    def setUp(self):
+        self.mock = mock_aws()
+        self.mock.start()
+        self.addCleanup(self.mock.stop)
+        boto3.client('s3', region_name='us-east-1').create_bucket(
+            Bucket='recipes'
+        )
+        self.storage = S3Storage(bucket='recipes', region='us-east-1')
+
+    def test_save_and_read(self):
+        """Test files can be saved, measured, read and deleted"""
+        name = self.storage.save('uploads/a.txt', ContentFile(b'hello world'))
+
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(self.storage.size(name), 11)
+        self.assertEqual(self.storage.read_prefix(name, 5), b'hello')
+        with self.storage.open(name) as file:
+            self.assertEqual(file.read(), b'hello world')
+        self.storage.delete(name)
+        self.assertFalse(self.storage.exists(name))
+
+    def test_content_digest_from_checksum(self):
+        """Test the digest of an object uploaded with a checksum"""
+        content = b'hello world'
+        self.storage.client.put_object(
+            Bucket='recipes', Key='uploads/a.txt', Body=content,
+            ChecksumAlgorithm='SHA256'
+        )
+        expected = hashlib.sha256(content).hexdigest()
+
+        # 체크섬이 있으면 객체를 읽지 않는다.
+        with patch.object(self.storage.client, 'get_object') as get_object:
+            self.assertEqual(
+                self.storage.content_digest('uploads/a.txt'), expected
+            )
+        get_object.assert_not_called()
+        name = self.storage.save('uploads/b.txt', ContentFile(content))
+        self.assertEqual(self.storage.content_digest(name), expected)
+
+    def test_presigned_upload(self):
+        """Test presigned uploads limit the content type and size"""
+        upload = self.storage.presigned_upload(
+            'uploads/incoming/a.jpg', 'image/jpeg', 1024, 60
+        )
+
+        self.assertEqual(upload['method'], 'POST')
+        self.assertEqual(upload['fields']['Content-Type'], 'image/jpeg')
+        self.assertIn('policy', upload['fields'])
+
+    @patch('recipe.direct_uploads.transaction.on_commit', lambda f, **kw: f())
+    def test_complete_direct_upload(self):
+        """Test completing an upload moves it to its content address"""
+        user = get_user_model().objects.create_user(
+            'user@londonappdev.com',
+            'testpass'
+        )
+        recipe = Recipe.objects.create(
+            user=user, title='Sample recipe', time_minutes=10, price=5
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        storage = Recipe._meta.get_field('image').storage
+
+        # 설정 대신 모의 버킷을 쓰는 저장소로 바꾼다.
+        # 파일 전체를 api 서버로 내려받지 않고 버킷 안에서 복사해야 한다.
+        with patch.dict(storage.__dict__, {'backend': self.storage}), \
+                patch('recipe.direct_uploads.enqueue'), \
+                patch.object(S3Storage, '_open', side_effect=AssertionError):
+            res = client.post(
+                upload_url_url(recipe.id), {'content_type': 'image/png'}
+            )
+            self.assertEqual(res.data['upload']['method'], 'POST')
+            key = res.data['upload']['fields']['key']
+            # 클라이언트가 버킷에 바로 올린 것처럼 넣어둔다.
+            self.storage.save(key, ContentFile(sample_image_bytes(
+                format='PNG'
+            )))
+            res = client.post(
+                upload_complete_url(recipe.id), {'token': res.data['token']}
+            )
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            recipe.refresh_from_db()
+            # 내용 주소 이름으로 복사하고 incoming의 객체는 지운다.
+            self.assertTrue(recipe.image.name.startswith('uploads/recipe/'))
+            self.assertTrue(self.storage.exists(recipe.image.name))
+            self.assertFalse(self.storage.exists(key))
+            self.assertTrue(
+                ImageBlob.objects.filter(name=recipe.image.name).exists()
+            )
@@ -0,0 +1,136 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import serializers, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.models import Ingredient, Recipe, RecipeImageRendition, Tag
+from recipe.fastpath import fast_list_plan
+from recipe.fieldsets import parse_fieldsets
+from recipe.queries import plan_queryset
+from recipe.serializers import IngredientSerializer, RecipeSerializer, \
+    TagSerializer
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class FastListPathTests(TestCase):
+    """Test rendering lists from values() rows"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {index}')
+            for index in range(3)
+        ]
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        prices = (Decimal('5'), Decimal('0.10'), Decimal('12.5'))
+        for index, price in enumerate(prices):
+            recipe = Recipe.objects.create(
+                user=self.user, title=f'Recipe {index}',
+                time_minutes=index, price=price,
+                link='' if index else 'https://example.com/'
+            )
+            # 추가한 순서와 상관없이 id 순서로 나와야 한다.
+            recipe.tags.add(*reversed(tags[:index + 1]))
+            recipe.ingredients.add(salt)
+        # 이미지가 있는 레시피는 사본을 원래 필드로 만든다.
+        Recipe.objects.filter(pk=recipe.pk).update(
+            image='uploads/recipe/photo.jpg',
+            image_status=Recipe.IMAGE_PENDING
+        )
+        for size, width in (('full', 1200), ('thumbnail', 200)):
+            RecipeImageRendition.objects.create(
+                recipe=recipe, size=size, format='webp', width=width,
+                height=width // 2, file=f'renditions/{size}.webp'
+            )
+        self.request = APIRequestFactory().get(RECIPES_URL)
+
+    def _render(self, serializer_class, queryset, context):
+        """Return the JSON of the fast path and of the serializer"""
+        plan = fast_list_plan(serializer_class, context)
+        self.assertIsNotNone(plan)
+        serializer = serializer_class(
+            plan_queryset(queryset, serializer_class, context),
+            many=True, context=context
+        )
+        renderer = JSONRenderer()
+        return (
+            renderer.render(plan.render(queryset, context)),
+            renderer.render(serializer.data)
+        )
+
+    def test_same_json_as_serializers(self):
+        """Test the fast path renders byte identical JSON"""
+        cases = (
+            (RecipeSerializer, Recipe.objects.order_by('-id')),
+            (TagSerializer, Tag.objects.order_by('-name')),
+            (IngredientSerializer, Ingredient.objects.all()),
+        )
+        for serializer_class, queryset in cases:
+            fast, expected = self._render(
+                serializer_class, queryset, {'request': self.request}
+            )
+            self.assertEqual(fast, expected)
+
+    def test_same_json_with_fields(self):
+        """Test sparse fieldsets render the same JSON"""
+        context = {'request': self.request}
+        context.update(parse_fieldsets(
+            {'fields': 'price,id,image_renditions'}, RecipeSerializer
+        ))
+
+        fast, expected = self._render(
+            RecipeSerializer, Recipe.objects.all(), context
+        )
+
+        self.assertEqual(fast, expected)
+
+    def test_unsupported_fields_use_serializer(self):
+        """Test nested serializers fall back to the serializer"""
+        context = parse_fieldsets({'expand': 'tags'}, RecipeSerializer)
+        self.assertIsNone(fast_list_plan(RecipeSerializer, context))
+
+        class TitleSerializer(serializers.ModelSerializer):
+            upper = serializers.SerializerMethodField()
+
+            class Meta:
+                model = Recipe
+                fields = ('id', 'upper')
+
+        self.assertIsNone(fast_list_plan(TitleSerializer, {}))
+
+    def test_list_endpoints(self):
+        """Test list responses are served by the fast path"""
+        recipe = Recipe.objects.filter(image='').first()
+        # 레시피 1번, 중간 테이블 2번, 이미지가 있는 레시피의 사본 2번(레시피, 사본)
+        with self.assertNumQueries(5):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 3)
+        item = next(item for item in res.data if item['id'] == recipe.id)
+        self.assertEqual(item['price'], f'{recipe.price:.2f}')
+        self.assertEqual(
+            item['tags'],
+            sorted(recipe.tags.values_list('id', flat=True))
+        )
+        self.assertIsNone(item['image_renditions'])
+
+        res = self.client.get(TAGS_URL, {'ordering': 'usage'})
+        self.assertEqual(
+            [tag['name'] for tag in res.data], ['Tag 0', 'Tag 1', 'Tag 2']
+        )
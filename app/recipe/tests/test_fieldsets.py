@@ -0,0 +1,103 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    """Return recipe detail URL"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class SparseFieldsetTests(TestCase):
+    """Test choosing the fields of recipe responses"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.ingredient = Ingredient.objects.create(
+            user=self.user, name='Salt'
+        )
+        for index in range(3):
+            recipe = Recipe.objects.create(
+                user=self.user, title=f'Recipe {index}',
+                time_minutes=10, price=5.00
+            )
+            recipe.tags.add(self.tag)
+            recipe.ingredients.add(self.ingredient)
+        self.recipe = recipe
+
+    def test_list_fields(self):
+        """Test only the requested fields are queried and returned"""
+        # 요청하지 않은 태그, 재료, 사본은 prefetch하지 않는다.
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL, {'fields': 'id,title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0], {
+            'id': self.recipe.id, 'title': self.recipe.title
+        })
+
+    def test_list_expand(self):
+        """Test expanded relations are returned as objects"""
+        with self.assertNumQueries(2):
+            res = self.client.get(
+                RECIPES_URL, {'fields': 'id', 'expand': 'tags'}
+            )
+
+        self.assertEqual(res.data[0], {
+            'id': self.recipe.id,
+            'tags': [{'id': self.tag.id, 'name': self.tag.name}],
+        })
+
+    def test_detail_fields(self):
+        """Test the detail response can be narrowed"""
+        res = self.client.get(
+            detail_url(self.recipe.id), {'fields': 'title,ingredients'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {
+            'title': self.recipe.title,
+            'ingredients': [
+                {'id': self.ingredient.id, 'name': self.ingredient.name}
+            ],
+        })
+
+    def test_cached_list_per_fieldset(self):
+        """Test lists with different fields are cached separately"""
+        self.client.get(RECIPES_URL, {'fields': 'id'})
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertIn('tags', res.data[0])
+
+    def test_invalid_fieldsets(self):
+        """Test unknown fields and expansions return 400"""
+        for params in ({'fields': 'id,secret'}, {'expand': 'user'}):
+            res = self.client.get(RECIPES_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_write_ignores_fields(self):
+        """Test creating a recipe returns every field"""
+        res = self.client.post(RECIPES_URL + '?fields=id', {
+            'title': 'Cheesecake', 'time_minutes': 30, 'price': 10,
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertIn('title', res.data)
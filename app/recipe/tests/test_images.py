@@ -0,0 +1,313 @@
+import io
+import tempfile
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from PIL import Image
+
+from core.models import Recipe, RecipeImageRendition
+from recipe.images import process_recipe_image, render
+
+
+# Orientation=6(시계방향 90도 회전)만 들어있는 EXIF
+EXIF_ROTATE_90 = (
+    b'Exif\x00\x00MM\x00*\x00\x00\x00\x08\x00\x01'
+    b'\x01\x12\x00\x03\x00\x00\x00\x01\x00\x06\x00\x00\x00\x00\x00\x00'
+)
+
+
+def image_upload_url(recipe_id):
+    """Return URL for recipe image upload"""
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+def sample_image(size=(800, 400), **params):
+    """Return the bytes of a sample JPEG image"""
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (200, 30, 30)).save(buffer, 'JPEG', **params)
+    return buffer.getvalue()
+
+
+class RecipeImageProcessingTests(TestCase):
+    """Test the background processing of recipe images"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@londonappdev.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Sample recipe', time_minutes=10, price=5
+        )
+
+    def tearDown(self):
+        for rendition in RecipeImageRendition.objects.all():
+            rendition.file.delete(save=False)
+        self.recipe.refresh_from_db()
+        self.recipe.image.delete()
+
+    def test_process_creates_renditions(self):
+        """Test every size is created in webp and jpeg"""
+        self.recipe.image.save('photo.jpg', ContentFile(sample_image()))
+
+        process_recipe_image(self.recipe.id)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_READY)
+        self.assertEqual(
+            (self.recipe.image_width, self.recipe.image_height), (800, 400)
+        )
+        renditions = {
+            (rendition.size, rendition.format): rendition
+            for rendition in self.recipe.renditions.all()
+        }
+        self.assertEqual(len(renditions), 6)
+        thumbnail = renditions['thumbnail', 'webp']
+        self.assertEqual((thumbnail.width, thumbnail.height), (200, 100))
+        # 원본보다 크게 늘리지 않는다.
+        full = renditions['full', 'jpeg']
+        self.assertEqual((full.width, full.height), (800, 400))
+        with Image.open(thumbnail.file) as img:
+            self.assertEqual(img.format, 'WEBP')
+
+    def test_process_records_size_of_large_image(self):
+        """Test the recorded size is the original, not the decoded one"""
+        # 가장 큰 사본보다 두배 이상 큰 JPEG는 줄여서 디코딩된다.
+        self.recipe.image.save(
+            'photo.jpg', ContentFile(sample_image(size=(4000, 3600)))
+        )
+
+        process_recipe_image(self.recipe.id)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(
+            (self.recipe.image_width, self.recipe.image_height), (4000, 3600)
+        )
+        full = self.recipe.renditions.get(size='full', format='jpeg')
+        self.assertEqual((full.width, full.height), (1600, 1440))
+
+    def test_process_applies_orientation_and_strips_exif(self):
+        """Test renditions are upright and carry no EXIF data"""
+        self.recipe.image.save(
+            'photo.jpg', ContentFile(sample_image(exif=EXIF_ROTATE_90))
+        )
+
+        process_recipe_image(self.recipe.id)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(
+            (self.recipe.image_width, self.recipe.image_height), (400, 800)
+        )
+        rendition = self.recipe.renditions.get(size='card', format='jpeg')
+        self.assertEqual((rendition.width, rendition.height), (300, 600))
+        with Image.open(rendition.file) as img:
+            self.assertNotIn('exif', img.info)
+
+    def test_process_invalid_image_fails(self):
+        """Test an unreadable image marks the recipe as failed"""
+        self.recipe.image.save('photo.jpg', ContentFile(b'notimage'))
+
+        with self.assertLogs('recipe.images', level='ERROR'):
+            process_recipe_image(self.recipe.id)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_FAILED)
+        self.assertFalse(self.recipe.renditions.exists())
+
+    def test_failure_keeps_status_of_new_image(self):
+        """Test a failed task does not mark a newer image as failed"""
+        self.recipe.image.save('photo.jpg', ContentFile(sample_image()))
+
+        # 처리하는 동안 새 이미지가 올라오고 그 작업이 예약된다.
+        def replace_image(recipe_id, file):
+            Recipe.objects.filter(pk=recipe_id).update(
+                image='uploads/recipe/new.jpg',
+                image_status=Recipe.IMAGE_PENDING
+            )
+            raise OSError('cannot identify image file')
+
+        with patch('recipe.images._build_renditions', replace_image), \
+                self.assertLogs('recipe.images', level='ERROR'):
+            process_recipe_image(self.recipe.id)
+
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        self.assertEqual(recipe.image_status, Recipe.IMAGE_PENDING)
+        # tearDown에서 처음 올린 파일을 지우도록 되돌린다.
+        Recipe.objects.filter(pk=recipe.pk).update(
+            image=self.recipe.image.name
+        )
+
+    def test_upload_returns_before_processing(self):
+        """Test uploading schedules processing after the commit"""
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            ntf.write(sample_image())
+            ntf.seek(0)
+            callbacks = []
+            with patch('recipe.tasks.transaction.on_commit',
+                       lambda func, using=None: callbacks.append(func)):
+                res = self.client.post(
+                    image_upload_url(self.recipe.id), {'image': ntf},
+                    format='multipart'
+                )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['image_status'], Recipe.IMAGE_PENDING)
+        self.assertFalse(self.recipe.renditions.exists())
+        # 커밋된 뒤에 처리 작업 하나가 시작된다.
+        with patch('recipe.tasks.get_executor') as get_executor:
+            for func in callbacks:
+                func()
+        self.assertEqual(get_executor.return_value.submit.call_count, 1)
+
+    @override_settings(RECIPE_TASKS_EAGER=True)
+    def test_upload_eager_processing(self):
+        """Test processing runs inside the request when eager"""
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            ntf.write(sample_image())
+            ntf.seek(0)
+            self.client.post(
+                image_upload_url(self.recipe.id), {'image': ntf},
+                format='multipart'
+            )
+
+        res = self.client.get(reverse('recipe:recipe-list'))
+
+        self.assertEqual(res.data[0]['image_status'], Recipe.IMAGE_READY)
+        self.assertEqual(self.recipe.renditions.count(), 6)
+
+    def test_renditions_are_content_addressed(self):
+        """Test the same image is not resized again for another recipe"""
+        recipe2 = Recipe.objects.create(
+            user=self.user, title='Other recipe', time_minutes=10, price=5
+        )
+        self.recipe.image.save('photo.jpg', ContentFile(sample_image()))
+        recipe2.image.save('copy.jpg', ContentFile(sample_image()))
+        process_recipe_image(self.recipe.id)
+
+        with patch('recipe.images.render', wraps=render) as mock_render:
+            process_recipe_image(recipe2.id)
+
+        mock_render.assert_not_called()
+        self.assertEqual(
+            set(self.recipe.renditions.values_list('file', flat=True)),
+            set(recipe2.renditions.values_list('file', flat=True))
+        )
+        recipe2.image.delete()
+
+    @override_settings(RECIPE_TASKS_EAGER=True)
+    def test_serializer_exposes_srcset(self):
+        """Test recipes list the url of every rendition"""
+        self.recipe.image.save('photo.jpg', ContentFile(sample_image()))
+        process_recipe_image(self.recipe.id)
+
+        res = self.client.get(reverse('recipe:recipe-list'))
+
+        renditions = res.data[0]['image_renditions']
+        thumbnail = renditions['thumbnail']
+        self.assertEqual((thumbnail['width'], thumbnail['height']), (200, 100))
+        self.assertTrue(thumbnail['webp'].startswith('http://testserver/'))
+        self.assertEqual(
+            renditions['srcset']['jpeg'],
+            f"{thumbnail['jpeg']} 200w, {renditions['card']['jpeg']} 600w, "
+            f"{renditions['full']['jpeg']} 800w"
+        )
+
+    @override_settings(ALLOWED_HOSTS=['testserver', 'cdn.testserver'])
+    @patch('recipe.cache.cache_is_shared', return_value=True)
+    def test_cached_list_renders_urls_per_request(self, mock_shared):
+        """Test cached lists do not keep the urls of another request"""
+        self.recipe.image.save('photo.jpg', ContentFile(sample_image()))
+        process_recipe_image(self.recipe.id)
+        url = reverse('recipe:recipe-list')
+
+        self.client.get(url)
+        # 캐시된 목록이어도 요청의 scheme과 호스트로 주소를 만든다.
+        res = self.client.get(url, secure=True, HTTP_HOST='cdn.testserver')
+
+        thumbnail = res.data[0]['image_renditions']['thumbnail']
+        self.assertTrue(
+            thumbnail['webp'].startswith('https://cdn.testserver/')
+        )
+        self.assertIn(
+            thumbnail['jpeg'],
+            res.data[0]['image_renditions']['srcset']['jpeg']
+        )
+
+    def test_recipe_without_image_has_no_renditions(self):
+        """Test recipes without an image return null renditions"""
+        res = self.client.get(reverse('recipe:recipe-list'))
+
+        self.assertIsNone(res.data[0]['image_renditions'])
+
+    @override_settings(RECIPE_TASKS_EAGER=True)
+    def test_missing_renditions_built_on_access(self):
+        """Test renditions of an unprocessed image are built lazily"""
+        self.recipe.image.save('photo.jpg', ContentFile(sample_image()))
+
+        self.client.get(reverse('recipe:recipe-list'))
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_READY)
+        self.assertEqual(self.recipe.renditions.count(), 6)
+
+    def test_missing_renditions_scheduled_once(self):
+        """Test concurrent requests schedule a single build"""
+        self.recipe.image.save('photo.jpg', ContentFile(sample_image()))
+
+        with patch('recipe.images.enqueue') as mock_enqueue:
+            self.client.get(reverse('recipe:recipe-list'))
+            self.client.get(reverse('recipe:recipe-detail', args=[
+                self.recipe.id
+            ]))
+
+        self.assertEqual(mock_enqueue.call_count, 1)
+
+    def test_stale_pending_renditions_rescheduled(self):
+        """Test images stuck in pending are scheduled again"""
+        self.recipe.image.save('photo.jpg', ContentFile(sample_image()))
+        url = reverse('recipe:recipe-list')
+
+        # 방금 예약된 작업은 다시 예약하지 않는다.
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            image_status=Recipe.IMAGE_PENDING, image_status_at=timezone.now()
+        )
+        with patch('recipe.images.enqueue') as mock_enqueue:
+            self.client.get(url)
+        mock_enqueue.assert_not_called()
+
+        # 작업이 죽어서 오래 멈춰있으면 다시 예약한다.
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            image_status_at=timezone.now() - timedelta(hours=1)
+        )
+        cache.clear()
+        with patch('recipe.images.enqueue') as mock_enqueue:
+            self.client.get(url)
+        self.assertEqual(mock_enqueue.call_count, 1)
+
+    def test_failed_renditions_not_rescheduled(self):
+        """Test images that failed to process are not scheduled on reads"""
+        self.recipe.image.save('photo.jpg', ContentFile(sample_image()))
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            image_status=Recipe.IMAGE_FAILED, image_status_at=timezone.now()
+        )
+        url = reverse('recipe:recipe-list')
+
+        with patch('recipe.images.enqueue') as mock_enqueue:
+            for _ in range(2):
+                cache.clear()
+                self.client.get(url)
+
+        mock_enqueue.assert_not_called()
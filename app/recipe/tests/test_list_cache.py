@@ -0,0 +1,170 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+from recipe.cache import get_data_version, normalize_query_params
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def sample_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': 5.00
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class ListCacheTests(TestCase):
+    """Test caching of recipe list responses"""
+
+    def setUp(self):
+        cache.clear()
+        # 테스트의 프로세스 메모리 캐시를 공유 캐시로 보고 확인한다.
+        shared = patch('recipe.cache.cache_is_shared', return_value=True)
+        self.cache_is_shared = shared.start()
+        self.addCleanup(shared.stop)
+        # 테스트는 커밋되지 않으므로 커밋 후의 버전 변경을 바로 실행한다.
+        on_commit = patch(
+            'recipe.cache.transaction.on_commit',
+            lambda func, using=None: func()
+        )
+        on_commit.start()
+        self.addCleanup(on_commit.stop)
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_list_served_from_cache(self):
+        """Test a repeated list request does not query the database"""
+        sample_recipe(user=self.user)
+        res1 = self.client.get(RECIPES_URL)
+
+        with self.assertNumQueries(0):
+            res2 = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res1.data, res2.data)
+        self.assertEqual(res1['ETag'], res2['ETag'])
+
+    def test_local_memory_cache_not_used(self):
+        """Test lists are not cached in a per process cache"""
+        self.cache_is_shared.return_value = False
+        sample_recipe(user=self.user)
+        self.client.get(RECIPES_URL)
+        # 다른 워커에서 바뀐 것처럼 시그널 없이 바꾼다.
+        Recipe.objects.update(title='Changed')
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data[0]['title'], 'Changed')
+        self.assertNotIn('ETag', res)
+
+    def test_write_invalidates_cache(self):
+        """Test creating a recipe through the API changes the list"""
+        res1 = self.client.get(RECIPES_URL)
+        self.client.post(RECIPES_URL, {
+            'title': 'Chocolate cheesecake',
+            'time_minutes': 30,
+            'price': 5.00
+        })
+
+        res2 = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res1.data), 0)
+        self.assertEqual(len(res2.data), 1)
+        self.assertNotEqual(res1['ETag'], res2['ETag'])
+
+    def test_relation_change_invalidates_cache(self):
+        """Test adding a tag to a recipe changes the list"""
+        recipe = sample_recipe(user=self.user)
+        self.client.get(RECIPES_URL)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe.tags.add(tag)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data[0]['tags'], [tag.id])
+
+    def test_if_none_match_returns_not_modified(self):
+        """Test an unchanged list returns 304 without a body"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        res = self.client.get(TAGS_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertFalse(res.content)
+
+    def test_query_params_are_part_of_key(self):
+        """Test filtered and unfiltered lists are cached separately"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = sample_recipe(user=self.user)
+        recipe.tags.add(tag)
+        sample_recipe(user=self.user)
+
+        res_all = self.client.get(RECIPES_URL)
+        res_tagged = self.client.get(RECIPES_URL, {'tags': tag.id})
+
+        self.assertEqual(len(res_all.data), 2)
+        self.assertEqual(len(res_tagged.data), 1)
+        self.assertNotEqual(res_all['ETag'], res_tagged['ETag'])
+
+    def test_users_do_not_share_cache(self):
+        """Test cached lists are kept per user"""
+        sample_recipe(user=self.user)
+        self.client.get(RECIPES_URL)
+        user2 = get_user_model().objects.create_user(
+            'other@londonappdev.com',
+            'testpass'
+        )
+        self.client.force_authenticate(user2)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data), 0)
+
+    def test_normalize_query_params(self):
+        """Test id lists are normalized regardless of order"""
+        self.assertEqual(
+            normalize_query_params({'tags': '3,1,3', 'other': 'x'}),
+            normalize_query_params({'tags': '1,3'})
+        )
+
+
+class ListCacheCommitTests(TransactionTestCase):
+    """Test data versions change only after the data is committed"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            'testpass'
+        )
+
+    def test_version_bumped_after_commit(self):
+        """Test a write does not change the version before its commit"""
+        version, _ = get_data_version(self.user.id)
+        with transaction.atomic():
+            Tag.objects.create(user=self.user, name='Vegan')
+            # 커밋 전에 다른 요청이 캐시하는 목록은 예전 버전으로 들어간다.
+            self.assertEqual(get_data_version(self.user.id)[0], version)
+
+        self.assertNotEqual(get_data_version(self.user.id)[0], version)
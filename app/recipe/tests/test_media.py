@@ -0,0 +1,127 @@
+import time
+from unittest.mock import patch
+
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+
+from core.models import Recipe
+from recipe.media import RangeNotSatisfiable, parse_range
+
+
+CONTENT = bytes(range(256)) * 4
+
+
+@override_settings(RECIPE_IMAGE_STORAGE='local', MEDIA_SENDFILE='')
+class MediaServingTests(TestCase):
+    """Test serving media files"""
+
+    def setUp(self):
+        self.storage = Recipe._meta.get_field('image').storage
+        self.name = self.storage.save(
+            'uploads/recipe/photo.jpg', ContentFile(CONTENT)
+        )
+        self.url = self.storage.url(self.name)
+
+    def tearDown(self):
+        self.storage.delete(self.name)
+
+    def test_serve_signed_file(self):
+        """Test files are served with caching headers"""
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(b''.join(res.streaming_content), CONTENT)
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertEqual(res['Content-Length'], str(len(CONTENT)))
+        self.assertEqual(res['Accept-Ranges'], 'bytes')
+        # 서명된 응답은 공유 캐시에 두지 않고, url이 만료될 때까지만 캐시한다.
+        cache_control = dict(
+            item.partition('=')[::2]
+            for item in res['Cache-Control'].split(', ')
+        )
+        self.assertIn('private', cache_control)
+        self.assertNotIn('public', cache_control)
+        self.assertLessEqual(int(cache_control['max-age']), 24 * 60 * 60)
+        self.assertIn('ETag', res)
+
+    def test_missing_signature(self):
+        """Test files are not served without a valid signature"""
+        path = self.url.split('?')[0]
+
+        self.assertEqual(self.client.get(path).status_code, 404)
+        self.assertEqual(self.client.get(path + '?sig=x').status_code, 404)
+
+    @override_settings(MEDIA_URL_MAX_AGE=60 * 60)
+    def test_expired_signature(self):
+        """Test signed urls stop working after MEDIA_URL_MAX_AGE"""
+        with patch('core.storage.time') as mock_time:
+            mock_time.time.return_value = time.time() - 2 * 60 * 60
+            url = self.storage.url(self.name)
+
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_not_modified(self):
+        """Test a matching ETag returns 304"""
+        etag = self.client.get(self.url)['ETag']
+
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, 304)
+
+    def test_range_request(self):
+        """Test a byte range returns 206 with only that range"""
+        res = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(b''.join(res.streaming_content), CONTENT[10:20])
+        self.assertEqual(res['Content-Length'], '10')
+        self.assertEqual(
+            res['Content-Range'], f'bytes 10-19/{len(CONTENT)}'
+        )
+
+    def test_range_with_stale_if_range(self):
+        """Test a range for a changed file returns the whole file"""
+        res = self.client.get(
+            self.url, HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='"stale"'
+        )
+
+        self.assertEqual(res.status_code, 200)
+
+    def test_unsatisfiable_range(self):
+        """Test a range past the end of the file returns 416"""
+        res = self.client.get(self.url, HTTP_RANGE='bytes=5000-')
+
+        self.assertEqual(res.status_code, 416)
+        self.assertEqual(res['Content-Range'], f'bytes */{len(CONTENT)}')
+
+    @override_settings(
+        MEDIA_SENDFILE='nginx', MEDIA_ACCEL_PREFIX='/protected-media/'
+    )
+    def test_accel_redirect(self):
+        """Test nginx is asked to send the file"""
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.content, b'')
+        self.assertEqual(
+            res['X-Accel-Redirect'], f'/protected-media/{self.name}'
+        )
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+
+    @override_settings(MEDIA_SENDFILE='sendfile')
+    def test_x_sendfile(self):
+        """Test the server is given the path of the file"""
+        res = self.client.get(self.url)
+
+        self.assertEqual(res['X-Sendfile'], self.storage.path(self.name))
+
+    def test_parse_range(self):
+        """Test parsing single byte ranges"""
+        self.assertEqual(parse_range('bytes=0-9', 100), (0, 9))
+        self.assertEqual(parse_range('bytes=90-', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=-10', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=50-500', 100), (50, 99))
+        self.assertIsNone(parse_range('bytes=0-1,5-6', 100))
+        self.assertIsNone(parse_range('bytes=9-1', 100))
+        with self.assertRaises(RangeNotSatisfiable):
+            parse_range('bytes=100-', 100)
@@ -0,0 +1,120 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Tag
+
+
+# 시퀀셜 스캔이 나오면 안 되는 테이블
+TABLES = (
+    'core_tag', 'core_ingredient', 'core_recipe', 'core_recipe_tags',
+    'core_recipe_ingredients',
+)
+USERS = 300
+ROWS_PER_USER = 20
+
+
+def scans(plan):
+    """Yield every node of a query plan"""
+    yield plan
+    for child in plan.get('Plans', ()):
+        yield from scans(child)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'PostgreSQL only')
+class ListQueryPlanTests(TestCase):
+    """Test list endpoints read through indexes on a seeded database"""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        User.objects.bulk_create([
+            User(email=f'user{index}@londonappdev.com', password='')
+            for index in range(USERS)
+        ])
+        cls.user = User.objects.get(email='user0@londonappdev.com')
+        # 유저마다 태그, 재료, 레시피를 만들고 같은 유저의 것끼리 연결한다.
+        with connection.cursor() as cursor:
+            for table in ('core_tag', 'core_ingredient'):
+                cursor.execute(
+                    f'INSERT INTO {table} '
+                    f'(name, user_id, updated_at, recipe_count) '
+                    f"SELECT 'Name ' || g, u.id, now(), 0 FROM core_user u, "
+                    f'generate_series(1, %s) g', [ROWS_PER_USER]
+                )
+            cursor.execute(
+                'INSERT INTO core_recipe (user_id, title, time_minutes, '
+                'price, link, image_status, updated_at) '
+                "SELECT u.id, 'Recipe ' || g, 10, 5, '', 'none', now() "
+                'FROM core_user u, generate_series(1, %s) g',
+                [ROWS_PER_USER]
+            )
+            for table, column in (('tag', 'tag_id'),
+                                  ('ingredient', 'ingredient_id')):
+                cursor.execute(
+                    f'INSERT INTO core_recipe_{table}s (recipe_id, {column}) '
+                    f'SELECT r.id, a.id FROM core_recipe r '
+                    f'JOIN core_{table} a ON a.user_id = r.user_id '
+                    f'WHERE (r.id + a.id) % 5 = 0'
+                )
+                cursor.execute(
+                    f'UPDATE core_{table} a SET recipe_count = ('
+                    f'SELECT count(*) FROM core_recipe_{table}s l '
+                    f'WHERE l.{column} = a.id)'
+                )
+            # 플래너가 실제 데이터 분포를 보도록 통계를 갱신한다.
+            for table in TABLES:
+                cursor.execute(f'ANALYZE {table}')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _plans(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, 200)
+        plans = []
+        with connection.cursor() as cursor:
+            # 작은 테이블은 인덱스가 있어도 전체를 읽는 쪽이 싸다.
+            # 시퀀셜 스캔을 끄면 쓸 수 있는 인덱스가 없을 때만 시퀀셜 스캔이 남는다.
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            for query in queries.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                cursor.execute('EXPLAIN (FORMAT JSON) ' + query['sql'])
+                plans.append(cursor.fetchone()[0][0]['Plan'])
+        return plans
+
+    def test_list_endpoints_use_indexes(self):
+        """Test no list endpoint scans a whole table"""
+        tag = Tag.objects.filter(user=self.user).first()
+        urls = (
+            reverse('recipe:tag-list'),
+            reverse('recipe:tag-list') + '?assigned_only=1',
+            reverse('recipe:ingredient-list'),
+            reverse('recipe:ingredient-list') + '?assigned_only=1',
+            reverse('recipe:ingredient-list') + '?ordering=usage',
+            reverse('recipe:tag-list') + '?min_usage=2',
+            reverse('recipe:recipe-list'),
+            reverse('recipe:recipe-list') + f'?tags={tag.id}',
+        )
+        for url in urls:
+            for plan in self._plans(url):
+                for node in scans(plan):
+                    if node.get('Relation Name') not in TABLES:
+                        continue
+                    message = f'{url}: {node}'
+                    self.assertNotEqual(
+                        node['Node Type'], 'Seq Scan', message
+                    )
+                    # 인덱스 전체를 읽으며 유저를 거르는 것도 시퀀셜 스캔과 같다.
+                    self.assertNotIn(
+                        'user_id', node.get('Filter', ''), message
+                    )
@@ -3,6 +3,7 @@
 import tempfile
 # 경로 이름을 생성하고, 시스템에 파일이 있는지 확인하는 것들이 가능
 import os
+from unittest.mock import Mock
 
 # PIL은 pillow requirement이자 원래 이름. pillow는 PIL의 fork이다. 현재 pillow가 권장됨.
 # Image 클래스를 가져오면, 테스트 이미지를 생성해서 API에 업로드할 수 있다.
@@ -130,6 +131,19 @@ class PrivateRecipeApiTests(TestCase):
         serializer = RecipeDetailSerializer(recipe)
         self.assertEqual(res.data, serializer.data)
 
+    def test_retrieve_recipes_paginated(self):
+        """Test paginating recipes with a cursor"""
+        recipes = [sample_recipe(user=self.user) for _ in range(3)]
+
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+        first_page = res.data['results']
+        res = self.client.get(res.data['next'])
+        second_page = res.data['results']
+
+        ids = [recipe['id'] for recipe in first_page + second_page]
+        self.assertEqual(ids, [recipe.id for recipe in reversed(recipes)])
+        self.assertIsNone(res.data['next'])
+
     # 아무것도 안넣고 recipe 생성할 때 테스트
     def test_create_basic_recipe(self):
         """Test creating recipe"""
@@ -193,6 +207,52 @@ class PrivateRecipeApiTests(TestCase):
         self.assertIn(ingredient1, ingredients)
         self.assertIn(ingredient2, ingredients)
 
+    def test_create_recipe_with_other_users_tag(self):
+        """Test creating a recipe with tags of another user fails"""
+        user2 = get_user_model().objects.create_user(
+            'other@londonappdev.com',
+            'password123'
+        )
+        tag = sample_tag(user=self.user, name='Vegan')
+        other_tag = sample_tag(user=user2, name='Fruity')
+        payload = {
+            'title': 'Avocado lime cheesecake',
+            'tags': [tag.id, other_tag.id, 0],
+            'time_minutes': 60,
+            'price': 20.00
+        }
+
+        res = self.client.post(RECIPES_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        # 없는 id들이 한번에 모두 보고된다.
+        self.assertEqual(len(res.data['tags']), 2)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_create_recipe_resolves_ingredients_in_one_query(self):
+        """Test ingredient ids are validated with a single query"""
+        ingredients = [
+            sample_ingredient(user=self.user, name=f'Ingredient {i}')
+            for i in range(20)
+        ]
+        payload = {
+            'title': 'Thai prawn red curry',
+            'ingredients': [ingredient.id for ingredient in ingredients],
+            'tags': [],
+            'time_minutes': 20,
+            'price': 7.00
+        }
+        serializer = RecipeSerializer(
+            data=payload, context={'request': Mock(user=self.user)}
+        )
+
+        with self.assertNumQueries(1):
+            self.assertTrue(serializer.is_valid())
+
+        self.assertEqual(
+            serializer.validated_data['ingredients'], ingredients
+        )
+
     # 업데이트에 대한 부분은 뷰셋 내장 기능이 있어 테스트를 만들지 않아도 된다.
     # 그러나 앱에서 사용할 모든 기능과 API 업데이트 방법을 보여주기 위해서 작성한다.
     def test_partial_update_recipe(self):
@@ -239,6 +299,55 @@ class PrivateRecipeApiTests(TestCase):
         self.assertEqual(len(tags), 0)
 
 
+class RecipeQueryBudgetTests(TestCase):
+    """Test that recipe endpoints run a fixed number of queries"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'budget@londonappdev.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def _create_recipes(self, count):
+        """Create recipes that each have a tag and an ingredient"""
+        recipes = []
+        for i in range(count):
+            recipe = sample_recipe(user=self.user, title=f'Recipe {i}')
+            recipe.tags.add(sample_tag(user=self.user, name=f'Tag {i}'))
+            recipe.ingredients.add(
+                sample_ingredient(user=self.user, name=f'Ingredient {i}')
+            )
+            recipes.append(recipe)
+        return recipes
+
+    # 레시피 개수와 상관없이 쿼리 수가 같아야 한다.
+    # 레시피 1번, 재료 중간 테이블 1번, 태그 중간 테이블 1번
+    # 이미지가 없으면 이미지 사본은 읽지 않는다. (recipe.fastpath 참고)
+    def test_list_query_budget(self):
+        """Test listing recipes does not run a query per recipe"""
+        for count in (1, 10):
+            self._create_recipes(count)
+            with self.assertNumQueries(3):
+                res = self.client.get(RECIPES_URL)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_detail_query_budget(self):
+        """Test retrieving a recipe does not run a query per relation"""
+        recipe = self._create_recipes(1)[0]
+        for i in range(10):
+            recipe.tags.add(sample_tag(user=self.user, name=f'Extra {i}'))
+
+        # 변경 시각 확인 1번, 레시피 1번, 재료 1번, 태그 1번, 이미지 사본 1번
+        with self.assertNumQueries(5):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['tags']), 11)
+        self.assertEqual(res.data, RecipeDetailSerializer(recipe).data)
+
+
 class RecipeImageUploadTests(TestCase):
     # 이미지 업로드 함수들에는 몇가지 공통점들이 있으므로 클래스 분리함.
 
@@ -341,3 +450,79 @@ class RecipeImageUploadTests(TestCase):
         self.assertIn(serializer1.data, res.data)
         self.assertIn(serializer2.data, res.data)
         self.assertNotIn(serializer3.data, res.data)
+
+
+class RecipeFilterTests(TestCase):
+    """Test filtering recipes by tags and ingredients"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'filter@londonappdev.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.vegan = sample_tag(user=self.user, name='Vegan')
+        self.dessert = sample_tag(user=self.user, name='Dessert')
+        self.sugar = sample_ingredient(user=self.user, name='Sugar')
+        self.cake = sample_recipe(user=self.user, title='Vegan cake')
+        self.cake.tags.add(self.vegan, self.dessert)
+        self.cake.ingredients.add(self.sugar)
+        self.salad = sample_recipe(user=self.user, title='Salad')
+        self.salad.tags.add(self.vegan)
+        self.pie = sample_recipe(user=self.user, title='Apple pie')
+        self.pie.tags.add(self.dessert)
+        self.pie.ingredients.add(self.sugar)
+
+    def _titles(self, params):
+        res = self.client.get(RECIPES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['title'] for recipe in res.data]
+
+    # 두 태그를 모두 가진 레시피도 한번만 나와야한다.
+    def test_filter_any_returns_unique_recipes(self):
+        """Test recipes matching several tags are returned once"""
+        titles = self._titles({'tags': f'{self.vegan.id},{self.dessert.id}'})
+
+        self.assertEqual(titles, ['Apple pie', 'Salad', 'Vegan cake'])
+
+    def test_filter_all_tags(self):
+        """Test match=all returns recipes having every tag"""
+        titles = self._titles({
+            'tags': f'{self.vegan.id},{self.dessert.id}',
+            'match': 'all',
+        })
+
+        self.assertEqual(titles, ['Vegan cake'])
+
+    def test_filter_tags_and_ingredients(self):
+        """Test combined tag and ingredient filters do not multiply rows"""
+        titles = self._titles({
+            'tags': f'{self.vegan.id},{self.dessert.id}',
+            'ingredients': f'{self.sugar.id}',
+        })
+
+        self.assertEqual(titles, ['Apple pie', 'Vegan cake'])
+
+    def test_filter_exclude_tags(self):
+        """Test recipes with excluded tags are not returned"""
+        titles = self._titles({
+            'tags': f'{self.vegan.id}',
+            'exclude_tags': f'{self.dessert.id}',
+        })
+
+        self.assertEqual(titles, ['Salad'])
+
+    def test_filter_invalid_ids(self):
+        """Test invalid ids return a bad request"""
+        res = self.client.get(RECIPES_URL, {'tags': 'abc'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_invalid_match(self):
+        """Test an unknown match mode returns a bad request"""
+        res = self.client.get(
+            RECIPES_URL, {'tags': self.vegan.id, 'match': 'some'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,100 @@
+import time
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.db.routers import ReplicaRouter, replica_reads_enabled
+from core.models import Tag
+
+from recipe.cache import MODIFIED_KEY, bump_data_version
+
+
+TAGS_URL = reverse('recipe:tag-list')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class ReplicaReadTests(TestCase):
+    """Test api reads are sent to replicas"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        Tag.objects.create(user=self.user, name='Vegan')
+        # 테스트에는 복제본이 없으므로 기본 db를 복제본처럼 쓴다.
+        patcher = patch(
+            'recipe.replicas.replica_aliases', return_value=['replica']
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        choose = patch.object(
+            ReplicaRouter, 'choose_replica', return_value='default'
+        )
+        self.choose_replica = choose.start()
+        self.addCleanup(choose.stop)
+
+    def _written_before(self, seconds):
+        bump_data_version(self.user.id)
+        cache.set(
+            MODIFIED_KEY.format(user_id=self.user.id),
+            time.time() - seconds, None
+        )
+
+    def test_list_reads_from_replica(self):
+        """Test listing reads from a replica"""
+        self._written_before(60)
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 1)
+        self.choose_replica.assert_called()
+        self.assertFalse(replica_reads_enabled())
+
+    def test_replica_list_not_cached(self):
+        """Test lists read from a replica are not cached as current"""
+        self._written_before(60)
+
+        res = self.client.get(TAGS_URL)
+        self.assertNotIn('ETag', res)
+        self.client.get(TAGS_URL)
+
+        # 두번째 요청도 캐시가 아니라 복제본에서 읽어야 한다.
+        self.assertEqual(self.choose_replica.call_count, 2)
+
+    def test_write_uses_primary(self):
+        """Test writes do not read from a replica"""
+        self._written_before(60)
+
+        res = self.client.post(TAGS_URL, {'name': 'Dessert'})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.choose_replica.assert_not_called()
+
+    def test_read_your_writes(self):
+        """Test a user reads from the primary just after a write"""
+        self.client.post(RECIPES_URL, {
+            'title': 'Cheesecake', 'time_minutes': 30, 'price': 10
+        })
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.choose_replica.assert_not_called()
+
+        # 복제본이 따라잡을 시간이 지나면 다시 복제본에서 읽는다.
+        # 같은 목록은 캐시에서 응답하므로 캐시에 없는 목록을 요청한다.
+        self._written_before(60)
+        self.client.get(TAGS_URL)
+
+        self.choose_replica.assert_called()
@@ -0,0 +1,167 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+TAGS_BULK_URL = reverse('recipe:tag-bulk')
+
+
+def sample_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': 5.00
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class RecipeSearchTests(TestCase):
+    """Test full text search of recipes"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_search_ranks_title_above_tags_and_ingredients(self):
+        """Test title matches come before tag and ingredient matches"""
+        by_ingredient = sample_recipe(user=self.user, title='Soup')
+        by_ingredient.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Curry paste')
+        )
+        by_tag = sample_recipe(user=self.user, title='Stew')
+        by_tag.tags.add(Tag.objects.create(user=self.user, name='Curry'))
+        by_title = sample_recipe(user=self.user, title='Thai curry')
+        sample_recipe(user=self.user, title='Cheesecake')
+
+        res = self.client.get(RECIPES_URL, {'q': 'curry'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [recipe['id'] for recipe in res.data['results']],
+            [by_title.id, by_tag.id, by_ingredient.id]
+        )
+
+    def test_search_requires_every_term(self):
+        """Test only recipes matching all terms are returned"""
+        recipe = sample_recipe(user=self.user, title='Green curry')
+        sample_recipe(user=self.user, title='Red curry')
+
+        res = self.client.get(RECIPES_URL, {'q': 'green curry'})
+
+        self.assertEqual(
+            [recipe['id'] for recipe in res.data['results']], [recipe.id]
+        )
+
+    def test_search_follows_renamed_tag(self):
+        """Test renaming a tag updates the recipes found by it"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = sample_recipe(user=self.user, title='Salad')
+        recipe.tags.add(tag)
+        tag.name = 'Breakfast'
+        tag.save()
+
+        res = self.client.get(RECIPES_URL, {'q': 'breakfast'})
+
+        self.assertEqual(
+            [recipe['id'] for recipe in res.data['results']], [recipe.id]
+        )
+
+    def test_search_finds_deleted_tag_no_more(self):
+        """Test deleting a tag removes its name from the search"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = sample_recipe(user=self.user, title='Salad')
+        recipe.tags.add(tag)
+        tag.delete()
+
+        res = self.client.get(RECIPES_URL, {'q': 'vegan'})
+
+        self.assertEqual(res.data['count'], 0)
+
+    # bulk 요청은 시그널 없이 저장하므로 postgres의 검색 컬럼을 직접 만들어야 한다.
+    def test_search_bulk_imported_recipes(self):
+        """Test recipes created and edited in bulk can be searched"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        payload = [
+            {'title': 'Thai curry', 'time_minutes': 10, 'price': '5.00',
+             'tags': [tag.id]},
+            {'title': 'Cheesecake', 'time_minutes': 60, 'price': '8.00'},
+        ]
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        curry, cake = [recipe['id'] for recipe in res.data]
+
+        res = self.client.get(RECIPES_URL, {'q': 'curry'})
+        self.assertEqual(
+            [recipe['id'] for recipe in res.data['results']], [curry]
+        )
+
+        self.client.patch(RECIPES_BULK_URL, [
+            {'id': cake, 'title': 'Lemon cheesecake', 'tags': [tag.id]}
+        ], format='json')
+        self.client.patch(TAGS_BULK_URL, [
+            {'id': tag.id, 'name': 'Dessert'}
+        ], format='json')
+
+        res = self.client.get(RECIPES_URL, {'q': 'lemon dessert'})
+        self.assertEqual(
+            [recipe['id'] for recipe in res.data['results']], [cake]
+        )
+        res = self.client.get(RECIPES_URL, {'q': 'dessert'})
+        self.assertEqual(res.data['count'], 2)
+
+    def test_rebuild_search_vectors(self):
+        """Test the command rebuilds missing search vectors"""
+        recipe = sample_recipe(user=self.user, title='Thai curry')
+        Recipe.objects.update(search_vector=None)
+
+        call_command('rebuild_search_vectors', stdout=StringIO())
+
+        res = self.client.get(RECIPES_URL, {'q': 'curry'})
+        self.assertEqual(
+            [recipe['id'] for recipe in res.data['results']], [recipe.id]
+        )
+
+    def test_search_limited_to_user(self):
+        """Test recipes of other users are not found"""
+        user2 = get_user_model().objects.create_user(
+            'other@londonappdev.com',
+            'testpass'
+        )
+        sample_recipe(user=user2, title='Curry')
+
+        res = self.client.get(RECIPES_URL, {'q': 'curry'})
+
+        self.assertEqual(res.data['count'], 0)
+
+    def test_search_is_paginated(self):
+        """Test search results are split into pages"""
+        for i in range(3):
+            sample_recipe(user=self.user, title=f'Curry {i}')
+
+        res1 = self.client.get(RECIPES_URL, {'q': 'curry', 'page_size': 2})
+        res2 = self.client.get(
+            RECIPES_URL, {'q': 'curry', 'page_size': 2, 'page': 2}
+        )
+
+        self.assertEqual(res1.data['count'], 3)
+        self.assertEqual(len(res1.data['results']), 2)
+        self.assertIsNotNone(res1.data['next'])
+        self.assertEqual(len(res2.data['results']), 1)
@@ -1,8 +1,13 @@
+from base64 import b64encode
+from urllib.parse import urlencode
+
 # 사용자 모델 가져오기
 from django.contrib.auth import get_user_model
 # URL 생성을 위한 reverse 가져오기
 from django.urls import reverse
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -145,3 +150,148 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
 
         self.assertEqual(len(res.data), 1)
+
+    def test_retrieve_tags_assigned_without_distinct(self):
+        """Test assigned tags are filtered by a subquery, not a join"""
+        tag = Tag.objects.create(user=self.user, name='Breakfast')
+        recipe = Recipe.objects.create(
+            title='Pancakes', time_minutes=5, price=3.00, user=self.user
+        )
+        recipe.tags.add(tag)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        self.assertEqual(len(res.data), 1)
+        sql = queries.captured_queries[-1]['sql']
+        self.assertNotIn('DISTINCT', sql)
+        self.assertNotIn('JOIN', sql)
+
+    def _tags_used(self, *counts):
+        tags = []
+        for index, count in enumerate(counts):
+            tag = Tag.objects.create(user=self.user, name=f'Tag {index}')
+            for _ in range(count):
+                recipe = Recipe.objects.create(
+                    title='Sample', time_minutes=5, price=3.00,
+                    user=self.user
+                )
+                recipe.tags.add(tag)
+            tags.append(tag)
+        return tags
+
+    # 많이 쓰인 태그부터 반환한다.
+    def test_retrieve_tags_ordered_by_usage(self):
+        """Test ordering tags by the number of recipes using them"""
+        tag0, tag1, tag2 = self._tags_used(1, 0, 3)
+
+        res = self.client.get(TAGS_URL, {'ordering': 'usage'})
+
+        self.assertEqual(
+            [tag['id'] for tag in res.data], [tag2.id, tag0.id, tag1.id]
+        )
+
+    def test_retrieve_tags_min_usage(self):
+        """Test filtering tags used by at least some recipes"""
+        tag0, tag1, tag2 = self._tags_used(1, 0, 3)
+
+        res = self.client.get(TAGS_URL, {'min_usage': 2})
+
+        self.assertEqual([tag['id'] for tag in res.data], [tag2.id])
+
+    def test_retrieve_tags_by_usage_paginated(self):
+        """Test paginating tags ordered by usage with a cursor"""
+        tags = self._tags_used(2, 1, 3, 2)
+
+        res = self.client.get(TAGS_URL, {'ordering': 'usage', 'page_size': 2})
+        ids = [tag['id'] for tag in res.data['results']]
+        res = self.client.get(res.data['next'])
+        ids += [tag['id'] for tag in res.data['results']]
+
+        # 사용 횟수가 같으면 이름의 역순이다.
+        self.assertEqual(
+            ids, [tags[2].id, tags[3].id, tags[0].id, tags[1].id]
+        )
+
+    def test_retrieve_tags_paginated_past_ties(self):
+        """Test cursors page through tied tags without offsets"""
+        for index in range(9):
+            Tag.objects.create(user=self.user, name=f'Tag {index % 2}')
+        expected = list(Tag.objects.order_by(
+            '-recipe_count', '-name', 'id'
+        ).values_list('id', flat=True))
+
+        ids, pages = [], []
+        url, params = TAGS_URL, {'ordering': 'usage', 'page_size': 2}
+        while url:
+            # 같은 값이 많아도 OFFSET 없이 커서의 값 다음부터 가져와야 한다.
+            with CaptureQueriesContext(connection) as context:
+                res = self.client.get(url, params)
+            self.assertFalse(any(
+                'OFFSET' in query['sql'] for query in context.captured_queries
+            ))
+            ids += [tag['id'] for tag in res.data['results']]
+            pages.append(res.data)
+            url, params = res.data['next'], None
+        self.assertEqual(ids, expected)
+
+        # previous를 따라 돌아가도 같은 페이지가 나와야 한다.
+        for page in reversed(pages[:-1]):
+            res = self.client.get(pages[pages.index(page) + 1]['previous'])
+            self.assertEqual(res.data['results'], page['results'])
+
+    def test_retrieve_tags_invalid_cursor(self):
+        """Test a cursor not matching the ordering returns 404"""
+        # 정렬 필드는 둘인데 값이 하나인 커서 (p=[1])
+        res = self.client.get(TAGS_URL, {'cursor': 'cD0lNUIxJTVE'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_retrieve_tags_cursor_invalid_values(self):
+        """Test a cursor with values of the wrong type returns 404"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        for position in ('["Vegan", "x"]', '["Vegan", null]',
+                         '[["Vegan"], 1]', '["Vegan", "1.5"]'):
+            cursor = b64encode(
+                urlencode({'p': position}).encode('ascii')
+            ).decode('ascii')
+
+            res = self.client.get(TAGS_URL, {'cursor': cursor})
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_retrieve_tags_invalid_params(self):
+        """Test invalid usage filters return 400"""
+        for params in ({'ordering': 'color'}, {'min_usage': -1},
+                       {'assigned_only': 'yes'}):
+            res = self.client.get(TAGS_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    # page_size를 보내면 커서 기반으로 페이지가 나뉜다.
+    def test_retrieve_tags_paginated(self):
+        """Test paginating tags with a cursor"""
+        for name in ('Vegan', 'Dessert', 'Dessert', 'Breakfast'):
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        names = [tag['name'] for tag in res.data['results']]
+        self.assertEqual(names, ['Vegan', 'Dessert'])
+        self.assertIsNone(res.data['previous'])
+
+        # next에 들어있는 커서를 따라가면 나머지가 중복 없이 나와야한다.
+        res = self.client.get(res.data['next'])
+
+        names += [tag['name'] for tag in res.data['results']]
+        self.assertEqual(names, ['Vegan', 'Dessert', 'Dessert', 'Breakfast'])
+        self.assertIsNone(res.data['next'])
+
+    def test_retrieve_tags_not_paginated_by_default(self):
+        """Test tags are returned as a plain list without page params"""
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertIsInstance(res.data, list)
@@ -0,0 +1,126 @@
+import io
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import serializers, status
+from rest_framework.test import APIClient
+
+from PIL import Image
+
+from core.models import Recipe
+from recipe.uploadhandlers import HEADER_LIMIT, BoundedImageUploadHandler
+
+
+def image_upload_url(recipe_id):
+    """Return URL for recipe image upload"""
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+def sample_image_file(size=(10, 10), format='JPEG', suffix='.jpg'):
+    """Return a temporary file holding a sample image"""
+    ntf = tempfile.NamedTemporaryFile(suffix=suffix)
+    # 압축이 잘 안되도록 무작위 픽셀을 넣는다.
+    Image.frombytes('RGB', size, os.urandom(size[0] * size[1] * 3)).save(
+        ntf, format=format
+    )
+    ntf.seek(0)
+    return ntf
+
+
+class StreamingImageUploadTests(TestCase):
+    """Test the size and header checks of recipe image uploads"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@londonappdev.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Sample recipe', time_minutes=10, price=5
+        )
+
+    def tearDown(self):
+        self.recipe.refresh_from_db()
+        self.recipe.image.delete()
+
+    def _upload(self, ntf):
+        with ntf:
+            return self.client.post(
+                image_upload_url(self.recipe.id), {'image': ntf},
+                format='multipart'
+            )
+
+    def test_upload_valid_image(self):
+        """Test a valid image is stored"""
+        res = self._upload(sample_image_file(format='PNG', suffix='.png'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        self.assertTrue(os.path.exists(self.recipe.image.path))
+
+    @override_settings(RECIPE_IMAGE_MAX_BYTES=100 * 1024)
+    def test_upload_too_large(self):
+        """Test files over the size limit are rejected with 413"""
+        res = self._upload(sample_image_file(size=(400, 400), format='PNG'))
+
+        self.assertEqual(
+            res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    @override_settings(RECIPE_IMAGE_MAX_PIXELS=100)
+    def test_upload_too_many_pixels(self):
+        """Test images over the pixel limit are rejected before decoding"""
+        res = self._upload(sample_image_file(size=(20, 20)))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('image', res.data)
+
+    def test_upload_not_an_image(self):
+        """Test files without an image header are rejected"""
+        ntf = tempfile.NamedTemporaryFile(suffix='.jpg')
+        ntf.write(b'not an image')
+        ntf.seek(0)
+
+        res = self._upload(ntf)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('image', res.data)
+
+    def test_unsupported_image_format(self):
+        """Test image formats outside the allowed list are rejected"""
+        res = self._upload(sample_image_file(format='BMP', suffix='.bmp'))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_header_buffer_is_bounded(self):
+        """Test the handler keeps no more than the header limit in memory"""
+        handler = BoundedImageUploadHandler()
+        handler.new_file('image', 'photo.jpg', 'image/jpeg', None)
+        chunk = b'\0' * (64 * 1024)
+
+        with self.assertRaises(serializers.ValidationError):
+            for start in range(0, HEADER_LIMIT * 2, len(chunk)):
+                handler.receive_data_chunk(chunk, start)
+                self.assertLessEqual(len(handler.header), HEADER_LIMIT)
+
+    def test_file_written_to_disk(self):
+        """Test uploads are streamed to a temporary file"""
+        handler = BoundedImageUploadHandler()
+        handler.new_file('image', 'photo.jpg', 'image/jpeg', None)
+        buffer = io.BytesIO()
+        Image.new('RGB', (10, 10)).save(buffer, 'JPEG')
+        handler.receive_data_chunk(buffer.getvalue(), 0)
+
+        uploaded = handler.file_complete(len(buffer.getvalue()))
+
+        self.assertTrue(os.path.exists(uploaded.temporary_file_path()))
+        self.assertIsNone(handler.header)
+        uploaded.close()
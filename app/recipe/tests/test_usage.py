@@ -0,0 +1,155 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+
+
+def sample_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': 5.00
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class UsageCountTests(TestCase):
+    """Test the stored recipe counts of tags and ingredients"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            'testpass'
+        )
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.dessert = Tag.objects.create(user=self.user, name='Dessert')
+        self.salt = Ingredient.objects.create(user=self.user, name='Salt')
+
+    def assertCounts(self, vegan, dessert, salt=None):
+        self.vegan.refresh_from_db()
+        self.dessert.refresh_from_db()
+        self.assertEqual(
+            (self.vegan.recipe_count, self.dessert.recipe_count),
+            (vegan, dessert)
+        )
+        if salt is not None:
+            self.salt.refresh_from_db()
+            self.assertEqual(self.salt.recipe_count, salt)
+
+    def test_add_and_remove(self):
+        """Test counts follow relations added and removed"""
+        recipe1 = sample_recipe(self.user)
+        recipe2 = sample_recipe(self.user)
+        recipe1.tags.add(self.vegan, self.dessert)
+        recipe2.tags.add(self.vegan)
+        # 이미 연결된 것을 다시 더해도 세지 않는다.
+        recipe2.tags.add(self.vegan)
+        recipe1.ingredients.add(self.salt)
+
+        self.assertCounts(2, 1, salt=1)
+
+        # 연결되지 않은 것을 지워도 빼지 않는다.
+        recipe2.tags.remove(self.vegan, self.dessert)
+
+        self.assertCounts(1, 1)
+
+    def test_set_and_clear(self):
+        """Test counts follow replaced and cleared relations"""
+        recipe = sample_recipe(self.user)
+        recipe.tags.set([self.vegan])
+        recipe.tags.set([self.dessert])
+
+        self.assertCounts(0, 1)
+
+        recipe.tags.clear()
+
+        self.assertCounts(0, 0)
+
+    def test_reverse_relations(self):
+        """Test counts follow changes made from the tag side"""
+        recipe1 = sample_recipe(self.user)
+        recipe2 = sample_recipe(self.user)
+        self.vegan.recipe_set.add(recipe1, recipe2)
+        self.vegan.recipe_set.remove(recipe1)
+
+        self.assertCounts(1, 0)
+
+        self.vegan.recipe_set.clear()
+
+        self.assertCounts(0, 0)
+
+    def test_recipe_delete(self):
+        """Test deleting recipes decreases the counts"""
+        recipe1 = sample_recipe(self.user)
+        recipe2 = sample_recipe(self.user)
+        recipe1.tags.add(self.vegan, self.dessert)
+        recipe2.tags.add(self.vegan)
+        recipe1.ingredients.add(self.salt)
+
+        recipe1.delete()
+
+        self.assertCounts(1, 0, salt=0)
+
+        Recipe.objects.filter(user=self.user).delete()
+
+        self.assertCounts(0, 0)
+
+    def test_bulk_api(self):
+        """Test counts follow recipes created and updated in bulk"""
+        client = APIClient()
+        client.force_authenticate(self.user)
+        payload = [
+            {'title': f'Recipe {i}', 'time_minutes': 10, 'price': '5.00',
+             'tags': [self.vegan.id], 'ingredients': [self.salt.id]}
+            for i in range(3)
+        ]
+
+        res = client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertCounts(3, 0, salt=3)
+
+        payload = [
+            {'id': recipe['id'], 'tags': [self.dessert.id]}
+            for recipe in res.data[:2]
+        ]
+        res = client.patch(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertCounts(1, 2, salt=3)
+
+    def test_reconcile_command(self):
+        """Test the reconcile command repairs drifted counts"""
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(self.vegan)
+        Tag.objects.filter(pk=self.vegan.pk).update(recipe_count=7)
+        Tag.objects.filter(pk=self.dessert.pk).update(recipe_count=-1)
+
+        out = StringIO()
+        call_command(
+            'reconcile_usage_counts', '--dry-run', stdout=out
+        )
+
+        self.assertIn('tags: 2 of 2 counts wrong', out.getvalue())
+        self.assertCounts(7, -1)
+
+        out = StringIO()
+        call_command(
+            'reconcile_usage_counts', '--batch-size', '1', stdout=out
+        )
+
+        self.assertIn('tags: 2 of 2 counts fixed', out.getvalue())
+        self.assertIn('ingredients: 0 of 1 counts fixed', out.getvalue())
+        self.assertCounts(1, 0)
@@ -0,0 +1,113 @@
+# 레시피 이미지 업로드 처리.
+# 업로드 본문을 받는 대로 임시 파일에 쓰고, 메모리에는 이미지 헤더를 확인할 만큼만 둔다.
+# 크기 제한을 넘거나 헤더가 이미지가 아니면 본문을 끝까지 받기 전에 요청을 거절한다.
+# 헤더만 읽으므로 픽셀 수가 너무 큰 이미지도 디코딩하기 전에 걸러진다.
+import io
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.utils.translation import ugettext_lazy as _
+
+from rest_framework import exceptions, serializers, status
+
+from PIL import Image
+
+
+ALLOWED_FORMATS = ('JPEG', 'PNG', 'WEBP', 'GIF')
+# 이 크기 안에서 이미지 헤더를 찾지 못하면 이미지가 아닌 것으로 본다.
+HEADER_LIMIT = 512 * 1024
+# multipart 경계와 다른 필드도 본문 크기에 포함되므로 그만큼 여유를 둔다.
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class ImageTooLarge(exceptions.APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = _('Image file is too large.')
+    default_code = 'image_too_large'
+
+
+def invalid_image_error(message=None):
+    """Return the validation error for an unusable image"""
+    return serializers.ValidationError({'image': [message or _(
+        'Upload a valid image. The file you uploaded was either not an '
+        'image or a corrupted image.'
+    )]})
+
+
+def inspect_image_header(header, max_pixels):
+    """Check an image header, returning False while it is incomplete"""
+    try:
+        # Image.open은 헤더만 읽고 픽셀은 디코딩하지 않는다.
+        image = Image.open(io.BytesIO(header))
+    except Image.DecompressionBombError:
+        raise invalid_image_error(_(
+            'Ensure the image has no more than %d pixels.'
+        ) % max_pixels)
+    except Exception:
+        # 헤더가 아직 덜 왔거나 이미지가 아니다.
+        if len(header) >= HEADER_LIMIT:
+            raise invalid_image_error()
+        return False
+
+    if image.format not in ALLOWED_FORMATS:
+        raise invalid_image_error(_(
+            'Unsupported image format. Use one of: %s.'
+        ) % ', '.join(ALLOWED_FORMATS))
+    width, height = image.size
+    if width * height > max_pixels:
+        raise invalid_image_error(_(
+            'Ensure the image has no more than %d pixels.'
+        ) % max_pixels)
+    return True
+
+
+class BoundedImageUploadHandler(TemporaryFileUploadHandler):
+    """Stream uploaded images to disk checking their size and header"""
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_bytes = getattr(
+            settings, 'RECIPE_IMAGE_MAX_BYTES', 25 * 1024 * 1024
+        )
+        self.max_pixels = getattr(
+            settings, 'RECIPE_IMAGE_MAX_PIXELS', 50 * 1000 * 1000
+        )
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        # Content-Length만 보고 거절할 수 있으면 본문을 읽지 않는다.
+        if content_length > self.max_bytes + MULTIPART_OVERHEAD:
+            raise ImageTooLarge()
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.header = bytearray()
+        self.checked = False
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_bytes:
+            self._fail(ImageTooLarge())
+        if not self.checked:
+            self.header += raw_data
+            try:
+                self.checked = inspect_image_header(
+                    self.header, self.max_pixels
+                )
+            except serializers.ValidationError as exc:
+                self._fail(exc)
+            if self.checked:
+                self.header = None
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        if not self.checked:
+            # 헤더를 다 받기 전에 파일이 끝났다.
+            self._fail(invalid_image_error())
+        return super().file_complete(file_size)
+
+    def _fail(self, exc):
+        # 임시 파일을 지우고 요청을 거절한다.
+        self.file.close()
+        raise exc
@@ -18,5 +18,11 @@ app_name = 'recipe'
 urlpatterns = [
     # 모든 요청을 전달해서 일치하는 경로로 전달할 것임.
     # 디폴트라우터를 통해 만들어진 모든 url이 url patterns에 포함된다.
-    path('', include(router.urls))
+    path('', include(router.urls)),
+    # 로컬 저장소를 쓸 때 이미지를 직접 올리는 주소. (recipe.direct_uploads 참고)
+    path(
+        'uploads/<str:token>/',
+        views.LocalImageUploadView.as_view(),
+        name='image-upload'
+    ),
 ]
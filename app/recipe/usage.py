@@ -0,0 +1,100 @@
+# 태그와 재료를 쓰는 레시피 수(recipe_count) 관리.
+# 사용 횟수로 정렬하거나 거를 때마다 중간 테이블을 GROUP BY 하지 않도록 세어둔 값을 저장한다.
+# 관계가 바뀔 때 다시 세지 않고 F()로 바뀐 만큼만 더하고 빼므로, 동시에 바뀌어도 값을 잃지 않는다.
+# 시그널 없이 중간 테이블을 바꿔서 값이 어긋나면 reconcile_usage_counts 명령으로 고친다.
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from core.models import Recipe
+
+
+# 레시피의 N:N 필드 이름
+COUNTED_RELATIONS = ('tags', 'ingredients')
+
+
+def relation_columns(name):
+    """Return the counted model, through model and columns of a relation"""
+    field = Recipe._meta.get_field(name)
+    return (
+        field.related_model, field.remote_field.through,
+        field.m2m_column_name(), field.m2m_reverse_name(),
+    )
+
+
+def relation_by_through(through):
+    """Return the name of the recipe relation stored in a through model"""
+    for name in COUNTED_RELATIONS:
+        if Recipe._meta.get_field(name).remote_field.through is through:
+            return name
+    return None
+
+
+def actual_usage(name):
+    """Return a subquery counting the recipes using each object"""
+    model, through, source, target = relation_columns(name)
+    counts = through.objects.filter(**{target: OuterRef('pk')}).order_by() \
+        .values(target).annotate(count=Count('*')).values('count')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def adjust_usage(model, deltas):
+    """Add the given deltas to the recipe counts of objects"""
+    # 같은 값을 더하는 객체끼리 한번에 UPDATE한다.
+    by_delta = defaultdict(list)
+    for pk, delta in deltas.items():
+        if delta:
+            by_delta[delta].append(pk)
+    for delta, pks in by_delta.items():
+        model.objects.filter(pk__in=pks).update(
+            recipe_count=F('recipe_count') + delta
+        )
+
+
+def count_relation_change(through, instance, action, reverse, pk_set):
+    """Update recipe counts from an m2m_changed signal"""
+    name = relation_by_through(through)
+    model, through, source, target = relation_columns(name)
+    # remove와 clear의 pk_set에는 연결되지 않은 id도 들어있을 수 있고,
+    # 지운 뒤에는 무엇이 지워졌는지 알 수 없으므로 지우기 전에 실제 연결을 찾아둔다.
+    pending = instance.__dict__.setdefault('_usage_pending', {})
+    if action in ('pre_remove', 'pre_clear'):
+        if reverse:
+            links = through.objects.filter(**{target: instance.pk})
+            if pk_set is not None:
+                links = links.filter(**{f'{source}__in': pk_set})
+            pending[name] = Counter({instance.pk: links.count()})
+        else:
+            links = through.objects.filter(**{source: instance.pk})
+            if pk_set is not None:
+                links = links.filter(**{f'{target}__in': pk_set})
+            pending[name] = Counter(links.values_list(target, flat=True))
+    elif action in ('post_remove', 'post_clear'):
+        removed = pending.pop(name, Counter())
+        adjust_usage(model, {pk: -count for pk, count in removed.items()})
+    elif action == 'post_add':
+        # add는 이미 연결된 id를 빼고 새로 연결된 것만 pk_set으로 보낸다.
+        if reverse:
+            adjust_usage(model, {instance.pk: len(pk_set)})
+        else:
+            adjust_usage(model, {pk: 1 for pk in pk_set})
+
+
+def count_recipe_delete(recipe):
+    """Decrease the recipe counts of everything a deleted recipe used"""
+    # 레시피를 지우면 중간 테이블의 행은 시그널 없이 같이 지워진다.
+    for name in COUNTED_RELATIONS:
+        model, through, source, target = relation_columns(name)
+        model.objects.filter(id__in=through.objects.filter(
+            **{source: recipe.pk}
+        ).values(target)).update(recipe_count=F('recipe_count') - 1)
+
+
+def count_replaced_links(name, old_links, new_links):
+    """Update recipe counts after links were replaced without signals"""
+    # old_links, new_links는 (레시피 id, 대상 id) 목록이다.
+    model = relation_columns(name)[0]
+    deltas = Counter(target for _, target in new_links)
+    deltas.subtract(target for _, target in old_links)
+    adjust_usage(model, deltas)
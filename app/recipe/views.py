@@ -3,33 +3,64 @@
 # DRF의 특징으로, 뷰셋의 다른 기능은 가져오지 않고 우리가 사용할 list model function만 가져온다.
 # 생성 삭제는 필요없고, 목록만 가져오면 됨.
 # 이는 제네릭 뷰셋과 list model mixin의 조합으로 가능하다.
+from django.db import transaction
+from django.db.models import Max
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
 # 상태를 확인하여 커스텀 액션을 위한 상태를 만드는 목적
 from rest_framework import viewsets, mixins, status
-# 인증을 위해서
-from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
 
 # 뷰셋에 커스텀 액션을 추가하는데 사용됨.
 from rest_framework.decorators import action
 # 커스텀 response를 반환하기 위함.
 from rest_framework.response import Response
-
+from rest_framework.views import APIView
 
 from core.models import Tag, Ingredient, Recipe
+# 인증을 위해서. 토큰을 캐시해서 요청마다 토큰 조회 쿼리가 실행되지 않도록 한다.
+from user.authentication import CachedTokenAuthentication
 from recipe import serializers
+from recipe.autocomplete import AutocompleteMixin
+from recipe.bulk import BulkModelMixin
+from recipe.cache import CachedListMixin
+from recipe.conditional import ConditionalDetailMixin
+from recipe.direct_uploads import complete_upload, issue_upload, \
+    receive_local_upload
+from recipe.fastpath import FastListMixin
+from recipe.filters import attr_ordering, filter_recipe_attrs, \
+    filter_recipes
+from recipe.fieldsets import parse_fieldsets
+from recipe.images import process_recipe_image
+from recipe.pagination import RecipeAttrCursorPagination, \
+    RecipeCursorPagination
+from recipe.queries import plan_queryset
+from recipe.replicas import ReplicaReadMixin
+from recipe.search import RecipeSearchPagination, search_recipes
+from recipe.tasks import enqueue
+from recipe.uploadhandlers import BoundedImageUploadHandler
 
 # Tag뷰셋과 ingredient뷰셋이 공통점이 많아, 합치도록 하겠다.
 # 원하는 믹스인만 골라 넣으면 된다.
 # CreateModelMixin을 추가하였으면 생성 옵션이 추가되므로 create func을 재정의할 수 있다.
 
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
+# 목록 응답은 유저별 데이터 버전으로 캐시한다. list를 덮어써야 하므로 가장 앞에 둔다.
+# 조회 요청은 복제본 db에서 읽는다. 페이지를 나누지 않은 목록은 시리얼라이저 없이 만든다.
+class BaseRecipeAttrViewSet(CachedListMixin,
+                            ReplicaReadMixin,
+                            FastListMixin,
+                            AutocompleteMixin,
+                            BulkModelMixin,
+                            viewsets.GenericViewSet,
                             mixins.ListModelMixin,
                             mixins.CreateModelMixin):
     """Base viewset for user owned recipe attributes"""
     # 상세한 기능을 덮어쓰고 싶으면 공식 문서 참고
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    # ?cursor= 또는 ?page_size= 를 보낸 경우에만 페이지를 나눈다.
+    pagination_class = RecipeAttrCursorPagination
 
     # 해당 뷰셋이 호출될 때, 객체를 검색하기 위해서 get_queryset함수를 호출할 것이다.
     # 우리는 이를 상속해서 인증된 유저만 가능하도록 제한할 수 있다.
@@ -37,22 +68,17 @@ class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
         """Return objects for the current authenticated user only"""
         # Tag.objects.all() 처럼 해도 되긴 하지만, 만약 해당 객체가 변경중일 때 검색하면 작업이 수행되지 않는다.
         # 이미 인증된 유저일 것이다.
-        assigned_only = bool(
-            # assigned_only는 0아니면 1이 온다. 다만, 문자열인지 뭔지 모른다.
-            # 그래서 이 값을 int로 변환한 다음, bool로 변경한다.
-            # 또는 문자열에 0을 붙여 bool을 하면 true가 반환된다. 그걸 방지하기 위함이다.
-            # , 0 은 디폴트 값이다. none일때 0으로 변환한다.
-            int(self.request.query_params.get('assigned_only', 0))
+        # ?assigned_only=1 이면 레시피에 쓰인 것만, ?min_usage= 이면 그만큼 쓰인 것만 반환한다.
+        queryset = filter_recipe_attrs(
+            self.queryset, self.request.query_params
         )
-        queryset = self.queryset
-        if assigned_only:
-            # 레시피가 있는 것들만 반환한다.
-            queryset = queryset.filter(recipe__isnull=False)
-
-        # distinct를 안하면 중복된 아이템이 나옴.
         return queryset.filter(
             user=self.request.user
-        ).order_by('-name').distinct()
+        ).order_by(*self.get_ordering())
+
+    def get_ordering(self):
+        """Return the ordering asked by the ordering query param"""
+        return attr_ordering(self.request.query_params)
 
     # 객체를 create할 때 자동으로 실행되는 함수이다.
     def perform_create(self, serializer):
@@ -64,46 +90,92 @@ class TagViewSet(BaseRecipeAttrViewSet):
     """Manage tags in the database"""
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    bulk_serializer_class = serializers.TagBulkSerializer
 
 
 class IngredientViewSet(BaseRecipeAttrViewSet):
     """Manage ingredients in the database"""
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
+    bulk_serializer_class = serializers.IngredientBulkSerializer
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(CachedListMixin,
+                    ReplicaReadMixin,
+                    FastListMixin,
+                    ConditionalDetailMixin,
+                    BulkModelMixin,
+                    viewsets.ModelViewSet):
     # 뷰셋으로 CRUD 기능을 커버
     """Manage recipes in the database"""
     serializer_class = serializers.RecipeSerializer
+    bulk_serializer_class = serializers.RecipeBulkSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
-
-    # 앞에 _를 넣으면 클래스 밖에서는 사용할 수 없다.private 함수
-    def _params_to_ints(self, qs):
-        """Convert a list of string IDs to a list of integers"""
-        return [int(str_id) for str_id in qs.split(',')]
+    pagination_class = RecipeCursorPagination
+    # ?fields=, ?expand=로 고른 응답은 ETag가 서로 달라야 한다.
+    representation_params = ('fields', 'expand')
 
     def get_queryset(self):
         """Retrieve the recipes for the authenticated user"""
-        # 쿼리 파라미터를 가져온다. 만약 없다면 디폴트 값인 none을 반환한다.
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
         # queryset을 필터된 옵션으로 재할당하고싶지 않기 때문에.
-        queryset = self.queryset
-        # tags 쿼리 파라미터가 있는 경우.
-        if tags:
-            tag_ids = self._params_to_ints(tags)
-            # __는 foreign key 객체에 대한 필터링
-            # 우리의 (레시피) 쿼리셋은 tags를 가지고 있다.
-            # 레시피는 tags table을 foreign key로 가지고 있다. tags는 id를 가지고 있음.
-            # __in은 우리가 제공한 리스트의 id가 있는 모든 tags를 반환하는 함수.
-            queryset = queryset.filter(tags__id__in=tag_ids)
-        if ingredients:
-            ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
-        return queryset.filter(user=self.request.user)
+        # ?tags=, ?ingredients= 필터는 JOIN 대신 서브쿼리로 걸러서 중복이 생기지 않는다.
+        # match=all이면 모든 태그를 가진 것만, exclude_tags=로 제외할 수도 있다.
+        queryset = filter_recipes(self.queryset, self.request.query_params)
+        # 최신 레시피가 먼저 오도록 정렬한다. 정렬이 없으면 순서가 db마다 달라진다.
+        queryset = queryset.filter(user=self.request.user).order_by('-id')
+
+        # 조회 액션에서는 시리얼라이저가 필요한 필드와 관계만 한번에 가져온다.
+        # 쓰기 액션은 모델 전체가 필요하므로 그대로 둔다.
+        # ?fields=, ?expand= 로 고른 필드와 관계만 가져온다.
+        if self.action in ('list', 'retrieve'):
+            queryset = plan_queryset(
+                queryset, self.get_serializer_class(),
+                self.get_serializer_context()
+            )
+        return queryset
+
+    def get_serializer_context(self):
+        """Add the fields and expansions asked by a read request"""
+        context = super().get_serializer_context()
+        if self.action in ('list', 'retrieve'):
+            context.update(parse_fieldsets(
+                self.request.query_params, self.get_serializer_class()
+            ))
+        return context
+
+    def _search_query(self):
+        """Return the full text search query of a list request"""
+        if self.action != 'list':
+            return ''
+        return self.request.query_params.get('q', '').strip()
+
+    def filter_queryset(self, queryset):
+        # ?q= 가 있으면 제목, 태그, 재료 이름으로 검색해서 관련도 순으로 정렬한다.
+        queryset = super().filter_queryset(queryset)
+        q = self._search_query()
+        if q:
+            return search_recipes(queryset, q)
+        return queryset
+
+    @property
+    def paginator(self):
+        # 검색 결과는 관련도 순이라 커서를 쓸 수 없으므로 페이지 번호로 나눈다.
+        if not hasattr(self, '_paginator') and self._search_query():
+            self._paginator = RecipeSearchPagination()
+        return super().paginator
+
+    def get_last_modified_queryset(self):
+        """Annotate recipes with the last change to them or their relations"""
+        # 상세 응답에는 태그와 재료 이름이 들어가므로 그것들의 변경 시각도 같이 본다.
+        return Recipe.objects.filter(user=self.request.user).annotate(
+            last_modified=Greatest(
+                'updated_at',
+                Coalesce(Max('tags__updated_at'), 'updated_at'),
+                Coalesce(Max('ingredients__updated_at'), 'updated_at'),
+            )
+        )
 
     # 스펠링을 맞추지 않으면 작동하지 않을 수도 있다.
     # get serializer class로 serializer을 설정하는 것이 가장 좋다.
@@ -113,7 +185,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Return appropriate serializer class"""
         if self.action == 'retrieve':
             return serializers.RecipeDetailSerializer
-        elif self.action == 'upload_image':
+        elif self.action in ('upload_image', 'image_upload_complete'):
             return serializers.RecipeImageSerializer
 
         return self.serializer_class
@@ -136,6 +208,9 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Upload an image to a recipe"""
         # get object는 디폴트를 가져오거나 url의 id를 기반으로 접근 한 객체를 가져온다.
         recipe = self.get_object()
+        # request.data를 읽기 전에 설정해야 한다. 본문을 메모리에 모으지 않고
+        # 임시 파일로 바로 쓰면서 크기와 이미지 헤더를 확인한다.
+        request.upload_handlers = [BoundedImageUploadHandler(request)]
         # 레시피와 request.data를 넣어서 보냄.
         # get_serializer_class를 업데이트해야함.
         serializer = self.get_serializer(
@@ -145,7 +220,16 @@ class RecipeViewSet(viewsets.ModelViewSet):
         # 데이터가 유효한지 확인함. 이미지가 있는지, 추가 필드는 없는지.
         if serializer.is_valid():
             # 모델 시리얼라이저를 쓰고 있음. save를 하면 객체가 저장됨.
-            serializer.save()
+            # 원본만 저장하고 바로 응답한다. 크기별 사본은 백그라운드에서 만든다.
+            # 파일을 저장하고 참조 수를 올리는 것을 한 트랜잭션에서 한다. (recipe.blobs 참고)
+            with transaction.atomic():
+                serializer.save(
+                    image_status=Recipe.IMAGE_PENDING,
+                    image_status_at=timezone.now(),
+                    image_width=None,
+                    image_height=None
+                )
+            enqueue(process_recipe_image, recipe.id)
             # Response를 반환함.
             return Response(
                 serializer.data,
@@ -156,3 +240,45 @@ class RecipeViewSet(viewsets.ModelViewSet):
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
         )
+
+    # 이미지 바이트가 api 서버를 거치지 않도록 저장소에 바로 올리는 주소를 준다.
+    @action(methods=['POST'], detail=True, url_path='image-upload-url')
+    def image_upload_url(self, request, pk=None):
+        """Return a signed url to upload an image of a recipe directly"""
+        recipe = self.get_object()
+        serializer = serializers.ImageUploadUrlSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = issue_upload(
+            request, recipe, serializer.validated_data['content_type']
+        )
+        return Response(upload, status=status.HTTP_200_OK)
+
+    # 업로드가 끝나면 토큰으로 알린다. 크기와 헤더만 확인하고 처리는 백그라운드에서 한다.
+    @action(methods=['POST'], detail=True, url_path='image-upload-complete')
+    def image_upload_complete(self, request, pk=None):
+        """Attach a directly uploaded image to a recipe"""
+        recipe = self.get_object()
+        serializer = serializers.ImageUploadCompleteSerializer(
+            data=request.data
+        )
+        serializer.is_valid(raise_exception=True)
+        recipe = complete_upload(
+            recipe, request.user, serializer.validated_data['token']
+        )
+        return Response(
+            self.get_serializer(recipe).data,
+            status=status.HTTP_200_OK
+        )
+
+
+class LocalImageUploadView(APIView):
+    """Receive a direct image upload when files are stored locally"""
+    # S3의 서명된 주소처럼 url의 토큰으로 인증한다.
+    authentication_classes = ()
+    permission_classes = (AllowAny,)
+
+    def put(self, request, token):
+        # request.data를 읽지 않고 본문을 조각으로 읽는다.
+        content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        receive_local_upload(token, request.stream, content_length)
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -1,3 +1 @@
-
-# 마이그레이션들은 core앱에 넣어놓을테니 여기서는 폴더 자체를 삭제해도 됨.
-# 또한, admin, models, tests도 삭제한다.
+default_app_config = 'user.apps.UserConfig'
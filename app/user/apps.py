@@ -1,5 +1,11 @@
+# 마이그레이션들은 core앱에 넣어놓을테니 여기서는 폴더 자체를 삭제해도 됨.
+# 또한, admin, models, tests도 삭제한다.
 from django.apps import AppConfig
 
 
 class UserConfig(AppConfig):
     name = 'user'
+
+    def ready(self):
+        # 시그널 리시버를 등록한다.
+        from user import signals  # noqa: F401
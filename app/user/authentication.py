@@ -0,0 +1,172 @@
+# 캐시를 이용하는 토큰 인증.
+# DRF의 TokenAuthentication은 요청마다 Token과 User를 JOIN하는 쿼리를 실행한다.
+# 여기서는 워커마다 가지는 작은 LRU 캐시를 먼저 보고, 없으면 django 캐시(공유 캐시)를 본다.
+# django 캐시가 프로세스 메모리 캐시라면 다른 워커에서 폐기한 토큰이 남으므로 쓰지 않는다.
+# 둘 다 없을 때만 데이터베이스에 접근한다.
+# 캐시에는 토큰 키, 유저 id, 활성 여부만 넣는다. 비밀번호 해시 같은 유저 정보는 넣지 않는다.
+# 나머지 유저 필드는 요청에서 처음 읽을 때 데이터베이스에서 가져온다.
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import ugettext_lazy as _
+
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from core.cache import cache_is_shared
+
+
+CACHE_KEY_PREFIX = 'auth:credentials:'
+
+
+class LocalTokenCache:
+    """Bounded least recently used cache with a time to live per entry"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        # 스레드 워커에서도 안전하도록 잠금을 건다.
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            # 가장 최근에 사용된 것을 뒤로 보낸다.
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Store a value, evicting the least recently used entry if full"""
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        """Remove a value from the cache"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Remove every value from the cache"""
+        with self._lock:
+            self._entries.clear()
+
+
+# 다른 워커의 로컬 캐시는 지울 수 없으므로, 로컬 TTL은 짧게 유지해서 오래된 값이 남는 시간을 제한한다.
+local_cache = LocalTokenCache(
+    maxsize=getattr(settings, 'TOKEN_CACHE_LOCAL_SIZE', 1024),
+    ttl=getattr(settings, 'TOKEN_CACHE_LOCAL_TTL', 5),
+)
+
+_stats_lock = threading.Lock()
+_stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0}
+
+
+def _record(counter):
+    with _stats_lock:
+        _stats[counter] += 1
+
+
+def get_cache_stats():
+    """Return hit and miss counters of the token cache"""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_cache_stats():
+    """Reset hit and miss counters of the token cache"""
+    with _stats_lock:
+        for counter in _stats:
+            _stats[counter] = 0
+
+
+def invalidate_token(key):
+    """Remove a token from both cache tiers"""
+    local_cache.delete(key)
+    cache.delete(CACHE_KEY_PREFIX + key)
+
+
+def invalidate_user_tokens(user):
+    """Remove every token of a user from both cache tiers"""
+    keys = Token.objects.filter(user=user).values_list('key', flat=True)
+    for key in keys:
+        invalidate_token(key)
+
+
+def token_credentials(token):
+    """Return the cacheable credentials of a token"""
+    return {
+        'key': token.key,
+        'user_id': token.user_id,
+        'is_active': token.user.is_active,
+    }
+
+
+def credentials_token(credentials):
+    """Return a token and its user built from cached credentials"""
+    # 캐시에 없는 필드는 지연 로딩(deferred)된다.
+    user = get_user_model().from_db(
+        DEFAULT_DB_ALIAS, ['id', 'is_active'],
+        [credentials['user_id'], credentials['is_active']]
+    )
+    token = Token.from_db(
+        DEFAULT_DB_ALIAS, ['key', 'user_id'],
+        [credentials['key'], credentials['user_id']]
+    )
+    token.user = user
+    return token
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication resolving tokens through a two tier cache"""
+
+    def authenticate_credentials(self, key):
+        credentials = local_cache.get(key)
+        if credentials is not None:
+            _record('local_hits')
+        else:
+            shared = cache_is_shared()
+            if shared:
+                credentials = cache.get(CACHE_KEY_PREFIX + key)
+            if credentials is not None:
+                _record('shared_hits')
+            else:
+                _record('misses')
+                # 캐시에 없으면 원래대로 데이터베이스에서 찾는다.
+                # 토큰이 없거나 비활성 유저라면 여기서 예외가 발생하고 캐시에 넣지 않는다.
+                user, token = super().authenticate_credentials(key)
+                credentials = token_credentials(token)
+                if shared:
+                    cache.set(
+                        CACHE_KEY_PREFIX + key,
+                        credentials,
+                        getattr(settings, 'TOKEN_CACHE_TTL', 300)
+                    )
+            local_cache.set(key, credentials)
+
+        # 캐시된 유저가 비활성화 되었을 수도 있으므로 다시 확인한다.
+        if not credentials['is_active']:
+            invalidate_token(key)
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+
+        # 요청마다 새 객체를 만들어서 한 요청에서 바꾼 값이 다른 요청에 남지 않게 한다.
+        token = credentials_token(credentials)
+        return (token.user, token)
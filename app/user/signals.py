@@ -0,0 +1,23 @@
+# 토큰 캐시에 남아있는 오래된 유저 정보를 지우기 위한 시그널.
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token
+
+from user.authentication import invalidate_token, invalidate_user_tokens
+
+
+# 비밀번호 변경, 비활성화 등 유저가 저장될 때마다 캐시를 비운다.
+@receiver(post_save, sender=get_user_model())
+def invalidate_tokens_on_user_save(sender, instance, created, **kwargs):
+    """Drop cached tokens of a user whenever the user changes"""
+    if not created:
+        invalidate_user_tokens(instance)
+
+
+# 로그아웃 등으로 토큰이 삭제되면 캐시에서도 지운다.
+@receiver(post_delete, sender=Token)
+def invalidate_token_on_delete(sender, instance, **kwargs):
+    """Drop a deleted token from the cache"""
+    invalidate_token(instance.key)
@@ -0,0 +1,171 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+
+from user.authentication import CACHE_KEY_PREFIX, \
+    CachedTokenAuthentication, LocalTokenCache, local_cache, \
+    get_cache_stats, reset_cache_stats
+
+
+ME_URL = reverse('user:me')
+LOGOUT_URL = reverse('user:logout')
+STATS_URL = reverse('user:token-cache-stats')
+
+
+class LocalTokenCacheTests(TestCase):
+    """Test the bounded in-process token cache"""
+
+    def test_evicts_least_recently_used(self):
+        """Test the oldest unused entry is evicted when the cache is full"""
+        lru = LocalTokenCache(maxsize=2, ttl=60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+
+        self.assertEqual(lru.get('a'), 1)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('c'), 3)
+
+    def test_expired_entries_are_missing(self):
+        """Test entries are not returned after their time to live"""
+        lru = LocalTokenCache(maxsize=2, ttl=-1)
+        lru.set('a', 1)
+
+        self.assertIsNone(lru.get('a'))
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test authenticating with cached tokens"""
+
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        reset_cache_stats()
+        # 테스트의 프로세스 메모리 캐시를 공유 캐시로 보고 확인한다.
+        shared = patch(
+            'user.authentication.cache_is_shared', return_value=True
+        )
+        self.cache_is_shared = shared.start()
+        self.addCleanup(shared.stop)
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            'testpass'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def test_cached_token_skips_database(self):
+        """Test a token is only looked up in the database once"""
+        with self.assertNumQueries(1):
+            user, token = self.auth.authenticate_credentials(self.token.key)
+        with self.assertNumQueries(0):
+            user, token = self.auth.authenticate_credentials(self.token.key)
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(token.key, self.token.key)
+        self.assertEqual(
+            get_cache_stats(),
+            {'local_hits': 1, 'shared_hits': 0, 'misses': 1}
+        )
+
+    def test_shared_cache_keeps_credentials_only(self):
+        """Test the shared cache does not hold the user or password hash"""
+        self.auth.authenticate_credentials(self.token.key)
+
+        self.assertEqual(cache.get(CACHE_KEY_PREFIX + self.token.key), {
+            'key': self.token.key,
+            'user_id': self.user.id,
+            'is_active': True,
+        })
+        local_cache.clear()
+        user, token = self.auth.authenticate_credentials(self.token.key)
+        # 나머지 필드는 읽을 때 데이터베이스에서 가져온다.
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, self.user.email)
+
+    def test_cache_stats_endpoint(self):
+        """Test staff users can read the token cache counters"""
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+        res = client.get(STATS_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_staff = True
+        self.user.save()
+        res = client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['misses'], 2)
+        self.assertIn('pid', res.data)
+
+    def test_shared_cache_used_when_local_missing(self):
+        """Test the shared cache is used after the local cache is cleared"""
+        self.auth.authenticate_credentials(self.token.key)
+        local_cache.clear()
+
+        with self.assertNumQueries(0):
+            self.auth.authenticate_credentials(self.token.key)
+
+        self.assertEqual(get_cache_stats()['shared_hits'], 1)
+
+    def test_local_memory_cache_not_used(self):
+        """Test a per process django cache is skipped by every worker"""
+        self.cache_is_shared.return_value = False
+        self.auth.authenticate_credentials(self.token.key)
+        local_cache.clear()
+
+        with self.assertNumQueries(1):
+            self.auth.authenticate_credentials(self.token.key)
+
+        self.assertIsNone(cache.get(CACHE_KEY_PREFIX + self.token.key))
+        self.assertEqual(get_cache_stats()['misses'], 2)
+
+    def test_invalid_token_not_cached(self):
+        """Test an unknown token fails and is not cached"""
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials('invalid')
+
+        self.assertIsNone(local_cache.get('invalid'))
+
+    def test_deactivated_user_invalidated(self):
+        """Test deactivating a user drops their cached token"""
+        self.auth.authenticate_credentials(self.token.key)
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_password_change_invalidates_token(self):
+        """Test updating the password through the API drops the cache"""
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        client.get(ME_URL)
+        self.assertIsNotNone(local_cache.get(self.token.key))
+
+        res = client.patch(ME_URL, {'password': 'newpassword'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(local_cache.get(self.token.key))
+
+    def test_logout_invalidates_token(self):
+        """Test logging out deletes the token and its cache entry"""
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+        res = client.post(LOGOUT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Token.objects.filter(user=self.user).exists())
+        res = client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -10,5 +10,10 @@ urlpatterns = [
     path('create/', views.CreateUserView.as_view(), name='create'),
     path('token/', views.CreateTokenView.as_view(), name='token'),
     path('me/', views.ManageUserView.as_view(), name='me'),
+    path('logout/', views.LogoutView.as_view(), name='logout'),
+    path(
+        'token-cache-stats/', views.TokenCacheStatsView.as_view(),
+        name='token-cache-stats'
+    ),
 
 ]
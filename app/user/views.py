@@ -1,11 +1,17 @@
 # rest framework의 generics modules로 대체할 것임
 # from django.shortcuts import render
-from rest_framework import generics, authentication, permissions
+import os
+
+from django.contrib.auth import get_user_model
+
+from rest_framework import generics, permissions, status, views
 # username과 password만 standard로 전달한다면, 해당 뷰에서 우리 url로 바로 토큰을 준다.
 from rest_framework.authtoken.views import ObtainAuthToken
 # api세팅
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
 
+from user.authentication import CachedTokenAuthentication, get_cache_stats
 from user.serializers import UserSerializer, AuthTokenSerializer
 
 
@@ -27,7 +33,7 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated user"""
     serializer_class = UserSerializer
     # 인증이 발생하는 매커니즘. 쿠키, 토큰 등
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     # 사용자가 가지고 있는 권한 수준
     permission_classes = (permissions.IsAuthenticated,)
 
@@ -35,4 +41,26 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
     def get_object(self):
         """Retrieve and return authentication user"""
         # 인증 클래스를 통해 사용자가 요청에 연결되므로 인증된 사용자를 가져와 request에 할당한다.
-        return self.request.user
+        # 캐시된 인증 정보에는 id와 활성 여부만 있으므로, 필드를 하나씩 읽지 않도록 한번에 가져온다.
+        return get_user_model().objects.get(pk=self.request.user.pk)
+
+
+class LogoutView(views.APIView):
+    """Log out the authenticated user by deleting their token"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def post(self, request):
+        # 토큰이 삭제되면 시그널을 통해 캐시에서도 지워진다.
+        request.auth.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class TokenCacheStatsView(views.APIView):
+    """Report the token cache counters of the serving process"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request):
+        # 카운터는 프로세스마다 따로 세므로 어느 프로세스의 값인지 같이 보낸다.
+        return Response({'pid': os.getpid(), **get_cache_stats()})